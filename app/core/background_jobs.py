@@ -0,0 +1,203 @@
+"""
+Jobs em segundo plano com acompanhamento de progresso
+Para operações que podem passar do timeout do gunicorn (ex.: passo 3 de alunos).
+O job roda em uma thread do worker que o iniciou e fica em memória, como as
+sessões de importação; o executor é criado sob demanda em cada worker.
+O progresso pode ser acompanhado por consulta (to_dict) ou por stream SSE (job_events)
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from starlette.responses import StreamingResponse
+from app.core.config import BACKGROUND_JOBS_CONFIG
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Jobs do worker (job_id -> Job); os finalizados são descartados após retention_seconds
+jobs = {}
+_jobs_lock = threading.Lock()
+
+# Estados do job
+JOB_PENDENTE = "pending"
+JOB_EXECUTANDO = "running"
+JOB_CONCLUIDO = "completed"
+JOB_FALHOU = "failed"
+
+
+class Job:
+    """
+    Job em segundo plano
+    A função do job recebe progress(fase, processados, total, erros) para informar o andamento;
+    linhas/s e ETA são calculados sobre a fase atual
+
+    Args:
+        kind: Tipo do job (ex.: 'alunos_step3'), exibido no estado
+        db_name: Banco de dados do job (consultas por outro banco não encontram o job)
+    """
+
+    def __init__(self, kind: str = None, db_name: str = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.db_name = db_name
+        self.status = JOB_PENDENTE
+        self.phase = None
+        self.processed = 0
+        self.total = None
+        self.errors = 0
+        # Incrementado a cada mudança de estado (usado pelos streams SSE)
+        self.version = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started = None
+        self.finished = None
+        self._phase_started = None
+        self._phase_processed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.status in (JOB_PENDENTE, JOB_EXECUTANDO)
+
+    def progress(self, phase: str, processed: int, total: int = None, errors: int = None) -> None:
+        """Atualiza o andamento (uma nova fase reinicia a medição de linhas/s)"""
+        with self._lock:
+            if phase != self.phase:
+                self.phase = phase
+                self._phase_started = time.monotonic()
+                self._phase_processed = processed
+            self.processed = processed
+            self.total = total
+            if errors is not None:
+                self.errors = errors
+            self.version += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado do job (sem o resultado)"""
+        with self._lock:
+            now = self.finished or time.monotonic()
+            rows_per_sec = None
+            eta = None
+            if self._phase_started is not None:
+                elapsed = now - self._phase_started
+                done = self.processed - self._phase_processed
+                if elapsed > 0 and done > 0:
+                    rows_per_sec = done / elapsed
+                    if self.total is not None and self.status == JOB_EXECUTANDO:
+                        eta = max(self.total - self.processed, 0) / rows_per_sec
+
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "phase": self.phase,
+                "processed_rows": self.processed,
+                "total_rows": self.total,
+                "errors": self.errors,
+                "percent": round(100 * self.processed / self.total, 1) if self.total else None,
+                "rows_per_sec": round(rows_per_sec, 1) if rows_per_sec is not None else None,
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "elapsed_seconds": round(now - self.started, 1) if self.started is not None else None,
+                "created_at": self.created_at,
+                "error": self.error
+            }
+
+    @property
+    def finished_since(self) -> Optional[float]:
+        """Segundos desde o fim do job (None se ainda não terminou)"""
+        return time.monotonic() - self.finished if self.finished is not None else None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Executor de jobs do worker atual (criado na primeira chamada, recriado após fork)"""
+    global _executor, _executor_pid
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=BACKGROUND_JOBS_CONFIG["max_workers"],
+                thread_name_prefix="background-job"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    """Retorna o job do worker atual (None se não existe ou já foi descartado)"""
+    with _jobs_lock:
+        return jobs.get(job_id)
+
+
+def submit_job(job: Job, func: Callable[..., Any], *args, **kwargs) -> Job:
+    """
+    Executa func(*args, progress=job.progress, **kwargs) em segundo plano
+    O retorno fica em job.result; uma exceção marca o job como falho (job.error)
+    """
+    retention = BACKGROUND_JOBS_CONFIG["retention_seconds"]
+    with _jobs_lock:
+        for job_id in [job_id for job_id, other in jobs.items() if (other.finished_since or 0) > retention]:
+            del jobs[job_id]
+        jobs[job.id] = job
+
+    def run():
+        with job._lock:
+            job.status = JOB_EXECUTANDO
+            job.started = time.monotonic()
+            job.version += 1
+        try:
+            job.result = func(*args, progress=job.progress, **kwargs)
+            status = JOB_CONCLUIDO
+        except Exception as e:
+            job.error = str(e)
+            status = JOB_FALHOU
+        with job._lock:
+            job.status = status
+            job.finished = time.monotonic()
+            job.version += 1
+
+    _get_executor().submit(run)
+    return job
+
+
+async def job_events(job: Job) -> AsyncIterator[str]:
+    """
+    Stream SSE (text/event-stream) do job: um evento "progress" a cada mudança de
+    estado e um evento "done" ao final, ambos com o estado do job (to_dict, sem o resultado).
+    Sem mudanças, envia um comentário de keep-alive a cada events_keepalive segundos
+    """
+    interval = BACKGROUND_JOBS_CONFIG["events_interval"]
+    keepalive = BACKGROUND_JOBS_CONFIG["events_keepalive"]
+    version = None
+    last_sent = time.monotonic()
+
+    while True:
+        if job.version != version:
+            version = job.version
+            state = job.to_dict()
+            finished = state["status"] in (JOB_CONCLUIDO, JOB_FALHOU)
+            yield f"event: {'done' if finished else 'progress'}\ndata: {json.dumps(state)}\n\n"
+            last_sent = time.monotonic()
+            if finished:
+                return
+        elif time.monotonic() - last_sent >= keepalive:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+        await asyncio.sleep(interval)
+
+
+def job_events_response(job: Job) -> StreamingResponse:
+    """Resposta HTTP com o stream SSE do job (sem cache nem buffer em proxies)"""
+    return StreamingResponse(
+        job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
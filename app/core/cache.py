@@ -3,14 +3,20 @@ Sistema de cache com TTL
 """
 import hashlib
 import json
+import threading
 import time
 from functools import wraps
-from cachetools import TTLCache
+from cachetools import LRUCache, TTLCache
 from app.core.config import CACHE_CONFIG
 
 # Dicionário global de caches
 caches = {}
 
+# Caches de similaridade entre nomes de escolas, por banco (db -> SimilarityCache);
+# limitado a CACHE_CONFIG['similarity_max_databases'] bancos, os usados há mais tempo são descartados
+similarity_caches = LRUCache(maxsize=CACHE_CONFIG['similarity_max_databases'])
+_similarity_caches_lock = threading.Lock()
+
 def create_cache_key(*args, **kwargs):
     """Cria uma chave de cache única baseada nos argumentos da função."""
     key = {
@@ -53,3 +59,123 @@ def cached(ttl_seconds=None, maxsize=None):
         return wrapper
     return decorator
 
+
+
+class SimilarityCache:
+    """
+    Cache LRU de similaridades já calculadas entre pares de nomes
+    Chave: (nome, nome candidato, threshold) -> similaridade (seguro entre threads)
+    """
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._cache.get(key, default)
+
+    def __setitem__(self, key, value) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def get_similarity_cache(db_name: str) -> SimilarityCache:
+    """
+    Retorna o cache de similaridades de nomes de escolas do banco
+    (tamanho: CACHE_CONFIG['similarity_maxsize'] pares, em até
+    CACHE_CONFIG['similarity_max_databases'] bancos)
+    """
+    with _similarity_caches_lock:
+        cache = similarity_caches.get(db_name)
+        if cache is None:
+            cache = similarity_caches[db_name] = SimilarityCache(CACHE_CONFIG['similarity_maxsize'])
+        return cache
+
+
+def invalidate_similarity_cache(db_name: str) -> None:
+    """Descarta o cache de similaridades do banco (ex.: após inserir escolas)"""
+    with _similarity_caches_lock:
+        if similarity_caches.pop(db_name, None) is not None:
+            print(f"🗑️ Cache de similaridade de escolas invalidado ({db_name})")
+
+
+class ReferenceCache:
+    """
+    Cache com TTL dos dados de referência (escolas, séries e turmas) por banco
+    Conta acertos, faltas e invalidações (seguro entre threads)
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._lock = threading.Lock()
+        # Incrementado a cada invalidação: um carregamento iniciado antes dela não é guardado
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, db_name: str, loader):
+        """Retorna os dados do banco em cache ou carrega com loader() (fora do lock)"""
+        with self._lock:
+            snapshot = self._cache.get(db_name) if self._cache is not None else None
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            generation = self._generations.get(db_name, 0)
+
+        snapshot = loader()
+
+        with self._lock:
+            if self._cache is not None and self._generations.get(db_name, 0) == generation:
+                self._cache[db_name] = snapshot
+        return snapshot
+
+    def invalidate(self, db_name: str) -> bool:
+        """Descarta os dados do banco; retorna True se havia dados em cache"""
+        with self._lock:
+            self._generations[db_name] = self._generations.get(db_name, 0) + 1
+            self.invalidations += 1
+            return self._cache is not None and self._cache.pop(db_name, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "bancos": len(self._cache) if self._cache is not None else 0,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "invalidations": self.invalidations
+            }
+
+
+# Dados de referência por banco (CACHE_CONFIG['reference_ttl'] segundos)
+reference_cache = ReferenceCache(CACHE_CONFIG['reference_maxsize'], CACHE_CONFIG['reference_ttl'])
+
+
+def get_reference_snapshot(db_name: str, loader):
+    """Retorna os dados de referência do banco, carregando com loader() se não estiverem em cache"""
+    return reference_cache.get(db_name, loader)
+
+
+def invalidate_reference_cache(db_name: str) -> None:
+    """Descarta os dados de referência do banco (ex.: após a importação de estrutura)"""
+    if reference_cache.invalidate(db_name):
+        print(f"🗑️ Cache de escolas/séries/turmas invalidado ({db_name})")
+
+
+def cache_stats() -> dict:
+    """Estatísticas dos caches por banco"""
+    with _similarity_caches_lock:
+        similaridades = {db_name: len(cache) for db_name, cache in similarity_caches.items()}
+    return {
+        "referencias": reference_cache.stats(),
+        "similaridade_escolas": similaridades
+    }
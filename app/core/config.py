@@ -32,7 +32,11 @@ EXCLUDED_PATTERNS = [
 # Configurações de cache
 CACHE_CONFIG = {
     "default_ttl": 10,
-    "default_maxsize": 100
+    "default_maxsize": 100,
+    "similarity_maxsize": 100_000,  # Pares de nomes de escolas com similaridade em cache, por banco
+    "similarity_max_databases": 8,  # Bancos com cache de similaridade (os usados há mais tempo são descartados)
+    "reference_ttl": int(os.getenv("REFERENCE_CACHE_TTL", 120)),  # Escolas/séries/turmas em memória, por banco (0 = sem cache)
+    "reference_maxsize": 256  # Bancos com dados de referência em cache
 }
 
 # Configurações de segurança
@@ -45,7 +49,49 @@ SECURITY_CONFIG = {
 # Configurações de importação
 IMPORT_CONFIG = {
     "max_file_size": 25 * 1024 * 1024,  # 25MB
-    "allowed_extensions": ['.csv'],
-    "csv_preview_rows": 5
+    "allowed_extensions": ['.csv', '.csv.gz', '.zip'],  # .gz/.zip são descompactados durante a leitura
+    "csv_preview_rows": 5,
+    "upload_chunk_size": 64 * 1024,  # 64KB por leitura do upload
+    "encoding_sample_size": 64 * 1024,  # Amostra usada para detectar o encoding
+    "session_dictionary_ratio": 0.5,  # Coluna usa dicionário se distintos <= 50% das linhas
+    # Nomes similares: compara apenas nomes com alguma palavra foneticamente parecida (blocking_keys)
+    "phonetic_blocking": os.getenv("PHONETIC_BLOCKING", "false").lower() == "true",
+    # Escopo da detecção de nomes similares no passo 3 de alunos: "file" (arquivo inteiro),
+    # "escola" ou "turma" (mesma escola, série e turma). Gravado na sessão no passo 1
+    "similar_names_scope": os.getenv("SIMILAR_NAMES_SCOPE", "file"),
+    "similar_names_per_row": 5,  # Nomes similares guardados por linha (os mais similares)
+    "similar_names_max_stored": 1000,  # Total de nomes similares guardados na sessão (contagem exata à parte)
+    "ra_lookup_chunk_size": 1000,  # RAs por consulta "a_matricula IN (...)" nos passos 3 e 5
+    "progress_interval": 500,  # Linhas entre atualizações de progresso do passo 3 em segundo plano
+    "step3_rows_page_size": 100,  # Linhas por página em /step3/rows (default do limit)
+    "step3_rows_max_page_size": 1000,  # Maior limit aceito em /step3/rows no formato JSON
+    # Validação por campo reaproveitada entre execuções do passo 3 até esta quantidade de linhas
+    # (acima, o resultado de cada campo não é guardado na sessão)
+    "step3_field_cache_max_rows": 50_000,
+    # Limites para usar o pool de processos (0/None desativa). O pool só é usado com mais de
+    # um processo (process_pool.pool_enabled): com 1 CPU o trabalho fica no processo atual
+    # Parse paralelo para arquivos a partir deste tamanho em bytes
+    "parallel_parse_threshold": int(os.getenv("PARALLEL_PARSE_THRESHOLD", 16 * 1024 * 1024)) or None,
+    "parallel_parse_chunk_size": 1024 * 1024,  # Tamanho aproximado de cada bloco enviado ao pool
+    # Detecção de nomes similares no pool a partir desta quantidade de nomes (alunos)
+    # ou de escolas a comparar (estrutura)
+    "parallel_similarity_threshold": int(os.getenv("PARALLEL_SIMILARITY_THRESHOLD", 2000)) or None,
+    # Validação das linhas de estrutura pelo esquema no pool a partir desta quantidade de linhas
+    "parallel_validation_threshold": int(os.getenv("PARALLEL_VALIDATION_THRESHOLD", 20_000)) or None,
+    "parallel_validation_chunk_size": 5000  # Linhas por bloco enviado ao pool
 }
 
+# Configurações do pool de processos (trabalho pesado de CPU)
+PROCESS_POOL_CONFIG = {
+    # Processos por worker do gunicorn (default: cota de CPU do container, ver available_cpus)
+    "max_workers": int(os.getenv("PROCESS_POOL_WORKERS", 0)) or None,
+    "max_pending": 4  # Tarefas em andamento por requisição
+}
+
+# Configurações dos jobs em segundo plano (ex.: passo 3 de alunos)
+BACKGROUND_JOBS_CONFIG = {
+    "max_workers": int(os.getenv("BACKGROUND_JOBS_WORKERS", 2)),  # Jobs simultâneos por worker do gunicorn
+    "retention_seconds": 3600,  # Jobs finalizados ficam consultáveis por este tempo
+    "events_interval": 0.5,  # Segundos entre verificações de progresso nos streams SSE
+    "events_keepalive": 15  # Segundos sem eventos até enviar um keep-alive (proxies fecham conexões ociosas)
+}
@@ -0,0 +1,121 @@
+"""
+Pool de processos para trabalho pesado de CPU (parse, validação e nomes similares em arquivos grandes)
+O pool é criado sob demanda dentro de cada worker do gunicorn, ou seja,
+depois do fork (preload_app=True), e nunca é herdado entre processos
+"""
+import math
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+from app.core.config import PROCESS_POOL_CONFIG
+
+_pool = None
+_pool_pid = None
+# Requisições em threads diferentes (run_in_threadpool) podem pedir o pool ao mesmo tempo
+_pool_lock = threading.Lock()
+
+# Limite de CPU do container (cgroup v2 e v1)
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read_cgroup_quota() -> float:
+    """Cota de CPU do container em CPUs (ex.: 1.5), ou None se não houver limite"""
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CGROUP_V1_QUOTA) as f:
+            quota = int(f.read())
+        with open(CGROUP_V1_PERIOD) as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def available_cpus() -> int:
+    """
+    CPUs disponíveis para o processo: menor valor entre a cota do container
+    (cgroup, arredondada para cima), a afinidade de CPU e os CPUs da máquina
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _read_cgroup_quota()
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def pool_size() -> int:
+    """Quantidade de processos do pool (PROCESS_POOL_CONFIG ou CPUs disponíveis)"""
+    return PROCESS_POOL_CONFIG["max_workers"] or available_cpus()
+
+
+def pool_enabled() -> bool:
+    """
+    Indica se o trabalho pesado deve ir para o pool: com um único processo (ex.: container
+    com 1 CPU) o pool só acrescenta a serialização dos blocos e o trabalho fica no processo atual
+    """
+    return pool_size() > 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Retorna o pool de processos do worker atual (criando-o na primeira chamada)"""
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        # Recria o pool se ainda não existe, se foi herdado de outro processo
+        # ou se um processo filho morreu (BrokenProcessPool)
+        if _pool is None or _pool_pid != os.getpid() or getattr(_pool, "_broken", False):
+            max_workers = pool_size()
+            # spawn: os processos filhos não herdam threads/conexões do worker
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_pid = os.getpid()
+            print(f"✅ Pool de processos criado com {max_workers} processo(s) (pid {_pool_pid})")
+
+        return _pool
+
+
+def map_bounded(func: Callable, items: Iterable, *args: Any, max_pending: int = None) -> Iterator[Any]:
+    """
+    Executa func(item, *args) no pool para cada item, devolvendo os resultados na ordem
+    de entrada. Mantém no máximo max_pending tarefas em andamento, para que o iterável
+    de entrada (ex.: blocos de um arquivo) não seja carregado inteiro em memória.
+    """
+    pool = get_process_pool()
+    if max_pending is None:
+        max_pending = PROCESS_POOL_CONFIG["max_pending"]
+
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(func, item, *args))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Consumidor interrompeu a leitura: descarta tarefas ainda não iniciadas
+        for future in pending:
+            future.cancel()
@@ -156,6 +156,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             r'^/favicon.ico',        # Favicon
             r'^/health',             # Health check
             r'^/security/',          # Endpoints de segurança
+            r'^/cache/',             # Estatísticas de cache
             r'^/test',               # Endpoint de teste
         ]
 
@@ -2,7 +2,11 @@
 Router para endpoints de importação de alunos (processo multi-step)
 """
 from fastapi import APIRouter, UploadFile, File, Body, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from app.core.background_jobs import job_events_response
 from app.services.alunos_service import AlunosService
+from app.utils.upload_reader import open_upload_text, UploadError
 
 from typing import Dict, Any
 
@@ -17,32 +21,26 @@ async def import_alunos_step1(db: str, request: Request, file: UploadFile = File
     # Usar db diretamente do parâmetro de path
     db_name = db
 
-    content = await file.read()
-
-    # Tenta decodificar com diferentes encodings
-    file_content = None
-    encodings = ['utf-8', 'utf-8-sig', 'iso-8859-1', 'windows-1252', 'latin1']
-
-    for encoding in encodings:
-        try:
-            file_content = content.decode(encoding)
-            print(f"✅ Arquivo decodificado com sucesso usando: {encoding}")
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if file_content is None:
+    # Lê o upload em blocos e entrega um stream de texto
+    # Arquivos .csv.gz e .zip são descompactados durante a leitura; o limite de tamanho
+    # vale para o conteúdo descompactado (file.size é o tamanho do upload, só usado como estimativa)
+    try:
+        file_content, encoding = open_upload_text(file.file)
+    except UploadError as e:
         return {
             "success": False,
-            "message": "Não foi possível decodificar o arquivo. Certifique-se de que está em formato CSV válido.",
+            "message": str(e),
             "step": 1
         }
 
-    return AlunosService.step1_upload_validacao(
+    # Parse em thread (blocos grandes no pool de processos), sem bloquear o event loop
+    return await run_in_threadpool(
+        AlunosService.step1_upload_validacao,
         filename=file.filename,
         file_content=file_content,
         file_size=file.size,
-        db_name=db_name
+        db_name=db_name,
+        encoding=encoding
     )
 
 
@@ -74,7 +72,47 @@ async def import_alunos_step3(db: str, request: Request, request_data: dict = Bo
     db_name = db
 
     session_id = request_data.get("session_id")
-    return AlunosService.step3_validar_detectar_conflitos(session_id, db_name)
+    # Opcional: "file", "escola" ou "turma" (default: escopo gravado na sessão)
+    similar_names_scope = request_data.get("similar_names_scope")
+    # Opcional: "include_rows": true inclui as linhas na resposta (formato anterior);
+    # por padrão a resposta traz apenas resumo e contagens (linhas em /step3/rows)
+    include_rows = bool(request_data.get("include_rows"))
+
+    # Opcional: "background": true retorna o job imediatamente (andamento em /step3/status)
+    if request_data.get("background"):
+        return AlunosService.iniciar_step3_segundo_plano(session_id, db_name, similar_names_scope, include_rows)
+
+    # Validação em thread (nomes similares no pool de processos), sem bloquear o event loop
+    return await run_in_threadpool(
+        AlunosService.step3_validar_detectar_conflitos, session_id, db_name, similar_names_scope, include_rows
+    )
+
+
+@router.get("/step3/status")
+async def get_import_step3_status(db: str, session_id: str, job_id: str = None):
+    """
+    Andamento do passo 3 em segundo plano (linhas processadas, linhas/s, ETA e resultado ao final)
+    """
+    return AlunosService.obter_status_step3(session_id, job_id)
+
+
+@router.get("/step3/rows")
+async def get_import_step3_rows(db: str, session_id: str, category: str = "valid", offset: int = 0,
+                                limit: int = None, format: str = "json"):
+    """
+    Linhas do resultado do passo 3 por categoria (valid, conflict, invalid, duplicate,
+    special_chars, similar): página JSON (offset/limit) ou stream NDJSON (format=ndjson)
+    """
+    if format == "ndjson":
+        erro = AlunosService.verificar_linhas_step3(session_id, category)
+        if erro:
+            return erro
+        return StreamingResponse(
+            AlunosService.iterar_linhas_step3(session_id, category, offset, limit),
+            media_type="application/x-ndjson"
+        )
+
+    return AlunosService.obter_linhas_step3(session_id, category, offset, limit)
 
 
 @router.post("/step4")
@@ -99,9 +137,29 @@ async def import_alunos_step5(db: str, request: Request, request_data: dict = Bo
     db_name = db
 
     session_id = request_data.get("session_id")
+
+    # Opcional: "background": true retorna o job imediatamente (andamento em /events)
+    if request_data.get("background"):
+        return AlunosService.iniciar_step5_segundo_plano(session_id, db_name)
+
     return AlunosService.step5_importar_final(session_id, db_name)
 
 
+@router.get("/events")
+async def get_import_events(db: str, session_id: str, job_id: str = None):
+    """
+    Stream SSE (text/event-stream) do passo 3 ou 5 em segundo plano da sessão
+    (default: job mais recente): fase, linhas processadas, erros e linhas/s até o fim
+    """
+    job = AlunosService.obter_job_sessao(session_id, job_id)
+    if job is None:
+        return {
+            "success": False,
+            "message": "Nenhuma etapa em segundo plano encontrada para esta sessão."
+        }
+    return job_events_response(job)
+
+
 @router.get("/status")
 async def get_import_status(db: str, session_id: str):
     """
@@ -2,16 +2,19 @@
 Router para endpoints de importação de estrutura (Escola, Série, Turma)
 """
 from fastapi import APIRouter, UploadFile, File, Request
+from starlette.concurrency import run_in_threadpool
 from app.services.estrutura_service import EstruturaService
+from app.utils.upload_reader import open_upload_text, UploadError
 
 
 router = APIRouter(prefix="/{db}/import", tags=["Importação de Estrutura"])
 
 
 @router.post("/completo")
-async def import_completo(db: str, request: Request, file: UploadFile = File(...), dry_run: bool = False):
+async def import_completo(db: str, request: Request, file: UploadFile = File(...), dry_run: bool = False, background: bool = False):
     """
     Importa escola, série e turma de uma só vez a partir de arquivo CSV
+    (também aceita o CSV compactado em .csv.gz ou .zip com um único arquivo)
     Formato esperado: ESCOLA,SERIE,TURMA
     Exemplo: ANDRE FRANCO MONTORO,1ANO,A
 
@@ -23,31 +26,43 @@ async def import_completo(db: str, request: Request, file: UploadFile = File(...
     Parâmetros:
     - file: Arquivo CSV
     - dry_run: Se True, apenas valida sem importar (default: False)
+    - background: Se True, retorna o job imediatamente; andamento em /{db}/jobs/{job_id}/events (SSE)
     """
     try:
         # Usar db diretamente do parâmetro de path
         db_name = db
         print(f"🗄️ Usando banco: {db_name}")
 
-        # Lê conteúdo do arquivo
-        content = await file.read()
-
-        # Tenta decodificar com diferentes encodings
-        file_content = None
-        encodings = ['utf-8', 'utf-8-sig', 'iso-8859-1', 'windows-1252', 'latin1']
-
-        for encoding in encodings:
-            try:
-                file_content = content.decode(encoding)
-                print(f"✅ Arquivo decodificado com sucesso usando: {encoding}")
-                break
-            except UnicodeDecodeError:
-                continue
-
-        if file_content is None:
+        try:
+            # Lê o upload em blocos (com limite de tamanho) e entrega um stream de texto
+            # Arquivos .csv.gz e .zip são descompactados durante a leitura
+            file_content, encoding = open_upload_text(file.file)
+
+            # Em segundo plano: lê o arquivo inteiro aqui, pois o upload é fechado ao fim da requisição
+            if background:
+                file_text = await run_in_threadpool(file_content.read)
+                result = EstruturaService.iniciar_em_segundo_plano(
+                    file_text, db_name=db_name, dry_run=dry_run, file_size=file.size
+                )
+                result["encoding"] = encoding
+                return result
+
+            # Parse, validação e consultas rodam em thread (e o trabalho pesado de CPU no pool
+            # de processos), sem bloquear o event loop do worker
+            # Se dry_run, apenas valida
+            if dry_run:
+                result = await run_in_threadpool(
+                    EstruturaService.validar_estrutura_csv, file_content, db_name=db_name, dry_run=True, file_size=file.size
+                )
+            else:
+                # Importação real
+                result = await run_in_threadpool(
+                    EstruturaService.importar_estrutura, file_content, db_name=db_name, file_size=file.size
+                )
+        except UploadError as e:
             return {
                 "success": False,
-                "message": "Não foi possível decodificar o arquivo. Certifique-se de que está em formato CSV válido.",
+                "message": str(e),
                 "stats": {
                     "total_linhas": 0,
                     "escolas_criadas": 0,
@@ -57,12 +72,8 @@ async def import_completo(db: str, request: Request, file: UploadFile = File(...
                 }
             }
 
-        # Se dry_run, apenas valida
-        if dry_run:
-            return EstruturaService.validar_estrutura_csv(file_content, db_name=db_name, dry_run=True)
-
-        # Importação real
-        return EstruturaService.importar_estrutura(file_content, db_name=db_name)
+        result["encoding"] = encoding
+        return result
 
     except Exception as e:
         return {
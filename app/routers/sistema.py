@@ -5,7 +5,8 @@ from fastapi import APIRouter
 from datetime import datetime
 from app.core.database import get_db_connection
 from app.utils.text_utils import ai
-from app.core.cache import cached
+from app.core.cache import cached, cache_stats
+from app.core.background_jobs import get_job, job_events_response
 
 router = APIRouter(tags=["Sistema"])
 
@@ -61,6 +62,30 @@ async def test_endpoint(db: str):
     }
 
 
+@router.get("/{db}/jobs/{job_id}")
+async def get_job_status(db: str, job_id: str):
+    """Estado de um job em segundo plano (com o resultado, quando finalizado)"""
+    job = get_job(job_id)
+    # Jobs de outro banco não são expostos
+    if job is None or job.db_name != db:
+        return {"success": False, "message": "Job não encontrado."}
+
+    response = {"success": True, "job": job.to_dict()}
+    if not job.running:
+        response["result"] = job.result
+    return response
+
+
+@router.get("/{db}/jobs/{job_id}/events")
+async def get_job_events(db: str, job_id: str):
+    """Stream SSE (text/event-stream) do andamento de um job em segundo plano"""
+    job = get_job(job_id)
+    # Jobs de outro banco não são expostos
+    if job is None or job.db_name != db:
+        return {"success": False, "message": "Job não encontrado."}
+    return job_events_response(job)
+
+
 # Endpoints de segurança
 @router.get("/security/blocked-ips", tags=["Segurança"])
 async def get_blocked_ips():
@@ -86,3 +111,8 @@ async def security_stats():
         "total_attacks_detected": sum(attack_attempts.values())
     }
 
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Estatísticas dos caches por banco (escolas/séries/turmas e similaridade de escolas)"""
+    return cache_stats()
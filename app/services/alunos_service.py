@@ -2,52 +2,216 @@
 Serviço de importação de alunos
 Responsabilidade: Lógica de negócio para importação de alunos (multi-step)
 """
+import heapq
+import itertools
+import json
+import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Iterable, Optional, Union
+from app.core.background_jobs import Job, submit_job
+from app.core.config import CACHE_CONFIG, IMPORT_CONFIG
 from app.core.database import get_db_connection
-from app.utils.text_utils import normalize_text, has_special_characters, detect_similar_names, validate_email
+from app.utils.text_utils import (
+    normalize_text, has_special_characters, validate_email, find_special_characters, find_invalid_emails,
+    collation_key, CARACTERES_ESPECIAIS, EMAIL_INVALIDO, find_similar_names
+)
 from app.utils.csv_processor import parse_csv_basic
+from app.utils.columnar_rows import ColumnarRows
+from app.utils.row_records import RowRecords
+from app.utils.row_schema import Column, RowSchema, Validator
+from app.utils.upload_reader import UploadError
+from app.services.referencias_service import (
+    carregar_referencias, obter_referencias, recarregar_referencias,
+    chave_comparacao, localizar_escola, localizar_serie, localizar_turma
+)
 
 # Cache global para sessões de importação
 import_sessions = {}
+# Protege a marcação de importação em andamento (passo 5) das sessões
+_importacao_lock = threading.Lock()
+
+# Campos que delimitam o escopo da detecção de nomes similares:
+# nomes só são comparados com os nomes do mesmo escopo
+SIMILAR_NAMES_SCOPES = {
+    "file": (),
+    "escola": ("escola",),
+    "turma": ("escola", "serie", "turma"),
+}
+
+# Categorias de linhas do passo 3 consultadas em obter_linhas_step3 / iterar_linhas_step3
+# (categoria -> linhas dos resultados da validação gravados na sessão, ainda não serializadas)
+STEP3_ROW_CATEGORIES = {
+    "valid": lambda results: (v for v in results["valid_rows"] if not v.conflicts),
+    "conflict": lambda results: (v for v in results["valid_rows"] if v.conflicts),
+    "invalid": lambda results: results["invalid_rows"],
+    "duplicate": lambda results: results["duplicates"],
+    "special_chars": lambda results: results["special_chars_errors"],
+    "similar": lambda results: results["similar_names"],
+}
+
+
+def _iniciar_job_da_sessao(session_id: str, step: int, kind: str, operacao: str, db_name: Optional[str],
+                           func: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
+    """
+    Inicia func(*args) em segundo plano como job do passo da sessão (session["step{N}_job"]),
+    ou retorna o job desse passo que ainda está em andamento. O job fica associado ao
+    banco db_name (ou ao banco da sessão)
+    """
+    session = import_sessions[session_id]
+    chave = f"step{step}_job"
+    job = session.get(chave)
+    if job is not None and job.running:
+        return {
+            "success": True,
+            "message": f"{operacao} já está em andamento.",
+            "step": step,
+            "session_id": session_id,
+            "job": job.to_dict()
+        }
+
+    job = Job(kind, db_name or session.get("db_name"))
+    session[chave] = job
+    submit_job(job, func, *args)
+
+    return {
+        "success": True,
+        "message": f"{operacao} iniciada em segundo plano.",
+        "step": step,
+        "session_id": session_id,
+        "job": job.to_dict()
+    }
+
+
+def _localizar_referencias(referencias: Dict[str, Any], row_data: Dict[str, str], cursor=None) -> tuple:
+    """
+    IDs da escola e da série da linha nas referências (None se não existem) e se a turma
+    existe para essa escola e série (False se escola ou série não existem)
+    O cursor é usado se a collation das colunas exigir a comparação no banco
+    """
+    escola_id = localizar_escola(referencias, row_data['escola'], cursor)
+    serie_id = localizar_serie(referencias, row_data['serie'], cursor)
+    turma_exists = (escola_id is not None and serie_id is not None
+                    and localizar_turma(referencias, row_data['turma'], serie_id, escola_id, cursor) is not None)
+    return escola_id, serie_id, turma_exists
+
+
+def _buscar_alunos_por_ra(cursor, ras: Iterable[str], em_memoria: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Busca os alunos já cadastrados com os RAs informados, em consultas "IN (...)"
+    de até IMPORT_CONFIG['ra_lookup_chunk_size'] RAs (em vez de uma consulta por linha)
+    Sem em_memoria (collation de a_matricula diferente de utf8mb4_general_ci), uma
+    consulta por RA, com a comparação do banco
+
+    Returns:
+        Dict chave_comparacao(RA) -> {"a_id", "a_usuario", "u_nome"} do aluno existente
+        (collation_key do RA; sem em_memoria, o RA do arquivo)
+    """
+    ras = list(dict.fromkeys(ra for ra in ras if ra))
+    chunk_size = IMPORT_CONFIG["ra_lookup_chunk_size"]
+    alunos = {}
+
+    if not em_memoria:
+        for ra in ras:
+            cursor.execute(
+                "SELECT a.a_id, a.a_usuario, a.a_matricula, u.u_nome FROM alunos a INNER JOIN usuarios u ON u.u_id = a.a_usuario "
+                "WHERE a.a_matricula = %s ORDER BY a.a_id LIMIT 1",
+                (ra,)
+            )
+            aluno = cursor.fetchone()
+            if aluno is not None:
+                alunos[ra] = aluno
+        return alunos
+
+    for start in range(0, len(ras), chunk_size):
+        chunk = ras[start:start + chunk_size]
+        cursor.execute(
+            "SELECT a.a_id, a.a_usuario, a.a_matricula, u.u_nome FROM alunos a INNER JOIN usuarios u ON u.u_id = a.a_usuario "
+            f"WHERE a.a_matricula IN ({', '.join(['%s'] * len(chunk))}) ORDER BY a.a_id",
+            tuple(chunk)
+        )
+        for aluno in cursor.fetchall():
+            alunos.setdefault(collation_key(aluno['a_matricula']), aluno)
+
+    return alunos
+
+
+def _serializar_resultados(validation_results: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Resultados do passo 3 prontos para JSON: as listas de linhas com os dados de cada linha"""
+    if validation_results is None:
+        return None
+
+    linhas = validation_results["rows"]
+    return {
+        chave: linhas.serialize_all(valor) if isinstance(valor, list) else valor
+        for chave, valor in validation_results.items() if chave != "rows"
+    }
+
+
+# Validação de caracteres especiais em campos de texto (exceto email)
+SEM_CARACTERES_ESPECIAIS = Validator(
+    lambda value: not has_special_characters(value),
+    CARACTERES_ESPECIAIS,
+    "Campo '{label}' contém caracteres especiais não permitidos: '{value}'",
+    batch=find_special_characters
+)
+
+# Esquema de validação das linhas de alunos (passo 3)
+ALUNOS_ROW_SCHEMA = RowSchema([
+    Column("nome", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+    Column("ra", required=True),
+    # Email: manter minúsculas, apenas trim; validado apenas se preenchido
+    Column("email", normalizer=str.lower, validators=(
+        Validator(
+            lambda value: validate_email(value)["valid"],
+            EMAIL_INVALIDO,
+            "Email inválido: '{value}'",
+            batch=find_invalid_emails
+        ),
+    )),
+    Column("escola", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+    Column("serie", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+    Column("turma", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+])
 
 
 class AlunosService:
     """Serviço para gerenciar importação de alunos (processo multi-step)"""
     
     @staticmethod
-    def step1_upload_validacao(filename: str, file_content: str, file_size: int, db_name: str = None) -> Dict[str, Any]:
+    def step1_upload_validacao(filename: str, file_content: Union[str, Iterable[str]], file_size: int, db_name: str = None, encoding: str = None) -> Dict[str, Any]:
         """
         Passo 1: Upload e validação inicial do arquivo CSV de alunos
 
         Args:
             filename: Nome do arquivo
-            file_content: Conteúdo do arquivo
-            file_size: Tamanho do arquivo em bytes
+            file_content: Conteúdo do arquivo (texto completo ou stream de texto lido linha a linha)
+            file_size: Tamanho do upload em bytes (compactado, em .gz/.zip), usado apenas para decidir o
+                parse paralelo; o limite IMPORT_CONFIG['max_file_size'] vale para o conteúdo descompactado
+                e é verificado durante a leitura do stream (UploadTooLargeError)
             db_name: Nome do banco de dados
+            encoding: Encoding detectado no upload (informativo)
 
         Returns:
             Dict com resultado da validação e session_id
         """
         try:
             # Validação do arquivo
-            if not filename.lower().endswith('.csv'):
+            if not filename.lower().endswith(tuple(IMPORT_CONFIG["allowed_extensions"])):
                 return {
                     "success": False,
-                    "message": "Formato de arquivo inválido. Apenas arquivos CSV são aceitos.",
+                    "message": "Formato de arquivo inválido. Apenas arquivos CSV são aceitos (.csv, .csv.gz ou .zip).",
                     "step": 1
                 }
             
-            if file_size > 25 * 1024 * 1024:  # 25MB
-                return {
-                    "success": False,
-                    "message": "Arquivo muito grande. Tamanho máximo: 25MB.",
-                    "step": 1
-                }
-            
-            # Parse básico do CSV
-            parse_result = parse_csv_basic(file_content)
+            # Parse básico do CSV, já normalizando as células (maiúsculas + trim)
+            # durante a leitura e guardando as linhas em formato colunar na sessão
+            parse_result = parse_csv_basic(
+                file_content,
+                cell_transform=str.upper,
+                data_rows=ColumnarRows(),
+                size_hint=file_size
+            )
             
             if not parse_result["success"]:
                 return {
@@ -57,34 +221,29 @@ class AlunosService:
                 }
             
             headers = parse_result["headers"]
-            data_rows = parse_result["data_rows"]
-
-            # Normalizar dados: converter para maiúsculas e fazer trim
-            normalized_rows = []
-            for row in data_rows:
-                normalized_row = []
-                for cell in row:
-                    if isinstance(cell, str):
-                        # Converter para maiúsculas e remover espaços no início/fim
-                        normalized_cell = cell.upper().strip()
-                        normalized_row.append(normalized_cell)
-                    else:
-                        normalized_row.append(cell)
-                normalized_rows.append(normalized_row)
+            normalized_rows = parse_result["data_rows"].freeze()
+
+            # Escopo padrão da detecção de nomes similares (gravado na sessão para o resultado ser reproduzível)
+            similar_names_scope = IMPORT_CONFIG["similar_names_scope"]
+            if similar_names_scope not in SIMILAR_NAMES_SCOPES:
+                print(f"⚠️ Escopo de nomes similares inválido na configuração: '{similar_names_scope}'. Usando 'file'")
+                similar_names_scope = "file"
 
             # Cria sessão de importação
             session_id = f"import_{int(time.time())}_{filename}"
             import_sessions[session_id] = {
                 "step": 1,
                 "filename": filename,
+                "encoding": encoding,
                 "headers": headers,
-                "data_rows": normalized_rows,  # Usar dados normalizados
+                "data_rows": normalized_rows,  # Dados normalizados (ColumnarRows)
                 "total_rows": len(normalized_rows),
                 "created_at": datetime.now().isoformat(),
                 "mapping": {},
                 "validation_results": None,
                 "conflicts": [],
                 "import_results": None,
+                "similar_names_scope": similar_names_scope,
                 "db_name": db_name  # Armazenar db_name na sessão
             }
             
@@ -95,12 +254,20 @@ class AlunosService:
                 "session_id": session_id,
                 "data": {
                     "filename": filename,
+                    "encoding": encoding,
                     "total_rows": len(normalized_rows),
                     "headers": headers,
                     "preview": normalized_rows[:5]  # Primeiras 5 linhas
                 }
             }
             
+        except UploadError as e:
+            return {
+                "success": False,
+                "message": str(e),
+                "step": 1
+            }
+
         except Exception as e:
             return {
                 "success": False,
@@ -231,38 +398,95 @@ class AlunosService:
             }
 
     @staticmethod
-    def step3_validar_detectar_conflitos(session_id: str, db_name: str = None) -> Dict[str, Any]:
+    def _verificar_step3(session_id: str, similar_names_scope: str = None) -> Optional[Dict[str, Any]]:
+        """Verifica se o passo 3 pode ser executado; retorna a resposta de erro ou None"""
+        if session_id not in import_sessions:
+            return {
+                "success": False,
+                "message": "Sessão de importação não encontrada.",
+                "step": 3
+            }
+
+        if import_sessions[session_id]["step"] < 2:
+            return {
+                "success": False,
+                "message": "É necessário completar o mapeamento primeiro.",
+                "step": 3
+            }
+
+        if similar_names_scope and similar_names_scope not in SIMILAR_NAMES_SCOPES:
+            return {
+                "success": False,
+                "message": f"Escopo de nomes similares inválido: '{similar_names_scope}'. Use: {', '.join(SIMILAR_NAMES_SCOPES)}",
+                "step": 3
+            }
+
+        return None
+
+    @staticmethod
+    def _reservar_step3(session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Marca a validação da sessão como em andamento (session["validando"]); retorna a
+        resposta de erro se já houver uma validação da sessão em andamento (síncrona ou job)
+        """
+        # Uma validação por sessão: execuções simultâneas alterariam os mesmos resultados na sessão
+        with _importacao_lock:
+            session = import_sessions[session_id]
+            job = session.get("step3_job")
+            if session.get("validando") or (job is not None and job.running):
+                return {
+                    "success": False,
+                    "message": "A validação ainda está em andamento.",
+                    "step": 3
+                }
+            session["validando"] = True
+        return None
+
+    @staticmethod
+    def step3_validar_detectar_conflitos(session_id: str, db_name: str = None, similar_names_scope: str = None,
+                                         include_rows: bool = False, progress: Callable[..., None] = None) -> Dict[str, Any]:
         """
         Passo 3: Validação e detecção de conflitos
 
         Args:
             session_id: ID da sessão de importação
             db_name: Nome do banco de dados
+            similar_names_scope: Escopo da detecção de nomes similares ("file", "escola" ou "turma");
+                se informado, substitui o escopo gravado na sessão
+            include_rows: Inclui as linhas no corpo da resposta (formato anterior); por padrão
+                retorna apenas resumo e contagens, e as linhas são consultadas em obter_linhas_step3
+            progress: Função opcional chamada com (fase, linhas processadas, total de linhas[, linhas inválidas])
 
         Returns:
             Dict com resultado da validação e conflitos detectados
         """
-        try:
-            if session_id not in import_sessions:
-                return {
-                    "success": False,
-                    "message": "Sessão de importação não encontrada.",
-                    "step": 3
-                }
+        erro = AlunosService._verificar_step3(session_id, similar_names_scope) or AlunosService._reservar_step3(session_id)
+        if erro:
+            return erro
 
+        return AlunosService._executar_step3(session_id, db_name, similar_names_scope, include_rows, progress)
+
+    @staticmethod
+    def _executar_step3(session_id: str, db_name: str = None, similar_names_scope: str = None,
+                        include_rows: bool = False, progress: Callable[..., None] = None) -> Dict[str, Any]:
+        """
+        Validação do passo 3 já reservada (_reservar_step3); libera a sessão ao final
+        (argumentos como em step3_validar_detectar_conflitos)
+        """
+        try:
             session = import_sessions[session_id]
-            if session["step"] < 2:
-                return {
-                    "success": False,
-                    "message": "É necessário completar o mapeamento primeiro.",
-                    "step": 3
-                }
 
             # Usar db_name da sessão ou do parâmetro
             if db_name:
                 session["db_name"] = db_name
             db_name = session.get("db_name")
 
+            # Usar escopo de nomes similares do parâmetro ou da sessão
+            if similar_names_scope:
+                session["similar_names_scope"] = similar_names_scope
+            similar_names_scope = session.get("similar_names_scope", "file")
+            scope_fields = SIMILAR_NAMES_SCOPES[similar_names_scope]
+
             headers = session["headers"]
             data_rows = session["data_rows"]
             mapping = session["mapping"]
@@ -274,15 +498,90 @@ class AlunosService:
                     field_indices[field] = int(col_index)
 
             validation_results = {
+                # Cada linha guardada uma única vez; as listas abaixo guardam o registro (valid_rows,
+                # invalid_rows) ou referenciam a linha por row_index, sem cópia dos dados
+                "rows": RowRecords(field_indices),
                 "valid_rows": [],
                 "invalid_rows": [],
                 "warnings": [],
                 "conflicts": [],
                 "duplicates": [],  # Duplicatas no arquivo
                 "special_chars_errors": [],  # Erros de caracteres especiais
-                "similar_names": []  # Nomes similares (warnings)
+                "similar_names": [],  # Nomes similares (warnings), os mais similares primeiro
+                "similar_names_count": 0  # Total exato de pares similares (a lista é limitada)
             }
 
+            total_linhas = len(data_rows)
+            if progress is None:
+                progress = lambda *andamento: None
+            progress_interval = IMPORT_CONFIG["progress_interval"]
+
+            # Resultados reaproveitados entre execuções do passo 3 na sessão (ex.: após corrigir
+            # uma coluna no passo 2): validação por (campo, coluna), alunos por RA e nomes similares
+            step3_cache = session.setdefault("step3_cache", {"campos": {}, "alunos_por_ra": None, "nomes_similares": None})
+
+            # Fases de CPU antes de abrir a conexão com o banco:
+            # Extrair e validar dados de todas as linhas baseado no mapeamento
+            # (validadores de email e caracteres especiais rodam uma vez por coluna;
+            # apenas os campos com coluna nova no mapeamento são validados novamente)
+            progress("validacao_campos", 0, total_linhas)
+            campos_em_cache = step3_cache["campos"]
+            if total_linhas > IMPORT_CONFIG["step3_field_cache_max_rows"]:
+                # Arquivo grande: um resultado por linha e campo na sessão ocuparia mais que as próprias colunas
+                campos_em_cache.clear()
+                validacoes = ALUNOS_ROW_SCHEMA.validate_rows(data_rows, field_indices)
+                print(f"🔁 Passo 3: {len(field_indices)} campo(s) validado(s), sem reaproveitamento ({total_linhas} linhas)")
+            else:
+                campos_novos = [campo for campo in field_indices.items() if campo not in campos_em_cache]
+                validacoes = ALUNOS_ROW_SCHEMA.validate_rows(data_rows, field_indices, cache=campos_em_cache)
+                # Manter apenas os campos do mapeamento atual
+                for campo in [campo for campo in campos_em_cache if campo not in field_indices.items()]:
+                    del campos_em_cache[campo]
+                print(f"🔁 Passo 3: {len(campos_novos)} campo(s) validado(s), "
+                      f"{len(field_indices) - len(campos_novos)} reaproveitado(s) da execução anterior")
+
+            # Detectar duplicatas completas (todas as colunas iguais)
+            rows_hash = {}
+            duplicate_of = {}
+            # Nomes para a detecção de similares: (escopo, nome) das linhas não duplicadas
+            # (ex.: escopo escola+série+turma -> nomes só são comparados dentro da mesma turma)
+            nomes = []
+            linhas_dos_nomes = []
+            for row_index, (row_data, _, _) in enumerate(validacoes):
+                row_hash = "|".join([str(row_data.get(f, "")) for f in ['nome', 'ra', 'escola', 'serie', 'turma']])
+                if row_hash in rows_hash:
+                    duplicate_of[row_index] = rows_hash[row_hash]
+                    continue
+                rows_hash[row_hash] = row_index
+
+                if row_data.get('nome'):
+                    nomes.append((tuple(row_data.get(campo, "") for campo in scope_fields), row_data['nome']))
+                    linhas_dos_nomes.append(row_index)
+
+            # Detectar nomes similares (70% de similaridade), cada nome contra os anteriores do mesmo
+            # escopo; arquivos grandes são processados em blocos no pool de processos.
+            # Por nome, apenas a contagem e os similar_names_per_row mais similares são mantidos
+            # (mais similar primeiro); reaproveitados se nomes, escopos e linhas duplicadas não
+            # mudaram desde a última execução (a sessão guarda só o hash da entrada, sem os nomes)
+            progress("nomes_similares", 0, len(nomes))
+            similares_por_linha_max = IMPORT_CONFIG["similar_names_per_row"]
+            entrada_similares = hash((tuple(nomes), IMPORT_CONFIG["phonetic_blocking"], similares_por_linha_max))
+            if step3_cache["nomes_similares"] is not None and step3_cache["nomes_similares"][0] == entrada_similares:
+                similares = step3_cache["nomes_similares"][1]
+                progress("nomes_similares", len(nomes), len(nomes))
+            else:
+                similares = {
+                    posicao: (len(similares_nome), heapq.nlargest(similares_por_linha_max, similares_nome,
+                                                                  key=lambda s: s["similaridade"]))
+                    for posicao, similares_nome in find_similar_names(
+                        nomes, threshold=0.7, blocking=IMPORT_CONFIG["phonetic_blocking"],
+                        progress=lambda feitos, total: progress("nomes_similares", feitos, total),
+                        parallel_threshold=IMPORT_CONFIG["parallel_similarity_threshold"]
+                    ).items()
+                }
+                step3_cache["nomes_similares"] = (entrada_similares, similares)
+            similares_por_linha = {linhas_dos_nomes[posicao]: similar for posicao, similar in similares.items()}
+
             # Validar cada linha
             with get_db_connection() as connection:
                 cursor = connection.cursor(dictionary=True)
@@ -292,106 +591,93 @@ class AlunosService:
                 cursor.execute("SELECT 1")
                 result = cursor.fetchone()
 
-                # Verificar se o banco tem dados reais
+                # Verificar se o banco tem dados reais (consulta no banco: o cache de referências
+                # de cada worker pode ainda não ter as escolas de uma importação de estrutura recente)
                 # Se não houver escolas cadastradas, assumir modo DEMO
                 cursor.execute("SELECT COUNT(*) as total FROM instituicoes")
-                count_result = cursor.fetchone()
-                has_data = count_result and count_result['total'] > 0
+                has_data = cursor.fetchone()["total"] > 0
 
                 demo_mode = not has_data
                 print(f"🔍 Modo de operação: {'DEMO (sem dados no banco)' if demo_mode else 'PRODUÇÃO (com dados no banco)'}")
 
+                # Escolas, séries e turmas do banco em memória (cache por banco, em vez de três consultas por linha);
+                # recarregadas uma vez se o cache estiver vazio ou não tiver a escola/série/turma de uma linha
+                referencias = None
+                referencias_recarregadas = False
+                if not demo_mode:
+                    referencias = obter_referencias(db_name, connection)
+                    if referencias["totais"]["instituicoes"] == 0:
+                        referencias = recarregar_referencias(db_name, connection)
+                        referencias_recarregadas = True
+
+                # Alunos já cadastrados com os RAs do arquivo (consultas IN em blocos, em vez de uma por linha),
+                # reaproveitados enquanto banco e coluna do RA forem os mesmos, por até reference_ttl segundos
+                # (descartados pelo passo 5, que consulta novamente)
+                alunos_existentes = {}
+                if not demo_mode:
+                    chave_ras = (db_name, field_indices.get('ra'), referencias["comparacao_em_memoria"])
+                    alunos_por_ra = step3_cache["alunos_por_ra"]
+                    if (alunos_por_ra is None or alunos_por_ra[0] != chave_ras
+                            or time.monotonic() - alunos_por_ra[1] >= CACHE_CONFIG["reference_ttl"]):
+                        step3_cache["alunos_por_ra"] = alunos_por_ra = (
+                            chave_ras, time.monotonic(),
+                            _buscar_alunos_por_ra(cursor, (row_data.get('ra') for row_data, _, _ in validacoes),
+                                                  referencias["comparacao_em_memoria"])
+                        )
+                    alunos_existentes = alunos_por_ra[2]
+
                 # Cache para detectar RAs duplicados no mesmo arquivo
                 ras_encontrados = {}
-                # Cache para detectar duplicatas completas (todas as colunas iguais)
-                rows_hash = {}
-                # Cache para detectar nomes similares
-                nomes_processados = []
-                
-                for row_index, row in enumerate(data_rows):
+                # Nomes similares guardados: os similar_names_per_row mais similares de cada linha e, no total,
+                # os similar_names_max_stored mais similares (heap mínimo pela chave de ordenação)
+                similares_max = IMPORT_CONFIG["similar_names_max_stored"]
+                similares_guardados = []
+
+                for row_index, (row_data, field_errors, _) in enumerate(validacoes):
+                    if row_index % progress_interval == 0:
+                        progress("conflitos", row_index, total_linhas, len(validation_results["invalid_rows"]))
+                    registro = validation_results["rows"].add(row_data)
                     try:
-                        row_data = {}
-                        is_valid = True
-                        row_errors = []
-
-                        # Extrair dados da linha baseado no mapeamento
-                        for field, col_index in field_indices.items():
-                            if col_index < len(row):
-                                value = row[col_index].strip()
+                        is_valid = not field_errors
+                        row_errors = [message for _, _, message in field_errors]
 
-                                # Email: manter minúsculas, apenas trim
-                                if field == 'email':
-                                    value = value.lower().strip()
-
-                                row_data[field] = value
-
-                                # Validação de campos obrigatórios
-                                if field in ['nome', 'escola', 'serie', 'turma', 'ra'] and not value:
-                                    is_valid = False
-                                    row_errors.append(f"Campo '{field}' é obrigatório")
-
-                                # Validação de email (se preenchido)
-                                if field == 'email' and value:
-                                    email_validation = validate_email(value)
-                                    if not email_validation["valid"]:
-                                        is_valid = False
-                                        row_errors.append(email_validation["error"])
-
-                                # Validação de caracteres especiais em campos de texto (exceto email)
-                                if field in ['nome', 'escola', 'serie', 'turma'] and value:
-                                    if has_special_characters(value):
-                                        is_valid = False
-                                        row_errors.append(f"Campo '{field}' contém caracteres especiais não permitidos: '{value}'")
-                                        validation_results["special_chars_errors"].append({
-                                            "row_index": row_index,
-                                            "field": field,
-                                            "value": value,
-                                            "data": row_data.copy()
-                                        })
-                            else:
-                                row_data[field] = ""
-                                if field in ['nome', 'escola', 'serie', 'turma', 'ra']:
-                                    is_valid = False
-                                    row_errors.append(f"Campo '{field}' não encontrado")
+                        for field, code, _ in field_errors:
+                            if code == CARACTERES_ESPECIAIS:
+                                validation_results["special_chars_errors"].append({
+                                    "row_index": row_index,
+                                    "field": field,
+                                    "value": row_data[field]
+                                })
 
-                        # Detectar duplicatas completas (todas as colunas iguais)
-                        row_hash = "|".join([str(row_data.get(f, "")) for f in ['nome', 'ra', 'escola', 'serie', 'turma']])
-                        if row_hash in rows_hash:
+                        if row_index in duplicate_of:
                             # Linha duplicada encontrada
                             validation_results["duplicates"].append({
                                 "row_index": row_index,
-                                "duplicate_of": rows_hash[row_hash],
-                                "data": row_data.copy()
+                                "duplicate_of": duplicate_of[row_index]
                             })
                             # Ignorar linha duplicada (não processar)
                             continue
-                        else:
-                            rows_hash[row_hash] = row_index
-
-                        # Detectar nomes similares (70% de similaridade)
-                        if row_data.get('nome'):
-                            similar_names = detect_similar_names(
-                                row_data['nome'],
-                                nomes_processados,
-                                threshold=0.7
-                            )
 
-                            if similar_names:
-                                for similar in similar_names:
-                                    validation_results["similar_names"].append({
-                                        "row_index": row_index,
-                                        "nome_atual": row_data['nome'],
-                                        "nome_similar": similar["nome_existente"],
-                                        "similaridade": similar["similaridade"],
-                                        "linha_similar": similar.get("row_index"),
-                                        "data": row_data.copy()
-                                    })
+                        contagem_similares, similares_linha = similares_por_linha.get(row_index, (0, ()))
+                        validation_results["similar_names_count"] += contagem_similares
+                        for similar in similares_linha:
+                            linha_similar = linhas_dos_nomes[similar["id_existente"]]
+                            # Mais similar primeiro; empate: linhas anteriores primeiro (chave única por par)
+                            chave = (similar["similaridade"], -row_index, -linha_similar)
+                            if len(similares_guardados) >= similares_max and chave <= similares_guardados[0][0]:
+                                continue
 
-                            # Adicionar nome ao cache
-                            nomes_processados.append({
-                                "nome": row_data['nome'],
-                                "row_index": row_index
+                            entrada = (chave, {
+                                "row_index": row_index,
+                                "nome_atual": row_data['nome'],
+                                "nome_similar": similar["nome_existente"],
+                                "similaridade": similar["similaridade"],
+                                "linha_similar": linha_similar
                             })
+                            if len(similares_guardados) < similares_max:
+                                heapq.heappush(similares_guardados, entrada)
+                            else:
+                                heapq.heapreplace(similares_guardados, entrada)
 
                         if is_valid:
                             # Verificar se entidades obrigatórias existem
@@ -401,27 +687,25 @@ class AlunosService:
                                 print(f"🔍 DEMO MODE - Aceitando linha {row_index}: {row_data}")
                                 pass  # Aceitar todos os dados em modo DEMO
                             else:
+                                escola_id, serie_id, turma_exists = _localizar_referencias(referencias, row_data, cursor)
+                                if not turma_exists and not referencias_recarregadas:
+                                    # Pode ter sido criada depois do cache deste worker: confirmar no banco
+                                    referencias = recarregar_referencias(db_name, connection)
+                                    referencias_recarregadas = True
+                                    escola_id, serie_id, turma_exists = _localizar_referencias(referencias, row_data, cursor)
+
                                 # Verificar escola
-                                cursor.execute("SELECT i_id FROM instituicoes WHERE i_nome = %s", (row_data['escola'],))
-                                escola_exists = cursor.fetchone()
-                                if not escola_exists:
+                                if escola_id is None:
                                     is_valid = False
                                     row_errors.append(f"Escola '{row_data['escola']}' não existe no sistema")
 
                                 # Verificar série
-                                cursor.execute("SELECT s_id FROM series WHERE s_nome = %s", (row_data['serie'],))
-                                serie_exists = cursor.fetchone()
-                                if not serie_exists:
+                                if serie_id is None:
                                     is_valid = False
                                     row_errors.append(f"Série '{row_data['serie']}' não existe no sistema")
 
                                 # Verificar turma (se escola e série existem)
-                                if escola_exists and serie_exists:
-                                    cursor.execute(
-                                        "SELECT t_id FROM turmas WHERE t_nome = %s AND t_serie = %s AND t_instituicao = %s",
-                                        (row_data['turma'], serie_exists['s_id'], escola_exists['i_id'])
-                                    )
-                                    turma_exists = cursor.fetchone()
+                                if escola_id is not None and serie_id is not None:
                                     if not turma_exists:
                                         is_valid = False
                                         row_errors.append(f"Turma '{row_data['turma']}' não existe para a escola '{row_data['escola']}' e série '{row_data['serie']}'")
@@ -436,6 +720,7 @@ class AlunosService:
                             if ra:
                                 if ra in ras_encontrados:
                                     conflicts.append({
+                                        "row_index": row_index,
                                         "type": "ra_duplicado_arquivo",
                                         "field": "ra", 
                                         "value": ra,
@@ -447,53 +732,35 @@ class AlunosService:
 
                             # Verificar se aluno já existe por RA (matrícula)
                             if 'ra' in row_data and row_data['ra']:
-                                if demo_mode:
-                                    # Em modo DEMO, simular que não há conflitos iniciais
-                                    aluno_existente = None
-                                else:
-                                    cursor.execute(
-                                        "SELECT a.a_id, a.a_usuario, u.u_nome FROM alunos a INNER JOIN usuarios u ON u.u_id = a.a_usuario WHERE a.a_matricula = %s", 
-                                        (row_data['ra'],)
-                                    )
-                                    aluno_existente = cursor.fetchone()
+                                # Em modo DEMO, simular que não há conflitos iniciais (nenhum aluno buscado)
+                                aluno_existente = alunos_existentes.get(chave_comparacao(referencias, row_data['ra']))
                                 
                                 if aluno_existente:
                                     conflicts.append({
+                                        "row_index": row_index,
                                         "type": "aluno_duplicado",
                                         "field": "ra",
                                         "value": row_data['ra'],
                                         "message": f"Aluno com RA '{row_data['ra']}' já existe no sistema (Nome: {aluno_existente['u_nome']})",
                                         "existing_id": aluno_existente['a_id'],
-                                        "existing_name": aluno_existente['u_nome'],
-                                        "data": row_data.copy()  # Incluir dados completos
+                                        "existing_name": aluno_existente['u_nome']
                                     })
 
-                            validation_results["valid_rows"].append({
-                                "row_index": row_index,
-                                "data": row_data,
-                                "conflicts": conflicts
-                            })
-
-                            if conflicts:
-                                validation_results["conflicts"].extend([{
-                                    "row_index": row_index,
-                                    "data": conflict.get("data", row_data.copy()),  # Garantir que tenha dados
-                                    **conflict
-                                } for conflict in conflicts])
+                            # Os mesmos dicts de conflito ficam na linha e na lista de conflitos
+                            registro.conflicts = conflicts or None
+                            validation_results["valid_rows"].append(registro)
+                            validation_results["conflicts"].extend(conflicts)
 
                         else:
-                            validation_results["invalid_rows"].append({
-                                "row_index": row_index,
-                                "data": row_data,
-                                "errors": row_errors
-                            })
+                            registro.errors = row_errors
+                            validation_results["invalid_rows"].append(registro)
 
                     except Exception as e:
-                        validation_results["invalid_rows"].append({
-                            "row_index": row_index,
-                            "data": {},
-                            "errors": [f"Erro no processamento da linha: {str(e)}"]
-                        })
+                        registro.errors = [f"Erro no processamento da linha: {str(e)}"]
+                        validation_results["invalid_rows"].append(registro)
+
+                validation_results["similar_names"] = [finding for _, finding in sorted(similares_guardados, reverse=True)]
+                progress("conflitos", total_linhas, total_linhas, len(validation_results["invalid_rows"]))
 
             # Salvar resultados na sessão
             session["validation_results"] = validation_results
@@ -501,8 +768,8 @@ class AlunosService:
             session["step"] = 3
 
             # Separar alunos válidos (sem conflitos) de alunos com conflitos
-            valid_rows_without_conflicts = [v for v in validation_results["valid_rows"] if not v.get("conflicts")]
-            valid_rows_with_conflicts = [v for v in validation_results["valid_rows"] if v.get("conflicts")]
+            valid_rows_without_conflicts = [v for v in validation_results["valid_rows"] if not v.conflicts]
+            valid_rows_with_conflicts = [v for v in validation_results["valid_rows"] if v.conflicts]
 
             # Log dos resultados
             print(f"📊 Validação concluída:")
@@ -512,46 +779,58 @@ class AlunosService:
             print(f"   ⚠️  Conflitos: {len(validation_results['conflicts'])}")
             print(f"   🔄 Duplicatas: {len(validation_results['duplicates'])}")
             print(f"   ⚠️  Caracteres especiais: {len(validation_results['special_chars_errors'])}")
-            print(f"   👥 Nomes similares: {len(validation_results['similar_names'])}")
+            print(f"   👥 Nomes similares: {validation_results['similar_names_count']} (escopo: {similar_names_scope}, "
+                  f"{len(validation_results['similar_names'])} guardados)")
 
             if validation_results["invalid_rows"]:
                 print(f"\n❌ Detalhes das linhas inválidas:")
                 for invalid_row in validation_results["invalid_rows"][:5]:  # Mostrar apenas as primeiras 5
-                    print(f"   Linha {invalid_row['row_index']}: {invalid_row['errors']}")
-                    print(f"   Dados: {invalid_row['data']}")
+                    print(f"   Linha {invalid_row.row_index}: {invalid_row.errors}")
+                    print(f"   Dados: {validation_results['rows'].data(invalid_row.row_index)}")
+
+            data = {
+                "valid_rows": len(valid_rows_without_conflicts),  # Apenas alunos SEM conflitos
+                "valid_rows_with_conflicts": len(valid_rows_with_conflicts),  # Alunos COM conflitos
+                "invalid_rows": len(validation_results["invalid_rows"]),
+                "conflicts_count": len(validation_results["conflicts"]),
+                "duplicates_count": len(validation_results["duplicates"]),
+                "special_chars_count": len(validation_results["special_chars_errors"]),
+                "similar_names_count": validation_results["similar_names_count"],  # Total exato
+                "similar_names_scope": similar_names_scope,
+                # Linhas de cada categoria: paginadas ou em NDJSON (obter_linhas_step3)
+                "row_categories": list(STEP3_ROW_CATEGORIES),
+                "summary": {
+                    "total_rows": len(data_rows),
+                    "total_linhas": len(data_rows),
+                    "linhas_validas": len(valid_rows_without_conflicts),
+                    "linhas_com_conflitos": len(valid_rows_with_conflicts),
+                    "linhas_invalidas": len(validation_results["invalid_rows"]),
+                    "conflitos_detectados": len(validation_results["conflicts"]),
+                    "duplicatas_detectadas": len(validation_results["duplicates"]),
+                    "caracteres_especiais": len(validation_results["special_chars_errors"]),
+                    "nomes_similares": validation_results["similar_names_count"]
+                }
+            }
+
+            if include_rows:
+                # Resposta completa anterior (compatibilidade): todas as linhas válidas no corpo
+                linhas = validation_results["rows"]
+                data.update({
+                    "conflicts": linhas.serialize_all(validation_results["conflicts"][:10]),
+                    "invalid_rows_data": linhas.serialize_all(validation_results["invalid_rows"][:20]),  # Retornar até 20 linhas inválidas
+                    "valid_rows_data": [linhas.data(v.row_index) for v in valid_rows_without_conflicts],  # Apenas alunos SEM conflitos
+                    "valid_rows_with_conflicts_data": [linhas.data(v.row_index) for v in valid_rows_with_conflicts],  # Alunos COM conflitos
+                    "duplicates": linhas.serialize_all(validation_results["duplicates"][:10]),  # Retornar até 10 duplicatas
+                    "special_chars_errors": linhas.serialize_all(validation_results["special_chars_errors"][:10]),  # Retornar até 10 erros de caracteres especiais
+                    "similar_names": linhas.serialize_all(validation_results["similar_names"][:20]),  # Retornar os 20 nomes mais similares
+                })
 
             return {
                 "success": True,
                 "message": "Validação concluída com sucesso!",
                 "step": 3,
                 "session_id": session_id,
-                "data": {
-                    "valid_rows": len(valid_rows_without_conflicts),  # Apenas alunos SEM conflitos
-                    "valid_rows_with_conflicts": len(valid_rows_with_conflicts),  # Alunos COM conflitos
-                    "invalid_rows": len(validation_results["invalid_rows"]),
-                    "conflicts_count": len(validation_results["conflicts"]),
-                    "duplicates_count": len(validation_results["duplicates"]),
-                    "special_chars_count": len(validation_results["special_chars_errors"]),
-                    "similar_names_count": len(validation_results["similar_names"]),
-                    "conflicts": validation_results["conflicts"][:10],
-                    "invalid_rows_data": validation_results["invalid_rows"][:20],  # Retornar até 20 linhas inválidas
-                    "valid_rows_data": [v["data"] for v in valid_rows_without_conflicts],  # Apenas alunos SEM conflitos
-                    "valid_rows_with_conflicts_data": [v["data"] for v in valid_rows_with_conflicts],  # Alunos COM conflitos
-                    "duplicates": validation_results["duplicates"][:10],  # Retornar até 10 duplicatas
-                    "special_chars_errors": validation_results["special_chars_errors"][:10],  # Retornar até 10 erros de caracteres especiais
-                    "similar_names": validation_results["similar_names"][:20],  # Retornar até 20 nomes similares
-                    "summary": {
-                        "total_rows": len(data_rows),
-                        "total_linhas": len(data_rows),
-                        "linhas_validas": len(valid_rows_without_conflicts),
-                        "linhas_com_conflitos": len(valid_rows_with_conflicts),
-                        "linhas_invalidas": len(validation_results["invalid_rows"]),
-                        "conflitos_detectados": len(validation_results["conflicts"]),
-                        "duplicatas_detectadas": len(validation_results["duplicates"]),
-                        "caracteres_especiais": len(validation_results["special_chars_errors"]),
-                        "nomes_similares": len(validation_results["similar_names"])
-                    }
-                }
+                "data": data
             }
 
         except Exception as e:
@@ -560,6 +839,172 @@ class AlunosService:
                 "message": f"Erro na validação: {str(e)}",
                 "step": 3
             }
+        finally:
+            import_sessions[session_id]["validando"] = False
+
+    @staticmethod
+    def iniciar_step3_segundo_plano(session_id: str, db_name: str = None, similar_names_scope: str = None,
+                                    include_rows: bool = False) -> Dict[str, Any]:
+        """
+        Passo 3 em segundo plano: retorna o job imediatamente, sem esperar a validação
+        (arquivos grandes passariam do timeout do gunicorn). O andamento é consultado em
+        obter_status_step3 e o resultado fica na sessão (job do passo 3) ao final
+
+        Args:
+            session_id: ID da sessão de importação
+            db_name: Nome do banco de dados
+            similar_names_scope: Escopo da detecção de nomes similares (ver step3_validar_detectar_conflitos)
+            include_rows: Inclui as linhas no resultado (ver step3_validar_detectar_conflitos)
+
+        Returns:
+            Dict com o estado do job
+        """
+        erro = AlunosService._verificar_step3(session_id, similar_names_scope)
+        if erro:
+            return erro
+
+        erro = AlunosService._reservar_step3(session_id)
+        if erro:
+            job = import_sessions[session_id].get("step3_job")
+            if job is None or not job.running:
+                return erro
+            # Job do passo 3 em andamento: retorna o próprio job (sem iniciar outro)
+            return {
+                "success": True,
+                "message": "Validação já está em andamento.",
+                "step": 3,
+                "session_id": session_id,
+                "job": job.to_dict()
+            }
+
+        return _iniciar_job_da_sessao(
+            session_id, 3, "alunos_step3", "Validação", db_name,
+            AlunosService._executar_step3, session_id, db_name, similar_names_scope, include_rows
+        )
+
+    @staticmethod
+    def obter_status_step3(session_id: str, job_id: str = None) -> Dict[str, Any]:
+        """
+        Andamento do passo 3 em segundo plano: linhas processadas, linhas/s e ETA;
+        com o job finalizado, inclui o resultado do passo 3
+
+        Args:
+            session_id: ID da sessão de importação
+            job_id: ID do job (opcional; default: último job do passo 3 da sessão)
+        """
+        if session_id not in import_sessions:
+            return {
+                "success": False,
+                "message": "Sessão de importação não encontrada.",
+                "step": 3
+            }
+
+        job = import_sessions[session_id].get("step3_job")
+        if job is None or (job_id and job.id != job_id):
+            return {
+                "success": False,
+                "message": "Validação em segundo plano não encontrada para esta sessão.",
+                "step": 3
+            }
+
+        response = {
+            "success": True,
+            "step": 3,
+            "session_id": session_id,
+            "job": job.to_dict()
+        }
+        if not job.running:
+            response["result"] = job.result
+        return response
+
+    @staticmethod
+    def verificar_linhas_step3(session_id: str, category: str) -> Optional[Dict[str, Any]]:
+        """Valida a consulta de linhas do passo 3; retorna a resposta de erro ou None"""
+        if session_id not in import_sessions:
+            return {
+                "success": False,
+                "message": "Sessão de importação não encontrada.",
+                "step": 3
+            }
+
+        session = import_sessions[session_id]
+        if session.get("validando") or (session.get("step3_job") is not None and session["step3_job"].running):
+            return {
+                "success": False,
+                "message": "A validação ainda está em andamento.",
+                "step": 3
+            }
+
+        if session.get("validation_results") is None:
+            return {
+                "success": False,
+                "message": "É necessário completar a validação primeiro.",
+                "step": 3
+            }
+
+        if category not in STEP3_ROW_CATEGORIES:
+            return {
+                "success": False,
+                "message": f"Categoria inválida: '{category}'. Use: {', '.join(STEP3_ROW_CATEGORIES)}.",
+                "step": 3
+            }
+
+        return None
+
+    @staticmethod
+    def obter_linhas_step3(session_id: str, category: str, offset: int = 0, limit: int = None) -> Dict[str, Any]:
+        """
+        Página de linhas de uma categoria do resultado do passo 3
+        (a resposta do passo 3 traz apenas o resumo e as contagens)
+
+        Args:
+            session_id: ID da sessão de importação
+            category: "valid", "conflict", "invalid", "duplicate", "special_chars" ou "similar"
+            offset: Linhas a pular
+            limit: Linhas da página (default: IMPORT_CONFIG['step3_rows_page_size'],
+                até IMPORT_CONFIG['step3_rows_max_page_size'])
+
+        Returns:
+            Dict com o total da categoria e as linhas da página
+        """
+        erro = AlunosService.verificar_linhas_step3(session_id, category)
+        if erro:
+            return erro
+
+        offset = max(offset or 0, 0)
+        limit = min(max(limit or IMPORT_CONFIG["step3_rows_page_size"], 1), IMPORT_CONFIG["step3_rows_max_page_size"])
+
+        validation_results = import_sessions[session_id]["validation_results"]
+        total = 0
+        items = []
+        for linha in STEP3_ROW_CATEGORIES[category](validation_results):
+            if offset <= total < offset + limit:
+                items.append(validation_results["rows"].serialize(linha))
+            total += 1
+
+        return {
+            "success": True,
+            "step": 3,
+            "session_id": session_id,
+            "category": category,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "items": items
+        }
+
+    @staticmethod
+    def iterar_linhas_step3(session_id: str, category: str, offset: int = 0, limit: int = None) -> Iterable[str]:
+        """
+        Linhas de uma categoria do passo 3 em NDJSON (um objeto JSON por linha), geradas
+        sob demanda; sem limit, envia a categoria inteira. A sessão deve ser verificada
+        antes com verificar_linhas_step3
+        """
+        validation_results = import_sessions[session_id]["validation_results"]
+        linhas = STEP3_ROW_CATEGORIES[category](validation_results)
+        offset = max(offset or 0, 0)
+        for linha in itertools.islice(linhas, offset, offset + limit if limit else None):
+            yield json.dumps(validation_results["rows"].serialize(linha), ensure_ascii=False, default=str) + "\n"
 
     @staticmethod
     def step4_resolver_conflitos(session_id: str, conflict_resolutions: dict, db_name: str = None) -> Dict[str, Any]:
@@ -603,19 +1048,19 @@ class AlunosService:
                 
                 # Encontrar a linha correspondente
                 for valid_row in validation_results["valid_rows"]:
-                    if valid_row["row_index"] == row_index:
+                    if valid_row.row_index == row_index:
                         # Aplicar resolução baseada no tipo
                         if resolution.get("action") == "skip":
                             # Marcar linha para pular na importação
-                            valid_row["skip_import"] = True
+                            valid_row.skip_import = True
                             resolutions_applied += 1
                         elif resolution.get("action") == "import_anyway":
                             # Importar mesmo com conflito (RA duplicado será informado)
-                            valid_row["import_with_conflict"] = True
+                            valid_row.import_with_conflict = True
                             resolutions_applied += 1
                         elif resolution.get("action") == "update_existing":
                             # Marcar linha para atualizar registro existente
-                            valid_row["update_existing"] = True
+                            valid_row.update_existing = True
                             resolutions_applied += 1
                         break
 
@@ -645,7 +1090,7 @@ class AlunosService:
                     "resolutions_applied": resolutions_applied,
                     "remaining_conflicts": len(remaining_conflicts),
                     "ready_for_import": True,
-                    "total_rows_to_import": len([row for row in validation_results["valid_rows"] if not row.get("skip_import", False)])
+                    "total_rows_to_import": len([row for row in validation_results["valid_rows"] if not row.skip_import])
                 }
             }
 
@@ -657,17 +1102,19 @@ class AlunosService:
             }
 
     @staticmethod
-    def step5_importar_final(session_id: str, db_name: str = None) -> Dict[str, Any]:
+    def step5_importar_final(session_id: str, db_name: str = None, progress: Callable[..., None] = None) -> Dict[str, Any]:
         """
         Passo 5: Importação final dos alunos
 
         Args:
             session_id: ID da sessão de importação
             db_name: Nome do banco de dados
+            progress: Função opcional chamada com (fase, linhas processadas, total de linhas, erros)
 
         Returns:
             Dict com resultado da importação
         """
+        importando = False
         try:
             if session_id not in import_sessions:
                 return {
@@ -684,6 +1131,23 @@ class AlunosService:
                     "step": 5
                 }
 
+            if session.get("step3_job") is not None and session["step3_job"].running:
+                return {
+                    "success": False,
+                    "message": "A validação (passo 3) ainda está em andamento.",
+                    "step": 5
+                }
+
+            # Uma importação por sessão (evita alunos duplicados com requisições repetidas)
+            with _importacao_lock:
+                if session.get("importando"):
+                    return {
+                        "success": False,
+                        "message": "A importação desta sessão já está em andamento.",
+                        "step": 5
+                    }
+                session["importando"] = importando = True
+
             # Usar db_name da sessão ou do parâmetro
             if db_name:
                 session["db_name"] = db_name
@@ -691,9 +1155,10 @@ class AlunosService:
 
             validation_results = session["validation_results"]
             valid_rows = validation_results["valid_rows"]
+            linhas = validation_results["rows"]
 
             # Filtrar apenas linhas que devem ser importadas
-            rows_to_import = [row for row in valid_rows if not row.get("skip_import", False)]
+            rows_to_import = [row for row in valid_rows if not row.skip_import]
 
             import_results = {
                 "alunos_criados": 0,
@@ -702,6 +1167,11 @@ class AlunosService:
                 "detalhes": []
             }
 
+            total_linhas = len(rows_to_import)
+            if progress is None:
+                progress = lambda *andamento: None
+            progress_interval = IMPORT_CONFIG["progress_interval"]
+
             with get_db_connection() as connection:
                 cursor = connection.cursor(dictionary=True)
                 cursor.execute(f"USE {db_name}")
@@ -712,14 +1182,26 @@ class AlunosService:
                 
                 if hasattr(connection, 'autocommit'):
                     connection.autocommit = False  # Usar transações
+
+                # Escolas, séries e turmas em memória (uma consulta por tabela, em vez de três por linha),
+                # lidas na conexão da transação: o cache por worker pode estar desatualizado para gravar
+                referencias = None if demo_mode else carregar_referencias(cursor)
+                # Alunos já cadastrados com os RAs a importar (consultas IN em blocos, em vez de uma por linha);
+                # se a collation exigir a comparação no banco, o RA é consultado em cada linha
+                comparacao_em_memoria = not demo_mode and referencias["comparacao_em_memoria"]
+                alunos_existentes = {} if not comparacao_em_memoria else _buscar_alunos_por_ra(
+                    cursor, (linhas.data(row.row_index).get("ra", "") for row in rows_to_import)
+                )
                 
                 try:
-                    for row in rows_to_import:
+                    for posicao, row in enumerate(rows_to_import):
+                        if posicao % progress_interval == 0:
+                            progress("importacao", posicao, total_linhas, len(import_results["erros"]))
                         try:
-                            data = row["data"]
+                            data = linhas.data(row.row_index)
                             
                             # Pular se foi marcada para pular
-                            if row.get("skip_import", False):
+                            if row.skip_import:
                                 continue
                             
                             if demo_mode:
@@ -731,7 +1213,7 @@ class AlunosService:
                                 if ra in ["202401001"]:  # Apenas o primeiro RA como "existente"
                                     import_results["alunos_com_ra_duplicado"] += 1
                                     import_results["detalhes"].append({
-                                        "row_index": row["row_index"],
+                                        "row_index": row.row_index,
                                         "ra": ra,
                                         "nome": nome,
                                         "status": "RA já existe (DEMO)",
@@ -742,46 +1224,38 @@ class AlunosService:
                                 # Simular criação bem-sucedida
                                 import_results["alunos_criados"] += 1
                                 import_results["detalhes"].append({
-                                    "row_index": row["row_index"],
+                                    "row_index": row.row_index,
                                     "ra": ra,
                                     "nome": nome,
                                     "status": "Importado com sucesso (DEMO)",
-                                    "aluno_id": f"demo_{row['row_index']}"
+                                    "aluno_id": f"demo_{row.row_index}"
                                 })
                                 continue
                                 
                             # Obter IDs das entidades (que já foram validadas como existentes)
-                            cursor.execute("SELECT i_id FROM instituicoes WHERE i_nome = %s", (data["escola"],))
-                            escola = cursor.fetchone()
-                            escola_id = escola["i_id"]
-                            
-                            cursor.execute("SELECT s_id FROM series WHERE s_nome = %s", (data["serie"],))
-                            serie = cursor.fetchone()
-                            serie_id = serie["s_id"]
-                            
-                            cursor.execute(
-                                "SELECT t_id FROM turmas WHERE t_nome = %s AND t_serie = %s AND t_instituicao = %s",
-                                (data["turma"], serie_id, escola_id)
-                            )
-                            turma = cursor.fetchone()
-                            turma_id = turma["t_id"]
+                            escola_id = localizar_escola(referencias, data["escola"], cursor)
+                            serie_id = localizar_serie(referencias, data["serie"], cursor)
+                            turma_id = localizar_turma(referencias, data["turma"], serie_id, escola_id, cursor)
+                            if turma_id is None:
+                                raise ValueError(
+                                    f"Turma '{data['turma']}' não encontrada para a escola '{data['escola']}' e série '{data['serie']}'"
+                                )
                             
                             ra = data.get("ra", "")
                             nome = data.get("nome", "")
                             email = data.get("email", "")
                             senha = data.get("senha", "123456")  # Senha padrão se não fornecida
                             
-                            # Verificar se RA já existe
-                            cursor.execute(
-                                "SELECT a.a_id, u.u_nome FROM alunos a INNER JOIN usuarios u ON u.u_id = a.a_usuario WHERE a.a_matricula = %s", 
-                                (ra,)
-                            )
-                            aluno_existente = cursor.fetchone()
+                            # Verificar se RA já existe (no banco: na transação, vê os alunos já inseridos do arquivo)
+                            if comparacao_em_memoria:
+                                aluno_existente = alunos_existentes.get(collation_key(ra))
+                            else:
+                                aluno_existente = _buscar_alunos_por_ra(cursor, [ra], em_memoria=False).get(ra)
                             
                             if aluno_existente:
                                 import_results["alunos_com_ra_duplicado"] += 1
                                 import_results["detalhes"].append({
-                                    "row_index": row["row_index"],
+                                    "row_index": row.row_index,
                                     "ra": ra,
                                     "nome": nome,
                                     "status": "RA já existe",
@@ -819,10 +1293,12 @@ class AlunosService:
                                 (usuario_id, ra, turma_id, numero_chamada, portador_necessidade)
                             )
                             aluno_id = cursor.lastrowid
+                            # RA repetido mais adiante no arquivo passa a existir
+                            alunos_existentes[collation_key(ra)] = {"a_id": aluno_id, "a_usuario": usuario_id, "u_nome": nome}
                             
                             import_results["alunos_criados"] += 1
                             import_results["detalhes"].append({
-                                "row_index": row["row_index"],
+                                "row_index": row.row_index,
                                 "ra": ra,
                                 "nome": nome,
                                 "status": "Importado com sucesso",
@@ -831,13 +1307,14 @@ class AlunosService:
                             
                         except Exception as e:
                             import_results["erros"].append({
-                                "row_index": row["row_index"],
+                                "row_index": row.row_index,
                                 "ra": data.get("ra", ""),
                                 "nome": data.get("nome", ""),
                                 "error": str(e)
                             })
                     
                     # Commit das transações
+                    progress("commit", total_linhas, total_linhas, len(import_results["erros"]))
                     if hasattr(connection, 'commit'):
                         connection.commit()
                     
@@ -850,6 +1327,10 @@ class AlunosService:
             # Salvar resultados na sessão
             session["import_results"] = import_results
             session["step"] = 5
+            session["importando"] = False
+            # Alunos gravados: os alunos por RA do passo 3 não valem mais para uma nova validação
+            if "step3_cache" in session:
+                session["step3_cache"]["alunos_por_ra"] = None
 
             return {
                 "success": True,
@@ -860,12 +1341,61 @@ class AlunosService:
             }
 
         except Exception as e:
+            if importando:
+                import_sessions[session_id]["importando"] = False
             return {
                 "success": False,
                 "message": f"Erro na importação: {str(e)}",
                 "step": 5
             }
 
+    @staticmethod
+    def iniciar_step5_segundo_plano(session_id: str, db_name: str = None) -> Dict[str, Any]:
+        """
+        Passo 5 em segundo plano: retorna o job imediatamente, sem esperar a importação.
+        O andamento é acompanhado pelo stream de eventos da sessão e o resultado fica na
+        sessão (import_results) ao final
+
+        Args:
+            session_id: ID da sessão de importação
+            db_name: Nome do banco de dados
+
+        Returns:
+            Dict com o estado do job
+        """
+        if session_id not in import_sessions:
+            return {
+                "success": False,
+                "message": "Sessão de importação não encontrada.",
+                "step": 5
+            }
+
+        if import_sessions[session_id]["step"] < 3:
+            return {
+                "success": False,
+                "message": "É necessário completar a validação primeiro.",
+                "step": 5
+            }
+
+        return _iniciar_job_da_sessao(
+            session_id, 5, "alunos_step5", "Importação", db_name,
+            AlunosService.step5_importar_final, session_id, db_name
+        )
+
+    @staticmethod
+    def obter_job_sessao(session_id: str, job_id: str = None) -> Optional[Job]:
+        """
+        Job em segundo plano da sessão (passo 3 ou 5): o informado em job_id ou o mais recente
+        """
+        session = import_sessions.get(session_id)
+        if session is None:
+            return None
+
+        session_jobs = [session[chave] for chave in ("step3_job", "step5_job") if session.get(chave) is not None]
+        if job_id:
+            return next((job for job in session_jobs if job.id == job_id), None)
+        return max(session_jobs, key=lambda job: job.created_at, default=None)
+
     @staticmethod
     def obter_status_importacao(session_id: str) -> Dict[str, Any]:
         """
@@ -893,7 +1423,10 @@ class AlunosService:
                 "filename": session["filename"],
                 "total_rows": session["total_rows"],
                 "created_at": session["created_at"],
-                "validation_results": session.get("validation_results"),
+                "similar_names_scope": session.get("similar_names_scope", "file"),
+                "step3_job": session["step3_job"].to_dict() if session.get("step3_job") else None,
+                "step5_job": session["step5_job"].to_dict() if session.get("step5_job") else None,
+                "validation_results": _serializar_resultados(session.get("validation_results")),
                 "import_results": session.get("import_results")
             }
         }
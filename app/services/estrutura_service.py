@@ -2,30 +2,46 @@
 Serviço de importação de estrutura (Escola, Série, Turma)
 Responsabilidade: Lógica de negócio para importação de estrutura educacional
 """
-from typing import Dict, Any, List
+from contextlib import nullcontext
+from typing import Callable, Dict, Any, List, Iterable, Union
+from app.core.background_jobs import Job, submit_job
+from app.core.cache import get_similarity_cache, invalidate_similarity_cache, invalidate_reference_cache
+from app.core.config import IMPORT_CONFIG
 from app.core.database import get_db_connection
-from app.utils.text_utils import normalize_text, has_special_characters, detect_similar_names
+from app.utils.text_utils import normalize_column, detect_similar_names_many
 from app.utils.csv_processor import process_csv_data, detect_duplicates
+from app.utils.estrutura_schema import validar_linhas_estrutura
+from app.services.referencias_service import (
+    obter_referencias, exemplos_referencias, escolas_da_turma, localizar_escola, localizar_serie, localizar_turma
+)
 
 
 class EstruturaService:
     """Serviço para gerenciar importação de estrutura educacional"""
     
     @staticmethod
-    def validar_estrutura_csv(file_content: str, db_name: str = None, dry_run: bool = True) -> Dict[str, Any]:
+    def validar_estrutura_csv(file_content: Union[str, Iterable[str]], db_name: str = None, dry_run: bool = True, file_size: int = None,
+                              progress: Callable[..., None] = None) -> Dict[str, Any]:
         """
         Valida dados de estrutura do CSV
 
         Args:
-            file_content: Conteúdo do arquivo CSV
+            file_content: Conteúdo do arquivo CSV (texto completo ou stream de texto)
             db_name: Nome do banco de dados a usar
             dry_run: Se True, apenas valida sem importar
+            file_size: Tamanho do arquivo em bytes (define o parse paralelo em arquivos grandes)
+            progress: Função opcional chamada com (fase, linhas processadas, total de linhas, erros)
 
         Returns:
             Dict com resultados da validação
         """
+        if progress is None:
+            progress = lambda *andamento: None
+        progress_interval = IMPORT_CONFIG["progress_interval"]
+
         # Processa CSV com campos obrigatórios
-        result = process_csv_data(file_content, ["ESCOLA", "SERIE", "TURMA"])
+        progress("leitura", 0)
+        result = process_csv_data(file_content, ["ESCOLA", "SERIE", "TURMA"], size_hint=file_size)
         
         if not result["valid_rows"]:
             return {
@@ -55,10 +71,6 @@ class EstruturaService:
         validation_warnings = []
         similar_schools = []  # Lista para armazenar escolas similares
 
-        # Cache para evitar consultas repetidas
-        escolas_cache = {}  # nome -> id
-        series_cache = {}   # nome -> id
-
         # Criar set para rastrear combinações já processadas
         processed_combinations = set()
         escolas_unicas = set()
@@ -66,85 +78,72 @@ class EstruturaService:
 
         # Lista para detectar nomes similares de escolas
         escolas_processadas = []
+        # Escolas a comparar por linha: (linha, nome da escola, escolas com mesma série e turma, dados)
+        comparacoes = []
+        # Similaridades já calculadas em dry-runs anteriores neste banco
+        similarity_cache = get_similarity_cache(db_name)
+
+        # Normaliza as colunas de uma vez (maiúscula, trim, remove acentos)
+        escolas_normalizadas, series_normalizadas, turmas_normalizadas = (
+            normalize_column(row["dados"].get(campo, "") for row in result["valid_rows"])
+            for campo in ("ESCOLA", "SERIE", "TURMA")
+        )
 
-        with get_db_connection() as connection:
-            cursor = connection.cursor()
-            cursor.execute(f"USE {db_name}")
-            
-            for row_data in result["valid_rows"]:
+        # Validação de todas as linhas pelo esquema (caracteres especiais em lote, por coluna)
+        # (arquivos grandes em blocos no pool de processos)
+        validacoes = validar_linhas_estrutura(
+            [row["dados"] for row in result["valid_rows"]],
+            parallel_threshold=IMPORT_CONFIG["parallel_validation_threshold"],
+            chunk_size=IMPORT_CONFIG["parallel_validation_chunk_size"]
+        )
+
+        # Escolas, séries e turmas do banco em memória (cache por banco, sem consultas por linha)
+        referencias = obter_referencias(db_name)
+        total_linhas = len(result["valid_rows"])
+
+        # Se a collation das colunas não permitir a comparação em memória, as buscas
+        # por nome são feitas no banco, em uma conexão aberta só para a validação
+        with (nullcontext() if referencias["comparacao_em_memoria"] else get_db_connection()) as connection:
+            cursor = None
+            if connection is not None:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(f"USE {db_name}")
+
+            for posicao, row_data in enumerate(result["valid_rows"]):
+                if posicao % progress_interval == 0:
+                    progress("validacao", posicao, total_linhas, len(validation_errors))
                 linha = row_data["linha_original"]
                 dados = row_data["dados"]
-                
-                # Dados originais (SEM strip para detectar espaços)
-                escola_raw = str(dados.get("ESCOLA", ""))
-                serie_raw = str(dados.get("SERIE", ""))
-                turma_raw = str(dados.get("TURMA", ""))
-
-                # Validar espaços no início/fim
-                if escola_raw != escola_raw.strip():
-                    validation_warnings.append({
-                        "linha": linha,
-                        "aviso": f"Nome da escola contém espaços no início ou fim: '{escola_raw}'",
-                        "dados": dados,
-                        "tipo": "espacos_extras"
-                    })
-
-                if serie_raw != serie_raw.strip():
-                    validation_warnings.append({
-                        "linha": linha,
-                        "aviso": f"Nome da série contém espaços no início ou fim: '{serie_raw}'",
-                        "dados": dados,
-                        "tipo": "espacos_extras"
-                    })
+            
+                # Valida os campos: avisos de espaços no início/fim e caracteres
+                # especiais ANTES de normalizar (para no primeiro erro)
+                campos, field_errors, field_warnings = validacoes[posicao]
 
-                if turma_raw != turma_raw.strip():
+                for _, code, message in field_warnings:
                     validation_warnings.append({
                         "linha": linha,
-                        "aviso": f"Nome da turma contém espaços no início ou fim: '{turma_raw}'",
+                        "aviso": message,
                         "dados": dados,
-                        "tipo": "espacos_extras"
+                        "tipo": code
                     })
 
-                # Agora fazer strip
-                escola_original = escola_raw.strip()
-                serie_original = serie_raw.strip()
-                turma_original = turma_raw.strip()
-
-                print(f"🔍 Linha {linha}: ESCOLA='{escola_original}', SERIE='{serie_original}', TURMA='{turma_original}'")
-
-                # Validar caracteres especiais ANTES de normalizar
-                if escola_original and has_special_characters(escola_original):
+                if field_errors:
+                    _, code, message = field_errors[0]
                     validation_errors.append({
                         "linha": linha,
-                        "erro": f"Nome da escola contém caracteres especiais inválidos: '{escola_original}'",
+                        "erro": message,
                         "dados": dados,
-                        "tipo": "caracteres_especiais"
+                        "tipo": code
                     })
                     continue
-                
-                if serie_original and has_special_characters(serie_original):
-                    validation_errors.append({
-                        "linha": linha,
-                        "erro": f"Nome da série contém caracteres especiais inválidos: '{serie_original}'",
-                        "dados": dados,
-                        "tipo": "caracteres_especiais"
-                    })
-                    continue
-                
-                if turma_original and has_special_characters(turma_original):
-                    validation_errors.append({
-                        "linha": linha,
-                        "erro": f"Nome da turma contém caracteres especiais inválidos: '{turma_original}'",
-                        "dados": dados,
-                        "tipo": "caracteres_especiais"
-                    })
-                    continue
-                
-                # Normaliza dados (maiúscula, trim, remove acentos)
-                nome_escola = normalize_text(escola_original)
-                nome_serie = normalize_text(serie_original)
-                nome_turma = normalize_text(turma_original)
-                
+
+                print(f"🔍 Linha {linha}: ESCOLA='{campos['ESCOLA']}', SERIE='{campos['SERIE']}', TURMA='{campos['TURMA']}'")
+
+                # Dados normalizados (maiúscula, trim, remove acentos)
+                nome_escola = escolas_normalizadas[posicao]
+                nome_serie = series_normalizadas[posicao]
+                nome_turma = turmas_normalizadas[posicao]
+            
                 if not nome_escola or not nome_serie or not nome_turma:
                     validation_errors.append({
                         "linha": linha,
@@ -153,28 +152,24 @@ class EstruturaService:
                         "tipo": "campo_vazio"
                     })
                     continue
-                
+            
                 # Criar chave única para esta combinação
                 combination_key = f"{nome_escola}|{nome_serie}|{nome_turma}"
-                
+            
                 # Se já processamos esta combinação, pular (é duplicata no CSV)
                 if combination_key in processed_combinations:
                     continue
-                
+            
                 processed_combinations.add(combination_key)
 
                 # Detectar nomes similares de escolas (70% de similaridade)
                 # REGRA: Só detectar similaridade se SERIE e TURMA também forem iguais
                 if nome_escola and nome_serie and nome_turma:
                     # Buscar escolas existentes no banco com mesma SERIE e TURMA
-                    cursor.execute("""
-                        SELECT DISTINCT i.i_id, i.i_nome
-                        FROM instituicoes i
-                        INNER JOIN turmas t ON t.t_instituicao = i.i_id
-                        INNER JOIN series s ON t.t_serie = s.s_id
-                        WHERE s.s_nome = %s AND t.t_nome = %s
-                    """, (nome_serie, nome_turma))
-                    escolas_db = [{"id": row[0], "nome": row[1]} for row in cursor.fetchall()]
+                    escolas_db = [
+                        {"id": i_id, "nome": i_nome}
+                        for i_id, i_nome in escolas_da_turma(referencias, nome_serie, nome_turma, cursor).items()
+                    ]
 
                     # Filtrar escolas processadas neste CSV com mesma SERIE e TURMA
                     escolas_csv_mesma_serie_turma = [
@@ -198,38 +193,8 @@ class EstruturaService:
                     print(f"   Escolas para comparar: {[e['nome'] for e in todas_escolas]}")
 
                     if todas_escolas:
-                        similar_names = detect_similar_names(
-                            nome_escola,
-                            todas_escolas,
-                            threshold=0.7
-                        )
-
-                        print(f"   Similaridades encontradas: {len(similar_names)}")
-
-                        if similar_names:
-                            # Evitar adicionar duplicatas de similaridade
-                            for similar in similar_names:
-                                # Criar chave única para evitar duplicatas
-                                similar_key = f"{linha}|{nome_escola}|{similar['nome_existente']}|{nome_serie}|{nome_turma}"
-
-                                # Verificar se já foi adicionado
-                                already_added = any(
-                                    s["linha"] == linha and
-                                    s["nome_atual"] == nome_escola and
-                                    s["nome_similar"] == similar["nome_existente"]
-                                    for s in similar_schools
-                                )
-
-                                if not already_added:
-                                    print(f"   ✅ Adicionando similaridade: {nome_escola} <-> {similar['nome_existente']} ({similar['similaridade']*100:.1f}%)")
-                                    similar_schools.append({
-                                        "linha": linha,
-                                        "nome_atual": nome_escola,
-                                        "nome_similar": similar["nome_existente"],
-                                        "similaridade": similar["similaridade"],
-                                        "id_similar": similar.get("id_existente"),
-                                        "dados": dados
-                                    })
+                        # Comparação feita após o laço, em lote (ver detect_similar_names_many)
+                        comparacoes.append((linha, nome_escola, todas_escolas, dados))
 
                     # Adicionar escola à lista de processadas (com serie e turma)
                     escola_key = f"{nome_escola}|{nome_serie}|{nome_turma}"
@@ -242,9 +207,7 @@ class EstruturaService:
                         })
 
                 # Busca escola
-                cursor.execute("SELECT i_id FROM instituicoes WHERE i_nome = %s", (nome_escola,))
-                escola_result = cursor.fetchone()
-                escola_id = escola_result[0] if escola_result else None
+                escola_id = localizar_escola(referencias, nome_escola, cursor)
 
                 # Se escola já existe, adicionar aviso
                 if escola_id:
@@ -256,9 +219,7 @@ class EstruturaService:
                     })
 
                 # Busca série
-                cursor.execute("SELECT s_id FROM series WHERE s_nome = %s", (nome_serie,))
-                serie_result = cursor.fetchone()
-                serie_id = serie_result[0] if serie_result else None
+                serie_id = localizar_serie(referencias, nome_serie, cursor)
 
                 # Se série já existe, adicionar aviso
                 if serie_id:
@@ -270,14 +231,11 @@ class EstruturaService:
                     })
 
                 # Se escola e série existem, verifica turma duplicada
+                turma_existe = False
                 if escola_id and serie_id:
-                    cursor.execute(
-                        "SELECT t_id FROM turmas WHERE t_nome = %s AND t_serie = %s AND t_instituicao = %s",
-                        (nome_turma, serie_id, escola_id)
-                    )
-                    turma_result = cursor.fetchone()
+                    turma_existe = localizar_turma(referencias, nome_turma, serie_id, escola_id, cursor) is not None
 
-                    if turma_result:
+                    if turma_existe:
                         validation_errors.append({
                             "linha": linha,
                             "erro": f"Turma '{nome_turma}' já existe na escola '{nome_escola}' para a série '{nome_serie}'",
@@ -298,17 +256,47 @@ class EstruturaService:
 
                 # Turmas: sempre conta (cada linha é uma turma única)
                 # Só não conta se já existe no banco com mesma escola, série e turma
-                turma_existe = False
-                if escola_id and serie_id:
-                    cursor.execute(
-                        "SELECT t_id FROM turmas WHERE t_nome = %s AND t_serie = %s AND t_instituicao = %s",
-                        (nome_turma, serie_id, escola_id)
-                    )
-                    turma_existe = cursor.fetchone() is not None
-
                 if not turma_existe:
                     turmas_criadas += 1
 
+        progress("validacao", total_linhas, total_linhas, len(validation_errors))
+
+        # Detectar nomes similares de escolas (70% de similaridade), na ordem das linhas;
+        # muitas comparações são feitas em blocos no pool de processos
+        progress("nomes_similares", 0, len(comparacoes))
+        resultados_similares = detect_similar_names_many(
+            [(nome_escola, todas_escolas) for _, nome_escola, todas_escolas, _ in comparacoes],
+            threshold=0.7,
+            blocking=IMPORT_CONFIG["phonetic_blocking"],
+            cache=similarity_cache,
+            parallel_threshold=IMPORT_CONFIG["parallel_similarity_threshold"]
+        )
+        for (linha, nome_escola, _, dados), similar_names in zip(comparacoes, resultados_similares):
+            if similar_names:
+                print(f"   Similaridades encontradas para '{nome_escola}' (linha {linha}): {len(similar_names)}")
+
+            # Evitar adicionar duplicatas de similaridade
+            for similar in similar_names:
+                # Verificar se já foi adicionado
+                already_added = any(
+                    s["linha"] == linha and
+                    s["nome_atual"] == nome_escola and
+                    s["nome_similar"] == similar["nome_existente"]
+                    for s in similar_schools
+                )
+
+                if not already_added:
+                    print(f"   ✅ Adicionando similaridade: {nome_escola} <-> {similar['nome_existente']} ({similar['similaridade']*100:.1f}%)")
+                    similar_schools.append({
+                        "linha": linha,
+                        "nome_atual": nome_escola,
+                        "nome_similar": similar["nome_existente"],
+                        "similaridade": similar["similaridade"],
+                        "id_similar": similar.get("id_existente"),
+                        "dados": dados
+                    })
+        progress("nomes_similares", len(comparacoes), len(comparacoes), len(validation_errors))
+
         all_errors = result["errors"] + validation_errors
 
         return {
@@ -339,19 +327,27 @@ class EstruturaService:
         }
 
     @staticmethod
-    def importar_estrutura(file_content: str, db_name: str = None) -> Dict[str, Any]:
+    def importar_estrutura(file_content: Union[str, Iterable[str]], db_name: str = None, file_size: int = None,
+                           progress: Callable[..., None] = None) -> Dict[str, Any]:
         """
         Importa estrutura (escola, série, turma) do CSV
 
         Args:
-            file_content: Conteúdo do arquivo CSV
+            file_content: Conteúdo do arquivo CSV (texto completo ou stream de texto)
             db_name: Nome do banco de dados a usar
+            file_size: Tamanho do arquivo em bytes (define o parse paralelo em arquivos grandes)
+            progress: Função opcional chamada com (fase, linhas processadas, total de linhas, erros)
 
         Returns:
             Dict com resultados da importação
         """
+        if progress is None:
+            progress = lambda *andamento: None
+        progress_interval = IMPORT_CONFIG["progress_interval"]
+
         # Processa CSV
-        result = process_csv_data(file_content, ["ESCOLA", "SERIE", "TURMA"])
+        progress("leitura", 0)
+        result = process_csv_data(file_content, ["ESCOLA", "SERIE", "TURMA"], size_hint=file_size)
 
         if not result["valid_rows"]:
             return {
@@ -383,50 +379,47 @@ class EstruturaService:
         escolas_cache = {}
         series_cache = {}
 
+        # Normaliza as colunas de uma vez (maiúscula, trim, remove acentos)
+        escolas_normalizadas, series_normalizadas, turmas_normalizadas = (
+            normalize_column(row["dados"].get(campo, "") for row in result["valid_rows"])
+            for campo in ("ESCOLA", "SERIE", "TURMA")
+        )
+
+        # Validação de todas as linhas pelo esquema (caracteres especiais em lote, por coluna)
+        # (arquivos grandes em blocos no pool de processos)
+        validacoes = validar_linhas_estrutura(
+            [row["dados"] for row in result["valid_rows"]],
+            parallel_threshold=IMPORT_CONFIG["parallel_validation_threshold"],
+            chunk_size=IMPORT_CONFIG["parallel_validation_chunk_size"]
+        )
+
         # Importação real
         with get_db_connection() as connection:
             cursor = connection.cursor()
             cursor.execute(f"USE {db_name}")
 
-            for row_data in result["valid_rows"]:
+            total_linhas = len(result["valid_rows"])
+            for posicao, row_data in enumerate(result["valid_rows"]):
+                if posicao % progress_interval == 0:
+                    progress("importacao", posicao, total_linhas, len(import_errors))
                 try:
                     linha = row_data["linha_original"]
                     dados = row_data["dados"]
 
-                    # Dados originais para validação
-                    escola_original = str(dados.get("ESCOLA", "")).strip()
-                    serie_original = str(dados.get("SERIE", "")).strip()
-                    turma_original = str(dados.get("TURMA", "")).strip()
-
                     # Validar caracteres especiais ANTES de normalizar
-                    if escola_original and has_special_characters(escola_original):
-                        import_errors.append({
-                            "linha": linha,
-                            "erro": f"Nome da escola contém caracteres especiais inválidos: '{escola_original}'",
-                            "dados": dados
-                        })
-                        continue
-
-                    if serie_original and has_special_characters(serie_original):
-                        import_errors.append({
-                            "linha": linha,
-                            "erro": f"Nome da série contém caracteres especiais inválidos: '{serie_original}'",
-                            "dados": dados
-                        })
-                        continue
-
-                    if turma_original and has_special_characters(turma_original):
+                    _, field_errors, _ = validacoes[posicao]
+                    if field_errors:
                         import_errors.append({
                             "linha": linha,
-                            "erro": f"Nome da turma contém caracteres especiais inválidos: '{turma_original}'",
+                            "erro": field_errors[0][2],
                             "dados": dados
                         })
                         continue
 
-                    # Normaliza dados
-                    nome_escola = normalize_text(escola_original)
-                    nome_serie = normalize_text(serie_original)
-                    nome_turma = normalize_text(turma_original)
+                    # Dados normalizados
+                    nome_escola = escolas_normalizadas[posicao]
+                    nome_serie = series_normalizadas[posicao]
+                    nome_turma = turmas_normalizadas[posicao]
 
                     if not nome_escola or not nome_serie or not nome_turma:
                         import_errors.append({
@@ -533,9 +526,17 @@ class EstruturaService:
                     })
 
             # Commit das transações
+            progress("commit", total_linhas, total_linhas, len(import_errors))
             if hasattr(connection, 'commit'):
                 connection.commit()
 
+        # Novas escolas no banco: descarta as similaridades em cache dos dry-runs
+        if escolas_criadas:
+            invalidate_similarity_cache(db_name)
+        # Escolas, séries ou turmas gravadas: descarta os dados de referência em cache
+        if escolas_criadas or series_criadas or turmas_criadas:
+            invalidate_reference_cache(db_name)
+
         all_errors = result["errors"] + import_errors
 
         success_msg = f"✅ Importação concluída: {escolas_criadas} escolas, {series_criadas} séries, {turmas_criadas} turmas criadas"
@@ -554,6 +555,39 @@ class EstruturaService:
             "duplicates_info": duplicates if duplicates else None
         }
 
+    @staticmethod
+    def iniciar_em_segundo_plano(file_content: str, db_name: str = None, dry_run: bool = False, file_size: int = None) -> Dict[str, Any]:
+        """
+        Validação (dry_run) ou importação de estrutura em segundo plano: retorna o job
+        imediatamente; o andamento e o resultado são consultados pelo job_id
+
+        Args:
+            file_content: Conteúdo completo do arquivo CSV (o upload é fechado ao fim da requisição)
+            db_name: Nome do banco de dados a usar
+            dry_run: Se True, apenas valida sem importar
+            file_size: Tamanho do arquivo em bytes
+
+        Returns:
+            Dict com o estado do job
+        """
+        if dry_run:
+            job = submit_job(
+                Job("estrutura_validacao", db_name), EstruturaService.validar_estrutura_csv,
+                file_content, db_name=db_name, dry_run=True, file_size=file_size
+            )
+        else:
+            job = submit_job(
+                Job("estrutura_importacao", db_name), EstruturaService.importar_estrutura,
+                file_content, db_name=db_name, file_size=file_size
+            )
+
+        return {
+            "success": True,
+            "message": f"{'Validação' if dry_run else 'Importação'} iniciada em segundo plano.",
+            "dry_run": dry_run,
+            "job": job.to_dict()
+        }
+
     @staticmethod
     def obter_informacoes_estrutura(db_name: str = None) -> Dict[str, Any]:
         """
@@ -563,69 +597,42 @@ class EstruturaService:
             db_name: Nome do banco de dados
         """
         try:
-            with get_db_connection() as connection:
-                cursor = connection.cursor(dictionary=True)
-                cursor.execute(f"USE {db_name}")
+            # Escolas, séries e turmas do banco em memória (cache por banco)
+            referencias = obter_referencias(db_name)
+            # Primeiros 10 de cada tabela em ordem alfabética
+            exemplos = exemplos_referencias(referencias)
+            totais = referencias["totais"]
 
-                # Lista instituições
-                cursor.execute("SELECT i_id, i_nome FROM instituicoes ORDER BY i_nome LIMIT 10")
-                instituicoes = cursor.fetchall()
-
-                # Lista séries
-                cursor.execute("SELECT s_id, s_nome FROM series ORDER BY s_nome LIMIT 10")
-                series = cursor.fetchall()
-
-                # Lista turmas (com informações relacionadas)
-                cursor.execute("""
-                    SELECT t.t_id, t.t_nome, s.s_nome as serie_nome, i.i_nome as instituicao_nome
-                    FROM turmas t
-                    JOIN series s ON t.t_serie = s.s_id
-                    JOIN instituicoes i ON t.t_instituicao = i.i_id
-                    ORDER BY i.i_nome, s.s_nome, t.t_nome
-                    LIMIT 10
-                """)
-                turmas = cursor.fetchall()
-
-                # Contar totais
-                cursor.execute("SELECT COUNT(*) as total FROM instituicoes")
-                total_instituicoes = cursor.fetchone()['total']
-
-                cursor.execute("SELECT COUNT(*) as total FROM series")
-                total_series = cursor.fetchone()['total']
-
-                cursor.execute("SELECT COUNT(*) as total FROM turmas")
-                total_turmas = cursor.fetchone()['total']
-
-                return {
-                    "success": True,
-                    "formato_csv": {
-                        "descricao": "O CSV deve ter 3 colunas: ESCOLA,SERIE,TURMA",
-                        "exemplo_cabecalho": "ESCOLA,SERIE,TURMA",
-                        "exemplo_linhas": [
-                            "ANDRE FRANCO MONTORO,1ANO,A",
-                            "ESCOLA MUNICIPAL EXEMPLO,2ANO,B"
-                        ],
-                        "observacoes": [
-                            "Escolas serão criadas automaticamente se não existirem",
-                            "Séries serão criadas automaticamente (s_instituicao = 1)",
-                            "Turmas devem ser únicas por escola+série"
-                        ]
+            return {
+                "success": True,
+                "formato_csv": {
+                    "descricao": "O CSV deve ter 3 colunas: ESCOLA,SERIE,TURMA",
+                    "exemplo_cabecalho": "ESCOLA,SERIE,TURMA",
+                    "exemplo_linhas": [
+                        "ANDRE FRANCO MONTORO,1ANO,A",
+                        "ESCOLA MUNICIPAL EXEMPLO,2ANO,B"
+                    ],
+                    "observacoes": [
+                        "Escolas serão criadas automaticamente se não existirem",
+                        "Séries serão criadas automaticamente (s_instituicao = 1)",
+                        "Turmas devem ser únicas por escola+série"
+                    ]
+                },
+                "dados_existentes": {
+                    "instituicoes": {
+                        "total": totais["instituicoes"],
+                        "exemplos": exemplos["instituicoes"]
+                    },
+                    "series": {
+                        "total": totais["series"],
+                        "exemplos": exemplos["series"]
                     },
-                    "dados_existentes": {
-                        "instituicoes": {
-                            "total": total_instituicoes,
-                            "exemplos": instituicoes
-                        },
-                        "series": {
-                            "total": total_series,
-                            "exemplos": series
-                        },
-                        "turmas": {
-                            "total": total_turmas,
-                            "exemplos": turmas
-                        }
+                    "turmas": {
+                        "total": totais["turmas"],
+                        "exemplos": exemplos["turmas"]
                     }
                 }
+            }
 
         except Exception as e:
             return {
@@ -0,0 +1,259 @@
+"""
+Dados de referência do banco (escolas, séries e turmas) em memória
+Carregados com uma consulta por tabela e mantidos por banco em cache com TTL
+(CACHE_CONFIG['reference_ttl']); a importação de estrutura invalida o cache ao gravar
+
+A comparação em memória (collation_key) reproduz o '=' das colunas em utf8mb4_general_ci;
+a collation das colunas é lida junto com as referências e, se for outra, as buscas
+por nome (e por RA) são feitas no banco
+"""
+import heapq
+from typing import Any, Dict, List, Optional
+from app.core.cache import get_reference_snapshot, invalidate_reference_cache
+from app.core.database import get_db_connection
+from app.utils.text_utils import collation_key
+
+
+# Collations em que o '=' do banco equivale a comparar collation_key
+COLLATIONS_EM_MEMORIA = ("utf8mb4_general_ci", "utf8mb3_general_ci", "utf8_general_ci")
+
+# Colunas comparadas por nome (tabela, coluna)
+COLUNAS_COMPARADAS = (
+    ("instituicoes", "i_nome"),
+    ("series", "s_nome"),
+    ("turmas", "t_nome"),
+    ("alunos", "a_matricula"),
+)
+
+
+def colunas_incompativeis(cursor) -> List[str]:
+    """
+    Colunas comparadas por nome cuja collation não está em COLLATIONS_EM_MEMORIA
+    (ou que não foram encontradas no information_schema)
+
+    Args:
+        cursor: Cursor (dictionary=True) já posicionado no banco
+
+    Returns:
+        Lista "tabela.coluna (collation)"; vazia se a comparação em memória é válida
+    """
+    cursor.execute(
+        "SELECT TABLE_NAME AS tabela, COLUMN_NAME AS coluna, COLLATION_NAME AS collation "
+        "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+        f"AND COLUMN_NAME IN ({', '.join(['%s'] * len(COLUNAS_COMPARADAS))})",
+        tuple(coluna for _, coluna in COLUNAS_COMPARADAS)
+    )
+    collations = {(linha['tabela'], linha['coluna']): linha['collation'] for linha in cursor.fetchall()}
+    return [
+        f"{tabela}.{coluna} ({collations.get((tabela, coluna))})"
+        for tabela, coluna in COLUNAS_COMPARADAS
+        if collations.get((tabela, coluna)) not in COLLATIONS_EM_MEMORIA
+    ]
+
+
+def carregar_referencias(cursor) -> Dict[str, Any]:
+    """
+    Carrega escolas, séries e turmas do banco com uma consulta cada, para as
+    validações serem feitas em memória (mesma comparação do '=' no banco em
+    utf8mb4_general_ci: collation_key; a collation das colunas é verificada aqui)
+
+    Args:
+        cursor: Cursor (dictionary=True) já posicionado no banco
+
+    Returns:
+        Dict com:
+        - "escolas": nome -> i_id; "series": nome -> s_id
+        - "turmas": (nome, s_id, i_id) -> t_id
+        - "escolas_por_turma": (nome da série, nome da turma) -> {i_id: i_nome}
+        - "nomes_escolas": i_id -> i_nome; "nomes_series": s_id -> s_nome
+        - "lista_turmas": linhas de turmas (t_id, t_nome, t_serie, t_instituicao)
+        - "totais": quantidade de linhas de cada tabela
+        - "comparacao_em_memoria": se as buscas por nome podem usar os dicionários acima
+          (False: collation das colunas diferente de utf8mb4_general_ci, ver localizar_escola)
+    """
+    incompativeis = colunas_incompativeis(cursor)
+    if incompativeis:
+        print(f"⚠️ Collation diferente de utf8mb4_general_ci em {', '.join(incompativeis)}: buscas por nome no banco")
+
+    cursor.execute("SELECT i_id, i_nome FROM instituicoes ORDER BY i_id")
+    lista_escolas = cursor.fetchall()
+    escolas = {}
+    for escola in lista_escolas:
+        escolas.setdefault(collation_key(escola['i_nome']), escola['i_id'])
+
+    cursor.execute("SELECT s_id, s_nome FROM series ORDER BY s_id")
+    lista_series = cursor.fetchall()
+    series = {}
+    for serie in lista_series:
+        series.setdefault(collation_key(serie['s_nome']), serie['s_id'])
+
+    cursor.execute("SELECT t_id, t_nome, t_serie, t_instituicao FROM turmas ORDER BY t_id")
+    lista_turmas = cursor.fetchall()
+
+    nomes_escolas = {escola['i_id']: escola['i_nome'] for escola in lista_escolas}
+    nomes_series = {serie['s_id']: serie['s_nome'] for serie in lista_series}
+    turmas = {}
+    escolas_por_turma = {}
+    for turma in lista_turmas:
+        nome_turma = collation_key(turma['t_nome'])
+        turmas.setdefault((nome_turma, turma['t_serie'], turma['t_instituicao']), turma['t_id'])
+
+        # Mesmo resultado do JOIN turmas x séries x instituições
+        nome_serie = nomes_series.get(turma['t_serie'])
+        nome_escola = nomes_escolas.get(turma['t_instituicao'])
+        if nome_serie is not None and nome_escola is not None:
+            escolas_por_turma.setdefault((collation_key(nome_serie), nome_turma), {})[turma['t_instituicao']] = nome_escola
+
+    print(f"📚 Referências carregadas: {len(escolas)} escolas, {len(series)} séries, {len(turmas)} turmas")
+    return {
+        "escolas": escolas,
+        "series": series,
+        "turmas": turmas,
+        "escolas_por_turma": escolas_por_turma,
+        "nomes_escolas": nomes_escolas,
+        "nomes_series": nomes_series,
+        "lista_turmas": lista_turmas,
+        "totais": {
+            "instituicoes": len(lista_escolas),
+            "series": len(lista_series),
+            "turmas": len(lista_turmas)
+        },
+        "comparacao_em_memoria": not incompativeis
+    }
+
+
+def _buscar_id(cursor, query: str, params: tuple) -> Optional[int]:
+    """Primeira coluna da primeira linha da consulta (None se não há linhas)"""
+    cursor.execute(query, params)
+    linha = cursor.fetchone()
+    if linha is None:
+        return None
+    return next(iter(linha.values())) if isinstance(linha, dict) else linha[0]
+
+
+def localizar_escola(referencias: Dict[str, Any], nome: str, cursor=None) -> Optional[int]:
+    """
+    i_id da escola pelo nome (None se não existe), pela comparação do banco:
+    em memória quando referencias["comparacao_em_memoria"]; senão no banco com o cursor
+    (já posicionado no banco)
+    """
+    if referencias["comparacao_em_memoria"]:
+        return referencias["escolas"].get(collation_key(nome))
+    return _buscar_id(cursor, "SELECT i_id FROM instituicoes WHERE i_nome = %s ORDER BY i_id LIMIT 1", (nome,))
+
+
+def localizar_serie(referencias: Dict[str, Any], nome: str, cursor=None) -> Optional[int]:
+    """s_id da série pelo nome (None se não existe), ver localizar_escola"""
+    if referencias["comparacao_em_memoria"]:
+        return referencias["series"].get(collation_key(nome))
+    return _buscar_id(cursor, "SELECT s_id FROM series WHERE s_nome = %s ORDER BY s_id LIMIT 1", (nome,))
+
+
+def localizar_turma(referencias: Dict[str, Any], nome: str, serie_id: int, escola_id: int,
+                    cursor=None) -> Optional[int]:
+    """t_id da turma pelo nome na série e escola (None se não existe), ver localizar_escola"""
+    if referencias["comparacao_em_memoria"]:
+        return referencias["turmas"].get((collation_key(nome), serie_id, escola_id))
+    return _buscar_id(
+        cursor,
+        "SELECT t_id FROM turmas WHERE t_nome = %s AND t_serie = %s AND t_instituicao = %s ORDER BY t_id LIMIT 1",
+        (nome, serie_id, escola_id)
+    )
+
+
+def escolas_da_turma(referencias: Dict[str, Any], nome_serie: str, nome_turma: str, cursor=None) -> Dict[int, str]:
+    """Escolas (i_id -> i_nome) que têm a turma na série, pelos nomes; ver localizar_escola"""
+    if referencias["comparacao_em_memoria"]:
+        return referencias["escolas_por_turma"].get((collation_key(nome_serie), collation_key(nome_turma)), {})
+    cursor.execute(
+        "SELECT i.i_id, i.i_nome FROM turmas t "
+        "INNER JOIN series s ON s.s_id = t.t_serie "
+        "INNER JOIN instituicoes i ON i.i_id = t.t_instituicao "
+        "WHERE s.s_nome = %s AND t.t_nome = %s ORDER BY t.t_id",
+        (nome_serie, nome_turma)
+    )
+    escolas = {}
+    for linha in cursor.fetchall():
+        i_id, i_nome = (linha['i_id'], linha['i_nome']) if isinstance(linha, dict) else linha
+        escolas[i_id] = i_nome
+    return escolas
+
+
+def chave_comparacao(referencias: Optional[Dict[str, Any]], valor: str) -> str:
+    """
+    Chave para comparar valores lidos do banco com os do arquivo (como RAs): collation_key
+    quando a comparação em memória é válida (ou sem referências); senão o próprio valor,
+    já que nesse caso os valores do banco são buscados um a um pelo valor do arquivo
+    """
+    if referencias is None or referencias["comparacao_em_memoria"]:
+        return collation_key(valor)
+    return valor
+
+
+def obter_referencias(db_name: str, connection=None) -> Dict[str, Any]:
+    """
+    Retorna os dados de referência do banco (ver carregar_referencias), do cache
+    quando disponíveis. Os dados retornados são compartilhados: não devem ser alterados.
+
+    Args:
+        db_name: Nome do banco de dados
+        connection: Conexão já posicionada no banco, usada se for preciso carregar
+            (sem ela, uma conexão é aberta apenas nesse caso)
+    """
+    def carregar():
+        if connection is not None:
+            return carregar_referencias(connection.cursor(dictionary=True))
+        with get_db_connection() as nova_conexao:
+            cursor = nova_conexao.cursor(dictionary=True)
+            cursor.execute(f"USE {db_name}")
+            return carregar_referencias(cursor)
+
+    return get_reference_snapshot(db_name, carregar)
+
+
+def recarregar_referencias(db_name: str, connection=None) -> Dict[str, Any]:
+    """
+    Descarta os dados de referência do banco em cache neste worker e carrega novamente
+    (ver obter_referencias). Para quando o cache pode estar desatualizado: a importação
+    de estrutura só invalida o cache do worker que a executou
+    """
+    invalidate_reference_cache(db_name)
+    return obter_referencias(db_name, connection)
+
+
+def exemplos_referencias(referencias: Dict[str, Any], limite: int = 10) -> Dict[str, list]:
+    """
+    Primeiras escolas, séries e turmas em ordem alfabética (como o ORDER BY ... LIMIT no banco)
+    """
+    nomes_escolas = referencias["nomes_escolas"]
+    nomes_series = referencias["nomes_series"]
+
+    instituicoes = heapq.nsmallest(
+        limite,
+        ({"i_id": i_id, "i_nome": nome} for i_id, nome in nomes_escolas.items()),
+        key=lambda escola: collation_key(escola["i_nome"])
+    )
+    series = heapq.nsmallest(
+        limite,
+        ({"s_id": s_id, "s_nome": nome} for s_id, nome in nomes_series.items()),
+        key=lambda serie: collation_key(serie["s_nome"])
+    )
+    turmas = heapq.nsmallest(
+        limite,
+        (
+            {
+                "t_id": turma["t_id"],
+                "t_nome": turma["t_nome"],
+                "serie_nome": nomes_series[turma["t_serie"]],
+                "instituicao_nome": nomes_escolas[turma["t_instituicao"]]
+            }
+            for turma in referencias["lista_turmas"]
+            if turma["t_serie"] in nomes_series and turma["t_instituicao"] in nomes_escolas
+        ),
+        key=lambda turma: (
+            collation_key(turma["instituicao_nome"]),
+            collation_key(turma["serie_nome"]),
+            collation_key(turma["t_nome"])
+        )
+    )
+    return {"instituicoes": instituicoes, "series": series, "turmas": turmas}
@@ -0,0 +1,142 @@
+"""
+Armazenamento colunar das linhas de uma sessão de importação
+Cada coluna é guardada separadamente; colunas com poucos valores distintos
+(ESCOLA, SERIE, TURMA...) usam codificação por dicionário (array de códigos + valores únicos)
+"""
+from array import array
+from typing import Iterator, List
+from app.core.config import IMPORT_CONFIG
+
+
+class ColumnarRows:
+    """
+    Contêiner de linhas (listas de strings) armazenado por coluna
+
+    Uso:
+        rows = ColumnarRows()
+        rows.append(["1", "JOAO", "ESCOLA A"])
+        rows.freeze()       # define a representação final de cada coluna
+        rows[0]             # ["1", "JOAO", "ESCOLA A"]
+        for row in rows: ...
+    """
+
+    # Linhas avaliadas antes de decidir quais colunas não compensam dicionário
+    PROBE_ROWS = 1024
+
+    def __init__(self, dictionary_ratio: float = None):
+        if dictionary_ratio is None:
+            dictionary_ratio = IMPORT_CONFIG["session_dictionary_ratio"]
+        self.dictionary_ratio = dictionary_ratio
+        self.width = None
+        self.frozen = False
+        self._length = 0
+        # Por coluna: códigos (array), valores únicos (list) e índice valor -> código (dict)
+        self._codes = []
+        self._values = []
+        self._index = []
+        # Por coluna: lista simples de valores (colunas de alta cardinalidade) ou None
+        self._plain = []
+
+    def append(self, row: List[str]) -> None:
+        """Adiciona uma linha (todas as linhas devem ter a mesma largura)"""
+        if self.frozen:
+            raise RuntimeError("ColumnarRows já foi finalizado (freeze)")
+
+        if self.width is None:
+            self.width = len(row)
+            self._codes = [array('I') for _ in range(self.width)]
+            self._values = [[] for _ in range(self.width)]
+            self._index = [{} for _ in range(self.width)]
+            self._plain = [None] * self.width
+        elif len(row) != self.width:
+            raise ValueError(f"Linha com {len(row)} colunas, esperado {self.width}")
+
+        for col, value in enumerate(row):
+            plain = self._plain[col]
+            if plain is not None:
+                plain.append(value)
+                continue
+
+            index = self._index[col]
+            code = index.get(value)
+            if code is None:
+                values = self._values[col]
+                code = len(values)
+                values.append(value)
+                index[value] = code
+            self._codes[col].append(code)
+
+        self._length += 1
+        if self._length == self.PROBE_ROWS:
+            self._demote_high_cardinality()
+
+    def _demote_high_cardinality(self) -> None:
+        """Converte para lista simples as colunas com muitos valores distintos (ex.: NOME, RA)"""
+        for col in range(self.width or 0):
+            values = self._values[col]
+            if self._plain[col] is None and len(values) > self._length * self.dictionary_ratio:
+                self._plain[col] = list(map(values.__getitem__, self._codes[col]))
+                self._codes[col] = None
+                self._values[col] = None
+                self._index[col] = None
+
+    def freeze(self) -> "ColumnarRows":
+        """
+        Finaliza a carga: colunas com muitos valores distintos viram listas simples,
+        as demais mantêm a codificação por dicionário com o menor tipo de código possível
+        """
+        if self.frozen:
+            return self
+
+        self._demote_high_cardinality()
+        for col in range(self.width or 0):
+            values = self._values[col]
+            if values is not None and len(values) <= 0xFFFF:
+                typecode = 'B' if len(values) <= 0xFF else 'H'
+                self._codes[col] = array(typecode, self._codes[col])
+
+        self._index = []
+        self.frozen = True
+        return self
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _column_iter(self, col: int) -> Iterator[str]:
+        plain = self._plain[col]
+        if plain is not None:
+            return iter(plain)
+        return map(self._values[col].__getitem__, self._codes[col])
+
+    def column(self, col: int) -> List[str]:
+        """Retorna todos os valores de uma coluna"""
+        if not self._length:
+            return []
+        return list(self._column_iter(col))
+
+    def row(self, row_index: int) -> List[str]:
+        """Materializa uma linha como lista de strings"""
+        if row_index < 0:
+            row_index += self._length
+        if not 0 <= row_index < self._length:
+            raise IndexError("índice de linha fora do intervalo")
+
+        result = []
+        for col in range(self.width):
+            plain = self._plain[col]
+            if plain is not None:
+                result.append(plain[row_index])
+            else:
+                result.append(self._values[col][self._codes[col][row_index]])
+        return result
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.row(i) for i in range(*item.indices(self._length))]
+        return self.row(item)
+
+    def __iter__(self) -> Iterator[List[str]]:
+        if not self._length:
+            return
+        for row in zip(*[self._column_iter(col) for col in range(self.width)]):
+            yield list(row)
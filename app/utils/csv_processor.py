@@ -4,7 +4,11 @@ Processador de arquivos CSV
 import csv
 import io
 import hashlib
-from typing import List, Dict, Any
+import itertools
+from typing import List, Dict, Any, Iterable, Iterator, Union
+from app.core.config import IMPORT_CONFIG
+from app.core.process_pool import map_bounded, pool_enabled
+from app.utils.upload_reader import UploadError
 
 def detect_duplicates(data_list: List[Dict], key_fields: List[str]) -> Dict[str, List[int]]:
     """
@@ -29,38 +33,45 @@ def detect_duplicates(data_list: List[Dict], key_fields: List[str]) -> Dict[str,
     
     return duplicates
 
-def process_csv_data(file_content: str, required_fields: List[str]) -> Dict[str, Any]:
+def _use_parallel_parse(size_hint: int) -> bool:
+    """Decide se o arquivo é grande o suficiente para o parse em paralelo"""
+    threshold = IMPORT_CONFIG["parallel_parse_threshold"]
+    return bool(threshold and size_hint and size_hint >= threshold and pool_enabled())
+
+def _iter_record_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[str]:
     """
-    Processa dados do CSV e retorna dados validados e erros
-    Aceita delimitadores: vírgula (,) ou ponto e vírgula (;)
+    Agrupa linhas em blocos de aproximadamente chunk_size caracteres
+    O corte só acontece fora de aspas (paridade de aspas), para que um campo
+    entre aspas com quebra de linha nunca fique dividido entre dois blocos
     """
-    errors = []
-    valid_rows = []
-    total_rows = 0
+    buffer = []
+    size = 0
+    in_quotes = False
 
-    try:
-        # Remove BOM se existir
-        if file_content.startswith('\ufeff'):
-            file_content = file_content[1:]
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if size >= chunk_size and not in_quotes:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
 
-        # Detecta delimitador (vírgula ou ponto e vírgula)
-        sample = file_content[:1024]
-        delimiter = ','
+    if buffer:
+        yield "".join(buffer)
 
-        try:
-            sniffer = csv.Sniffer()
-            detected = sniffer.sniff(sample, delimiters=',;')
-            delimiter = detected.delimiter
-        except:
-            # Se falhar, tenta detectar manualmente
-            if ';' in sample and sample.count(';') > sample.count(','):
-                delimiter = ';'
-
-        # Lê CSV
-        csv_reader = csv.DictReader(io.StringIO(file_content), delimiter=delimiter)
+def _process_csv_rows(csv_reader, required_fields: List[str], valid_rows: List, errors: List, start: int = 2):
+    """
+    Normaliza e valida as linhas do leitor, acumulando em valid_rows/errors
 
-        for row_idx, row in enumerate(csv_reader, start=2):  # Linha 2 porque 1 é header
-            total_rows = row_idx - 1
+    Returns:
+        Tupla (quantidade de linhas lidas, exceção que interrompeu o processamento ou None)
+    """
+    total_rows = 0
+    try:
+        for row_idx, row in enumerate(csv_reader, start=start):
+            total_rows = row_idx - start + 1
 
             # Normaliza chaves do dicionário (remove espaços e converte para maiúsculas)
             normalized_row = {}
@@ -88,6 +99,113 @@ def process_csv_data(file_content: str, required_fields: List[str]) -> Dict[str,
                 "dados": normalized_row
             })
 
+    except UploadError:
+        raise
+
+    except Exception as e:
+        return total_rows, e
+
+    return total_rows, None
+
+def _process_csv_chunk(text: str, delimiter: str, fieldnames: List[str], required_fields: List[str]):
+    """Processa um bloco do CSV no pool de processos (linhas numeradas a partir de 0)"""
+    valid_rows = []
+    errors = []
+    csv_reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames, delimiter=delimiter)
+    total_rows, failure = _process_csv_rows(csv_reader, required_fields, valid_rows, errors, start=0)
+    return valid_rows, errors, total_rows, str(failure) if failure else None
+
+def process_csv_data(file_content: Union[str, Iterable[str]], required_fields: List[str], size_hint: int = None) -> Dict[str, Any]:
+    """
+    Processa dados do CSV e retorna dados validados e erros
+    Aceita delimitadores: vírgula (,) ou ponto e vírgula (;)
+    Aceita o conteúdo completo (str) ou um stream de texto, lido linha a linha
+    Arquivos a partir de IMPORT_CONFIG['parallel_parse_threshold'] são processados
+    em blocos no pool de processos, mantendo a numeração original das linhas
+
+    Args:
+        file_content: Conteúdo do arquivo ou stream de texto
+        required_fields: Campos que não podem estar vazios
+        size_hint: Tamanho do arquivo em bytes, quando file_content é um stream
+    """
+    errors = []
+    valid_rows = []
+    total_rows = 0
+
+    try:
+        if isinstance(file_content, str):
+            size_hint = len(file_content)
+            # Remove BOM se existir
+            if file_content.startswith('\ufeff'):
+                file_content = file_content[1:]
+            sample = file_content[:1024]
+            lines = io.StringIO(file_content)
+        else:
+            # Lê apenas a amostra (completando a última linha) e encadeia o restante do stream
+            head = file_content.read(1024)
+            head += file_content.readline()
+            if head.startswith('\ufeff'):
+                head = head[1:]
+            sample = head[:1024]
+            lines = itertools.chain(io.StringIO(head), file_content)
+
+        # Detecta delimitador (vírgula ou ponto e vírgula)
+        delimiter = ','
+
+        try:
+            sniffer = csv.Sniffer()
+            detected = sniffer.sniff(sample, delimiters=',;')
+            delimiter = detected.delimiter
+        except:
+            # Se falhar, tenta detectar manualmente
+            if ';' in sample and sample.count(';') > sample.count(','):
+                delimiter = ';'
+
+        header_line = None
+        if _use_parallel_parse(size_hint):
+            header_line = next(lines, "")
+            if header_line.count('"') % 2:
+                # Cabeçalho com aspas em aberto: segue pelo caminho sequencial
+                lines = itertools.chain([header_line], lines)
+                header_line = None
+
+        if header_line is None:
+            # Lê CSV
+            csv_reader = csv.DictReader(lines, delimiter=delimiter)
+            total_rows, failure = _process_csv_rows(csv_reader, required_fields, valid_rows, errors)
+        else:
+            # Parse paralelo: cabeçalho lido aqui, blocos de registros processados no pool
+            fieldnames = next(csv.reader([header_line], delimiter=delimiter), [])
+            chunks = _iter_record_chunks(lines, IMPORT_CONFIG["parallel_parse_chunk_size"])
+            failure = None
+
+            for chunk_valid, chunk_errors, chunk_rows, chunk_failure in map_bounded(
+                _process_csv_chunk, chunks, delimiter, fieldnames, required_fields
+            ):
+                # Linha 2 porque 1 é header
+                offset = total_rows + 2
+                for row in chunk_valid:
+                    row["linha_original"] += offset
+                    valid_rows.append(row)
+                for error in chunk_errors:
+                    error["linha"] += offset
+                    errors.append(error)
+
+                total_rows += chunk_rows
+                if chunk_failure:
+                    failure = chunk_failure
+                    break
+
+        if failure:
+            errors.append({
+                "linha": 0,
+                "erro": f"Erro ao processar CSV: {str(failure)}",
+                "dados": {}
+            })
+
+    except UploadError:
+        raise  # Arquivo acima do limite ou corrompido: não processa dados parciais
+
     except Exception as e:
         errors.append({
             "linha": 0,
@@ -101,55 +219,106 @@ def process_csv_data(file_content: str, required_fields: List[str]) -> Dict[str,
         "total_rows": total_rows
     }
 
-def parse_csv_basic(file_content: str) -> Dict[str, Any]:
+def _parse_basic_rows(reader, width: int, cell_transform, data_rows) -> None:
+    """Converte os registros do leitor em linhas com trim, transformação e largura fixa"""
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error:
+            continue  # Ignora linhas com erro de parsing
+
+        # Ignora linhas em branco
+        if not row or (len(row) == 1 and not row[0].strip()):
+            continue
+
+        values = list(map(str.strip, row))
+        if cell_transform is not None:
+            values = list(map(cell_transform, values))
+
+        # Ajusta número de colunas
+        if len(values) < width:
+            values.extend([""] * (width - len(values)))
+
+        data_rows.append(values[:width])
+
+def _parse_basic_chunk(text: str, delimiter: str, width: int, cell_transform) -> List[List[str]]:
+    """Faz o parse de um bloco do CSV no pool de processos"""
+    data_rows = []
+    reader = csv.reader(io.StringIO(text, newline=''), delimiter=delimiter, skipinitialspace=True)
+    _parse_basic_rows(reader, width, cell_transform, data_rows)
+    return data_rows
+
+def parse_csv_basic(file_content: Union[str, Iterable[str]], cell_transform=None, data_rows=None, size_hint: int = None) -> Dict[str, Any]:
     """
     Parse básico de CSV retornando headers e linhas de dados
     Aceita delimitadores: vírgula (,) ou ponto e vírgula (;)
+    Aceita o conteúdo completo (str) ou um stream de texto, lido linha a linha
+    Usa o leitor nativo (C) do módulo csv: respeita aspas, inclusive campos com quebra de linha
+    Arquivos a partir de IMPORT_CONFIG['parallel_parse_threshold'] são processados
+    em blocos no pool de processos, preservando a ordem das linhas
+
+    Args:
+        file_content: Conteúdo do arquivo ou stream de texto
+        cell_transform: Função opcional aplicada a cada célula já com trim (ex.: str.upper)
+        data_rows: Contêiner opcional que recebe as linhas via append (default: lista)
+        size_hint: Tamanho do arquivo em bytes, quando file_content é um stream
     """
-    lines = [line.strip() for line in file_content.split('\n') if line.strip()]
-    if len(lines) < 2:
-        return {
-            "success": False,
-            "message": "O arquivo deve conter pelo menos uma linha de cabeçalho e uma linha de dados.",
-            "headers": [],
-            "data_rows": []
-        }
+    if isinstance(file_content, str):
+        size_hint = len(file_content)
+        lines = io.StringIO(file_content, newline='')
+    else:
+        lines = iter(file_content)
+
+    # Primeira linha não vazia: usada para detectar o delimitador
+    first_line = ""
+    for line in lines:
+        if line.strip():
+            first_line = line
+            break
 
     # Detecta delimitador (vírgula ou ponto e vírgula)
-    first_line = lines[0]
     delimiter = ','
     if ';' in first_line and first_line.count(';') > first_line.count(','):
         delimiter = ';'
 
-    headers = [h.strip().upper() for h in lines[0].split(delimiter)]
-    data_rows = []
-
-    for i, line in enumerate(lines[1:], 2):
-        try:
-            # Parser CSV básico
-            values = []
-            current = ""
-            in_quotes = False
+    if data_rows is None:
+        data_rows = []
 
-            for char in line:
-                if char == '"':
-                    in_quotes = not in_quotes
-                elif char == delimiter and not in_quotes:
-                    values.append(current.strip())
-                    current = ""
-                else:
-                    current += char
+    if _use_parallel_parse(size_hint) and first_line.count('"') % 2 == 0:
+        # Parse paralelo: cabeçalho lido aqui, blocos de registros processados no pool
+        headers = [h.strip().upper() for h in next(csv.reader([first_line], delimiter=delimiter, skipinitialspace=True))]
+        chunks = _iter_record_chunks(lines, IMPORT_CONFIG["parallel_parse_chunk_size"])
+        for chunk_rows in map_bounded(_parse_basic_chunk, chunks, delimiter, len(headers), cell_transform):
+            for row in chunk_rows:
+                data_rows.append(row)
+    else:
+        reader = csv.reader(itertools.chain([first_line], lines), delimiter=delimiter, skipinitialspace=True)
 
-            values.append(current.strip())
+        headers = None
+        while headers is None:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error:
+                continue
 
-            # Ajusta número de colunas
-            while len(values) < len(headers):
-                values.append("")
+            # Ignora linhas em branco antes do cabeçalho
+            if row and (len(row) > 1 or row[0].strip()):
+                headers = [h.strip().upper() for h in row]
 
-            data_rows.append(values[:len(headers)])
+        if headers is not None:
+            _parse_basic_rows(reader, len(headers), cell_transform, data_rows)
 
-        except Exception as e:
-            continue  # Ignora linhas com erro de parsing
+    if headers is None or not data_rows:
+        return {
+            "success": False,
+            "message": "O arquivo deve conter pelo menos uma linha de cabeçalho e uma linha de dados.",
+            "headers": [],
+            "data_rows": []
+        }
 
     return {
         "success": True,
@@ -157,4 +326,3 @@ def parse_csv_basic(file_content: str) -> Dict[str, Any]:
         "data_rows": data_rows,
         "total_rows": len(data_rows)
     }
-
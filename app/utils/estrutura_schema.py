@@ -0,0 +1,64 @@
+"""
+Esquema de validação das linhas do CSV de estrutura (Escola, Série, Turma)
+Fica fora do serviço de estrutura para poder ser importado pelos processos do
+pool (spawn) sem abrir conexões com o banco
+"""
+from typing import Dict, List
+from app.utils.text_utils import has_special_characters, find_special_characters, CARACTERES_ESPECIAIS
+from app.utils.row_schema import Column, RowSchema, RowValidation, Validator
+
+
+def _coluna_estrutura(name: str, label: str) -> Column:
+    """Coluna de nome (escola, série ou turma) do CSV de estrutura"""
+    return Column(
+        name,
+        label=label,
+        validators=(Validator(
+            lambda value: not has_special_characters(value),
+            CARACTERES_ESPECIAIS,
+            "Nome {label} contém caracteres especiais inválidos: '{value}'",
+            batch=find_special_characters
+        ),),
+        untrimmed_warning="Nome {label} contém espaços no início ou fim: '{value}'"
+    )
+
+
+# Esquema de validação das linhas de estrutura (a linha para no primeiro erro)
+ESTRUTURA_ROW_SCHEMA = RowSchema([
+    _coluna_estrutura("ESCOLA", "da escola"),
+    _coluna_estrutura("SERIE", "da série"),
+    _coluna_estrutura("TURMA", "da turma"),
+], stop_on_error=True)
+
+
+def _validar_bloco(rows: List[Dict[str, str]]) -> List[RowValidation]:
+    """Valida um bloco de linhas pelo esquema (executado no pool de processos)"""
+    return ESTRUTURA_ROW_SCHEMA.validate_rows(rows)
+
+
+def validar_linhas_estrutura(rows: List[Dict[str, str]], parallel_threshold: int = None,
+                             chunk_size: int = 5000) -> List[RowValidation]:
+    """
+    Valida as linhas pelo esquema de estrutura (mesmo resultado de ESTRUTURA_ROW_SCHEMA.validate_rows)
+    A partir de parallel_threshold linhas, a validação é feita em blocos de chunk_size
+    linhas no pool de processos
+
+    Args:
+        rows: Dados das linhas (coluna -> valor)
+        parallel_threshold: Linhas a partir das quais o pool de processos é usado
+            (None/0: sempre no processo atual)
+        chunk_size: Linhas por bloco enviado ao pool
+    """
+    if not parallel_threshold or len(rows) < parallel_threshold:
+        return ESTRUTURA_ROW_SCHEMA.validate_rows(rows)
+
+    # Importado apenas aqui: o pool depende da configuração da aplicação
+    from app.core.process_pool import map_bounded, pool_enabled
+    if not pool_enabled():
+        return ESTRUTURA_ROW_SCHEMA.validate_rows(rows)
+
+    chunks = (rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size))
+    validacoes = []
+    for chunk_validacoes in map_bounded(_validar_bloco, chunks):
+        validacoes.extend(chunk_validacoes)
+    return validacoes
@@ -0,0 +1,84 @@
+"""
+Registros compactos das linhas validadas de uma importação
+Cada linha é guardada uma única vez, em um registro com __slots__ e os valores em
+tupla na ordem dos campos; as demais listas dos resultados (conflitos, duplicatas,
+nomes similares...) referenciam a linha pelo row_index e os dicts de dados só são
+criados na serialização (serialize)
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RowRecord:
+    """
+    Linha validada: índice no arquivo, valores e anotações da validação (errors,
+    conflicts) e da resolução de conflitos (skip_import, import_with_conflict, update_existing)
+    """
+
+    __slots__ = ("row_index", "values", "errors", "conflicts", "skip_import", "import_with_conflict", "update_existing")
+
+    def __init__(self, row_index: int, values: Tuple[str, ...]):
+        self.row_index = row_index
+        self.values = values
+        self.errors = None
+        self.conflicts = None
+        self.skip_import = False
+        self.import_with_conflict = False
+        self.update_existing = False
+
+
+class RowRecords:
+    """
+    Linhas validadas de um arquivo (RowRecord), indexadas por row_index
+
+    Uso:
+        rows = RowRecords(["nome", "ra"])
+        record = rows.add({"nome": "JOAO", "ra": "123"})
+        rows.data(record.row_index)     # {"nome": "JOAO", "ra": "123"}
+        rows.serialize(record)          # {"row_index": 0, "data": {...}}
+
+    Args:
+        fields: Campos das linhas, na ordem dos valores
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._records = []
+
+    def add(self, data: Dict[str, str]) -> RowRecord:
+        """Guarda a próxima linha do arquivo (row_index = posição) e retorna o registro"""
+        record = RowRecord(len(self._records), tuple(data.get(field, "") for field in self.fields))
+        self._records.append(record)
+        return record
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, row_index: int) -> RowRecord:
+        return self._records[row_index]
+
+    def data(self, row_index: int) -> Dict[str, str]:
+        """Dados da linha como dict campo -> valor (novo a cada chamada)"""
+        return dict(zip(self.fields, self._records[row_index].values))
+
+    def serialize(self, item: Any) -> Optional[Dict[str, Any]]:
+        """
+        Entrada dos resultados pronta para JSON, com os dados da linha em "data":
+        um RowRecord ou um dict que referencia a linha por row_index
+        """
+        if not isinstance(item, RowRecord):
+            return {**item, "data": self.data(item["row_index"])}
+
+        data = self.data(item.row_index)
+        entry = {"row_index": item.row_index, "data": data}
+        if item.errors is not None:
+            entry["errors"] = list(item.errors)
+        else:
+            # Linha válida: sem conflitos, conflicts fica None no registro (sem lista vazia por linha)
+            entry["conflicts"] = [{**conflict, "data": data} for conflict in item.conflicts or ()]
+        for flag in ("skip_import", "import_with_conflict", "update_existing"):
+            if getattr(item, flag):
+                entry[flag] = True
+        return entry
+
+    def serialize_all(self, items: List[Any]) -> List[Dict[str, Any]]:
+        return [self.serialize(item) for item in items]
@@ -0,0 +1,257 @@
+"""
+Esquema declarativo de validação de linhas de importação
+Cada coluna declara se é obrigatória, o normalizador e os validadores; o esquema
+é compilado uma única vez em uma função de validação especializada para as
+colunas do arquivo (sem consultas ao esquema nem laços por célula em cada linha)
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Códigos de erro gerados pelo próprio esquema
+CAMPO_OBRIGATORIO = "campo_obrigatorio"
+CAMPO_AUSENTE = "campo_ausente"
+ESPACOS_EXTRAS = "espacos_extras"
+
+
+class Validator:
+    """
+    Validação de um campo preenchido
+
+    Args:
+        check: Função que recebe o valor (já com trim e normalizado) e retorna True se válido
+        code: Código do erro (ex.: 'caracteres_especiais')
+        message: Mensagem do erro; aceita {label} e {value}
+        batch: Versão opcional para a coluna inteira (usada por validate_rows): recebe
+            os valores da coluna e retorna (índice, código) dos inválidos
+    """
+
+    def __init__(self, check: Callable[[str], bool], code: str, message: str,
+                 batch: Callable[[List[str]], List[Tuple[int, str]]] = None):
+        self.check = check
+        self.code = code
+        self.message = message
+        self.batch = batch
+
+
+class Column:
+    """
+    Coluna do esquema
+
+    Args:
+        name: Nome do campo no resultado
+        source: Chave da coluna na linha (linhas em dict; default: name)
+        required: Campo não pode estar vazio
+        normalizer: Função aplicada ao valor depois do trim (ex.: str.lower)
+        validators: Validações aplicadas apenas quando o valor está preenchido
+        label: Nome do campo nas mensagens (default: name)
+        untrimmed_warning: Mensagem de aviso quando o valor original tem espaços
+            no início ou fim; aceita {label} e {value}
+    """
+
+    def __init__(self, name: str, source: str = None, required: bool = False, normalizer: Callable[[str], str] = None,
+                 validators: Tuple[Validator, ...] = (), label: str = None, untrimmed_warning: str = None):
+        self.name = name
+        self.source = source if source is not None else name
+        self.required = required
+        self.normalizer = normalizer
+        self.validators = tuple(validators)
+        self.label = label if label is not None else name
+        self.untrimmed_warning = untrimmed_warning
+
+
+# Resultado da validação de uma linha: (dados, erros, avisos)
+# Erros e avisos são tuplas (campo, código, mensagem)
+RowValidation = Tuple[Dict[str, str], List[Tuple[str, str, str]], List[Tuple[str, str, str]]]
+
+
+class RowSchema:
+    """
+    Esquema de validação de linhas
+
+    A validação de cada linha segue, para cada coluna:
+    aviso de espaços extras -> trim -> normalizador -> obrigatório -> validadores
+
+    Args:
+        columns: Colunas do esquema
+        stop_on_error: Interrompe a linha no primeiro erro
+        required_message: Mensagem para campo obrigatório vazio
+        missing_message: Mensagem para coluna mapeada que não existe na linha
+    """
+
+    def __init__(self, columns: List[Column], stop_on_error: bool = False,
+                 required_message: str = "Campo '{label}' é obrigatório",
+                 missing_message: str = "Campo '{label}' não encontrado"):
+        self.columns = {column.name: column for column in columns}
+        self.stop_on_error = stop_on_error
+        self.required_message = required_message
+        self.missing_message = missing_message
+        self._compiled = {}
+
+    def compile(self, indices: Optional[Dict[str, int]] = None, skip_batch: bool = False) -> Callable[[Any], RowValidation]:
+        """
+        Retorna a função de validação especializada (compilada uma vez e reutilizada)
+
+        Args:
+            indices: Mapeamento campo -> índice para linhas em lista, na ordem em que
+                os campos devem aparecer no resultado. Campos fora do esquema são
+                apenas extraídos com trim. Se None, as linhas são dicts e todas as
+                colunas do esquema são lidas pela chave (source).
+            skip_batch: Não gera os validadores que têm versão em lote (validate_rows)
+        """
+        key = (tuple(indices.items()) if indices is not None else None, skip_batch)
+        validator = self._compiled.get(key)
+        if validator is None:
+            validator = self._build(indices, skip_batch)
+            self._compiled[key] = validator
+        return validator
+
+    def validate_rows(self, rows: Iterable[Any], indices: Optional[Dict[str, int]] = None,
+                      cache: Optional[Dict[Tuple[str, int], List[Tuple]]] = None) -> List[RowValidation]:
+        """
+        Valida todas as linhas: a função compilada extrai e normaliza cada linha e os
+        validadores com versão em lote rodam uma vez por coluna, sem chamada por célula
+
+        Retorna o mesmo resultado de compile(indices) aplicado a cada linha
+
+        Args:
+            rows: Linhas a validar (com cache, uma sequência percorrida uma vez por campo novo)
+            indices: Mapeamento campo -> índice (ver compile)
+            cache: Resultados por campo, chave (campo, índice): os campos já presentes são
+                reutilizados e apenas os novos são validados e guardados (ex.: nova validação
+                após mudar uma coluna do mapeamento). Requer indices e stop_on_error=False
+        """
+        if cache is not None:
+            return self._validate_rows_cached(rows, indices, cache)
+
+        validate_row = self.compile(indices, skip_batch=True)
+        results = [validate_row(row) for row in rows]
+
+        fields = list(indices) if indices is not None else list(self.columns)
+        failed = set()
+        for name in fields:
+            column = self.columns.get(name)
+            batch_validators = [validator for validator in column.validators if validator.batch] if column else []
+            if not batch_validators:
+                continue
+
+            values = [data.get(name, "") for data, _, _ in results]
+            for validator in batch_validators:
+                message = validator.message.replace("{label}", column.label)
+                for index, code in validator.batch(values):
+                    results[index][1].append((name, code, message.format(value=values[index])))
+                    failed.add(index)
+
+        # Erros na ordem dos campos (e apenas o primeiro, se a linha para no primeiro erro)
+        order = {name: position for position, name in enumerate(fields)}
+        for index in failed:
+            errors = results[index][1]
+            errors.sort(key=lambda error: order[error[0]])
+            if self.stop_on_error:
+                del errors[1:]
+
+        return results
+
+    def _validate_rows_cached(self, rows: Any, indices: Dict[str, int],
+                              cache: Dict[Tuple[str, int], List[Tuple]]) -> List[RowValidation]:
+        """validate_rows campo a campo, com os resultados de cada campo guardados em cache"""
+        if indices is None or self.stop_on_error:
+            raise ValueError("Cache de validação requer indices e stop_on_error=False")
+
+        # Sem parada no primeiro erro, cada campo é validado de forma independente: o
+        # resultado da linha é a junção dos resultados de cada campo, na ordem dos campos
+        columns = []
+        for name, index in indices.items():
+            key = (name, index)
+            if key not in cache:
+                cache[key] = [
+                    (data[name], tuple(errors), tuple(warnings))
+                    for data, errors, warnings in self.validate_rows(rows, {name: index})
+                ]
+            columns.append((name, cache[key]))
+
+        results = []
+        for row_index in range(len(columns[0][1]) if columns else len(rows)):
+            data = {}
+            errors = []
+            warnings = []
+            for name, column in columns:
+                value, column_errors, column_warnings = column[row_index]
+                data[name] = value
+                errors.extend(column_errors)
+                warnings.extend(column_warnings)
+            results.append((data, errors, warnings))
+        return results
+
+    def _build(self, indices: Optional[Dict[str, int]], skip_batch: bool = False) -> Callable[[Any], RowValidation]:
+        """Gera e compila o código da função de validação"""
+        if indices is None:
+            fields = [(column, None) for column in self.columns.values()]
+        else:
+            fields = [(self.columns.get(name) or Column(name), index) for name, index in indices.items()]
+
+        namespace = {}
+        stop = self.stop_on_error
+        lines = [
+            "def validate_row(row):",
+            "    data = {}",
+            "    errors = []",
+            "    warnings = []",
+        ]
+        if indices is not None:
+            lines.append("    size = len(row)")
+
+        # Leitura dos valores originais (e avisos de espaços extras, emitidos antes dos erros)
+        for i, (column, index) in enumerate(fields):
+            if index is None:
+                lines.append(f"    v{i} = row.get({column.source!r}, '')")
+            else:
+                lines.append(f"    v{i} = row[{index}] if {index} < size else None")
+
+            if column.untrimmed_warning:
+                namespace[f"W{i}"] = column.untrimmed_warning.replace("{label}", column.label)
+                lines.append(f"    if v{i} and v{i} != v{i}.strip():")
+                lines.append(f"        warnings.append(({column.name!r}, {ESPACOS_EXTRAS!r}, W{i}.format(value=v{i})))")
+
+        # Trim, normalização e validações
+        for i, (column, index) in enumerate(fields):
+            name = repr(column.name)
+            indent = "    "
+
+            if index is not None:
+                lines.append(f"    if v{i} is None:")
+                lines.append(f"        data[{name}] = ''")
+                if column.required:
+                    namespace[f"M{i}"] = self.missing_message.format(label=column.label)
+                    lines.append(f"        errors.append(({name}, {CAMPO_AUSENTE!r}, M{i}))")
+                    if stop:
+                        lines.append("        return data, errors, warnings")
+                lines.append("    else:")
+                indent = "        "
+
+            lines.append(f"{indent}v{i} = v{i}.strip()")
+            if column.normalizer is not None:
+                namespace[f"N{i}"] = column.normalizer
+                lines.append(f"{indent}v{i} = N{i}(v{i})")
+            lines.append(f"{indent}data[{name}] = v{i}")
+
+            if column.required:
+                namespace[f"R{i}"] = self.required_message.format(label=column.label)
+                lines.append(f"{indent}if not v{i}:")
+                lines.append(f"{indent}    errors.append(({name}, {CAMPO_OBRIGATORIO!r}, R{i}))")
+                if stop:
+                    lines.append(f"{indent}    return data, errors, warnings")
+
+            validators = [validator for validator in column.validators if not (skip_batch and validator.batch)]
+            if validators:
+                lines.append(f"{indent}if v{i}:")
+                for j, validator in enumerate(validators):
+                    namespace[f"C{i}_{j}"] = validator.check
+                    namespace[f"E{i}_{j}"] = validator.message.replace("{label}", column.label)
+                    lines.append(f"{indent}    if not C{i}_{j}(v{i}):")
+                    lines.append(f"{indent}        errors.append(({name}, {validator.code!r}, E{i}_{j}.format(value=v{i})))")
+                    if stop:
+                        lines.append(f"{indent}        return data, errors, warnings")
+
+        lines.append("    return data, errors, warnings")
+
+        exec(compile("\n".join(lines), "<row_schema>", "exec"), namespace)
+        return namespace["validate_row"]
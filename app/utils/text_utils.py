@@ -2,8 +2,25 @@
 Utilitários para manipulação de texto
 """
 import html
+import math
 import re
 import unicodedata
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+# Sem dependência da configuração da aplicação: o módulo também é importado pelos
+# processos do pool (spawn) ao executar _similar_names_chunk
+
+# Valores normalizados (normalize_text, collation_key, blocking_keys) mantidos em cache LRU
+NORMALIZE_CACHE_SIZE = 8192
+# Letras da chave fonética de cada palavra usadas na blocagem (blocking_keys)
+PHONETIC_BLOCKING_PREFIX = 3
+
+# A partir deste número de nomes, a comparação um-contra-muitos usa o cálculo vetorizado (NumPy)
+BATCH_SIMILARITY_MIN_SIZE = 8
 
 def ai(STR):
     """Sanitiza string para prevenir injeção"""
@@ -11,37 +28,73 @@ def ai(STR):
     STR = STR.replace(";", "")
     return str(STR)
 
+# Padrões pré-compilados das validações de texto
+_SPECIAL_CHARACTERS_PATTERN = re.compile(r'^[A-Za-z0-9\sÀ-ÿ]+$')
+_EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}$')
+
+# Versões para varrer uma coluna inteira (um valor por linha)
+_SPECIAL_CHARACTER = re.compile(r'[^A-Za-z0-9\sÀ-ÿ]')
+_SPECIAL_CHARACTERS_ALLOWED = bytes(code for code in range(256) if not _SPECIAL_CHARACTER.match(chr(code)))
+# Linha preenchida que, sem os espaços das pontas, não é um email válido
+_INVALID_EMAIL_LINE = re.compile(
+    r'^(?![^\S\n]*$)(?![^\S\n]*[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}[^\S\n]*$)',
+    re.MULTILINE
+)
+
+# Códigos de erro das validações em lote
+CARACTERES_ESPECIAIS = "caracteres_especiais"
+EMAIL_INVALIDO = "email_invalido"
+
 def has_special_characters(text: str) -> bool:
     """
     Verifica se o texto contém caracteres especiais inválidos
     Permitido: letras (A-Z, a-z, com acentos), números (0-9), espaços
-    Não permitido: @#$%&*()[]{}|\/~^`etc
+    Não permitido: @#$%&*()[]{}|\\/~^`etc
     """
     if not text or not isinstance(text, str):
         return False
 
     # Verifica se contém apenas letras (incluindo acentuadas), números e espaços
-    pattern = r'^[A-Za-z0-9\sÀ-ÿ]+$'
-
     # Se NÃO der match, significa que tem caracteres especiais
-    has_invalid = not bool(re.match(pattern, text))
+    return not _SPECIAL_CHARACTERS_PATTERN.match(text)
 
-    if has_invalid:
-        print(f"⚠️ Caracteres especiais detectados em: '{text}'")
+def _failing_positions(pattern: re.Pattern, values: List[str], text: str) -> List[int]:
+    """
+    Retorna os índices dos valores em que o padrão encontra ocorrência, com uma única
+    varredura do regex sobre a coluna já unida (text = "\\n".join(values))
+    """
+    match = pattern.search(text)
+    if not match:
+        return []
 
-    return has_invalid
+    # Início do valor seguinte a cada valor (posição logo após o separador)
+    starts = list(accumulate(len(value) + 1 for value in values))
+    failing = []
+    while match:
+        index = bisect_right(starts, match.start())
+        failing.append(index)
+        # Continua a partir do próximo valor
+        match = pattern.search(text, starts[index]) if index + 1 < len(values) else None
+    return failing
 
-def normalize_text(text: str) -> str:
+def find_special_characters(values: List[str]) -> List[Tuple[int, str]]:
     """
-    Normaliza texto:
-    - Trim (remove espaços início/fim)
-    - Converte para MAIÚSCULO
-    - Remove espaços extras (múltiplos espaços viram um)
-    - Remove acentos
+    Versão em lote de has_special_characters para uma coluna inteira (sem log)
+    Retorna (índice, 'caracteres_especiais') de cada valor preenchido inválido
     """
-    if not text or not isinstance(text, str):
-        return ""
+    # Valor inválido = contém algum caractere fora de [A-Za-z0-9\sÀ-ÿ] (o \n separador é permitido)
+    text = "\n".join(values)
+    try:
+        # Caminho rápido: coluna em Latin-1 sem nenhum caractere fora dos permitidos
+        if not text.encode("latin-1").translate(None, _SPECIAL_CHARACTERS_ALLOWED):
+            return []
+    except UnicodeEncodeError:
+        pass
+
+    return [(index, CARACTERES_ESPECIAIS) for index in _failing_positions(_SPECIAL_CHARACTER, values, text)]
 
+def _normalize_text_slow(text: str) -> str:
+    """Normalização completa (Unicode) usada para caracteres fora da tabela de tradução"""
     # 1. Trim - remove espaços do início e fim
     text = text.strip()
 
@@ -60,6 +113,71 @@ def normalize_text(text: str) -> str:
 
     return text.strip()
 
+# Tabela de tradução para ASCII e Latin-1/Latin Extended (U+0000-U+024F): resultado dos
+# passos 4 e 5 para cada caractere (remove acento ou descarta o caractere)
+_NORMALIZE_TABLE_LIMIT = '\u024f'
+_NORMALIZE_TABLE = str.maketrans({
+    chr(code): re.sub(
+        r'[^A-Z0-9\s]', '',
+        ''.join(char for char in unicodedata.normalize('NFD', chr(code)) if unicodedata.category(char) != 'Mn')
+    )
+    for code in range(ord(_NORMALIZE_TABLE_LIMIT) + 1)
+})
+
+# Texto já normalizado em ASCII (só letras maiúsculas, números e espaços simples)
+_ASCII_NORMALIZED = re.compile(r'[A-Z0-9 ]*')
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_text_cached(text: str) -> str:
+    # Trim, maiúsculo e espaços extras
+    text = ' '.join(text.upper().split())
+
+    # Caminho rápido ASCII: nada a remover
+    if text.isascii() and _ASCII_NORMALIZED.fullmatch(text):
+        return text
+
+    # Todos os caracteres estão na tabela (ASCII e Latin)
+    if max(text) <= _NORMALIZE_TABLE_LIMIT:
+        return text.translate(_NORMALIZE_TABLE).strip()
+
+    return _normalize_text_slow(text)
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza texto:
+    - Trim (remove espaços início/fim)
+    - Converte para MAIÚSCULO
+    - Remove espaços extras (múltiplos espaços viram um)
+    - Remove acentos
+    Valores repetidos vêm de um cache LRU; textos em ASCII/Latin usam tabela de tradução
+    """
+    if not text or not isinstance(text, str):
+        return ""
+
+    return _normalize_text_cached(text)
+
+def normalize_column(values: Iterable[str]) -> List[str]:
+    """
+    Normaliza uma coluna inteira de uma vez (normalize_text em cada valor)
+    Cada valor distinto é normalizado uma única vez
+    """
+    values = list(values)
+    normalized = {value: normalize_text(value) for value in set(values)}
+    return [normalized[value] for value in values]
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def collation_key(text: str) -> str:
+    """
+    Chave de comparação equivalente ao '=' do MySQL com collation utf8mb4_general_ci:
+    ignora maiúsculas/minúsculas, acentos e espaços no fim
+    Usada para buscar em memória nomes carregados do banco (ex.: escolas, séries, turmas);
+    só vale para colunas nessa collation (verificada em referencias_service.carregar_referencias)
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFD', text.rstrip(' '))
+    return ''.join(char for char in text if unicodedata.category(char) != 'Mn').upper()
+
 def validate_email(email: str) -> dict:
     """
     Valida email
@@ -86,9 +204,7 @@ def validate_email(email: str) -> dict:
     # Obrigatório: @ no meio
     # Permite: letras, números, ., - depois do @
     # Obrigatório: . seguido de 2-6 letras no final
-    email_pattern = r'^[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}$'
-
-    if not re.match(email_pattern, email):
+    if not _EMAIL_PATTERN.match(email):
         return {
             "valid": False,
             "email": email,
@@ -97,6 +213,21 @@ def validate_email(email: str) -> dict:
 
     return {"valid": True, "email": email, "error": ""}
 
+def find_invalid_emails(values: List[str]) -> List[Tuple[int, str]]:
+    """
+    Versão em lote de validate_email para uma coluna inteira
+    Retorna (índice, 'email_invalido') de cada email preenchido inválido
+    """
+    if any("\n" in value for value in values):
+        # Quebra de linha dentro do valor: valida um a um
+        return [
+            (index, EMAIL_INVALIDO)
+            for index, value in enumerate(values)
+            if value.strip() and not _EMAIL_PATTERN.match(value.strip())
+        ]
+
+    return [(index, EMAIL_INVALIDO) for index in _failing_positions(_INVALID_EMAIL_LINE, values, "\n".join(values))]
+
 def validate_phone(phone: str) -> str:
     """Valida e formata telefone"""
     if not phone:
@@ -106,10 +237,26 @@ def validate_phone(phone: str) -> str:
     # Limita a 15 caracteres
     return phone[:15] if phone else ""
 
-def calculate_similarity(str1: str, str2: str) -> float:
+def _max_distance(max_len: int, threshold: float) -> int:
+    """
+    Maior distância de Levenshtein que ainda atinge o threshold
+    (calculada com a mesma expressão de 1 - distância / max_len)
+    """
+    distance = int((1 - threshold) * max_len)
+    while distance < max_len and 1 - ((distance + 1) / max_len) >= threshold:
+        distance += 1
+    while distance >= 0 and 1 - (distance / max_len) < threshold:
+        distance -= 1
+    return distance
+
+def calculate_similarity(str1: str, str2: str, threshold: float = None) -> float:
     """
     Calcula similaridade entre duas strings usando algoritmo de distância de Levenshtein
     Retorna valor entre 0 (nenhuma similaridade) e 1 (idênticas)
+
+    Com threshold, calcula apenas a faixa diagonal da matriz que ainda pode atingi-lo
+    e desiste assim que ele fica fora de alcance: pares abaixo do threshold retornam 0.0,
+    os demais retornam exatamente a mesma similaridade do cálculo completo
     """
     if not str1 or not str2:
         return 0.0
@@ -118,40 +265,231 @@ def calculate_similarity(str1: str, str2: str) -> float:
     if str1 == str2:
         return 1.0
     
-    # Algoritmo básico de similaridade
     len1, len2 = len(str1), len(str2)
     if len1 == 0 or len2 == 0:
         return 0.0
     
-    # Matriz para distância de Levenshtein
-    matrix = [[0] * (len2 + 1) for _ in range(len1 + 1)]
-    
-    for i in range(len1 + 1):
-        matrix[i][0] = i
-    for j in range(len2 + 1):
-        matrix[0][j] = j
-    
+    max_len = max(len1, len2)
+    max_dist = max_len if threshold is None else _max_distance(max_len, threshold)
+
+    # A distância é no mínimo a diferença de tamanho
+    if abs(len1 - len2) > max_dist:
+        return 0.0
+
+    # Distância de Levenshtein com duas linhas e apenas a faixa |i - j| <= max_dist;
+    # células fora da faixa valem "infinito" (max_dist + 1)
+    out_of_reach = max_dist + 1
+    previous = [j if j <= max_dist else out_of_reach for j in range(len2 + 1)]
+    current = [out_of_reach] * (len2 + 1)
+
     for i in range(1, len1 + 1):
-        for j in range(1, len2 + 1):
-            cost = 0 if str1[i-1] == str2[j-1] else 1
-            matrix[i][j] = min(
-                matrix[i-1][j] + 1,      # deletion
-                matrix[i][j-1] + 1,      # insertion
-                matrix[i-1][j-1] + cost  # substitution
+        lo = max(1, i - max_dist)
+        hi = min(len2, i + max_dist)
+
+        current[lo - 1] = i if lo == 1 else out_of_reach
+        if hi < len2:
+            current[hi + 1] = out_of_reach
+
+        char1 = str1[i - 1]
+        row_min = current[lo - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if char1 == str2[j - 1] else 1
+            value = min(
+                previous[j] + 1,         # deletion
+                current[j - 1] + 1,      # insertion
+                previous[j - 1] + cost   # substitution
             )
-    
-    distance = matrix[len1][len2]
-    max_len = max(len1, len2)
+            if value > out_of_reach:
+                value = out_of_reach
+            current[j] = value
+            if value < row_min:
+                row_min = value
+
+        # Nenhum caminho da linha ainda cabe no threshold
+        if row_min > max_dist:
+            return 0.0
+
+        previous, current = current, previous
+
+    distance = previous[len2]
+    if distance > max_dist:
+        return 0.0
     return 1 - (distance / max_len)
 
-def detect_similar_names(new_name: str, existing_names: list, threshold: float = 0.7) -> list:
+def encode_names(names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codifica nomes como matriz de code points (uma linha por nome, completada com -1)
+
+    Returns:
+        Tupla (matriz int32 nomes x maior tamanho, tamanhos)
+    """
+    lengths = np.fromiter((len(name) for name in names), dtype=np.int64, count=len(names))
+    width = int(lengths.max()) if len(names) else 0
+    codes = np.full((len(names), width), -1, dtype=np.int32)
+    if width:
+        # Posições preenchidas, linha a linha, na mesma ordem dos caracteres concatenados
+        filled = np.arange(width) < lengths[:, None]
+        codes[filled] = np.frombuffer("".join(names).encode("utf-32-le"), dtype=np.uint32)
+    return codes, lengths
+
+def batch_levenshtein(query: str, codes: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Distância de Levenshtein de uma string contra vários nomes codificados (encode_names)
+
+    Calcula a matriz linha a linha para todos os nomes de uma vez. As inserções
+    (dependência da célula à esquerda) viram um mínimo acumulado:
+    atual[j] = min(k <= j) de parcial[k] + (j - k)
+    """
+    total, width = codes.shape
+    columns = np.arange(width + 1, dtype=np.int32)
+    previous = np.tile(columns, (total, 1))
+    current = np.empty_like(previous)
+
+    for i, char in enumerate(np.frombuffer(query.encode("utf-32-le"), dtype=np.uint32).astype(np.int32), 1):
+        cost = codes != char
+        current[:, 0] = i
+        np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost, out=current[:, 1:])  # deletion / substitution
+        current -= columns
+        np.minimum.accumulate(current, axis=1, out=current)                           # insertion
+        current += columns
+        previous, current = current, previous
+
+    return previous[np.arange(total), lengths]
+
+def batch_similarity(new_name: str, names: List[str], threshold: float = None) -> np.ndarray:
+    """
+    Similaridade de um nome contra vários nomes de uma vez (NumPy)
+    Retorna exatamente os mesmos valores de calculate_similarity para cada par
+    """
+    similarities = np.zeros(len(names))
+    if not new_name or not names:
+        return similarities
+
+    keys = [name.lower() if name and isinstance(name, str) else "" for name in names]
+    codes, lengths = encode_names(keys)
+    query = new_name.lower()
+    size = len(query)
+
+    max_lens = np.maximum(lengths, size)
+    selected = lengths > 0
+    if threshold is not None:
+        # Descarta pelo tamanho os pares que não podem atingir o threshold
+        max_dists = np.array([0] + [_max_distance(max_len, threshold) for max_len in range(1, int(max_lens.max()) + 1)])
+        selected &= np.abs(lengths - size) <= max_dists[max_lens]
+
+    rows = np.flatnonzero(selected)
+    if len(rows):
+        width = int(lengths[rows].max())
+        distances = batch_levenshtein(query, codes[rows, :width], lengths[rows])
+        similarities[rows] = 1 - (distances / max_lens[rows])
+
+    if threshold is not None:
+        # Mesmo contrato de calculate_similarity: abaixo do threshold retorna 0.0
+        similarities[similarities < threshold] = 0.0
+
+    return similarities
+
+# Regras fonéticas do português (aplicadas em ordem sobre o nome normalizado, sem acentos)
+_PHONETIC_RULES = [
+    (re.compile(r'[^A-Z ]'), ''),           # números
+    (re.compile(r'PH'), 'F'),
+    (re.compile(r'TH'), 'T'),
+    (re.compile(r'[CS]H'), 'X'),            # CH, SH
+    (re.compile(r'LH'), 'L'),
+    (re.compile(r'NH'), 'N'),
+    (re.compile(r'SC(?=[EI])'), 'S'),       # nasceu ~ naseu
+    (re.compile(r'C(?=[EIY])'), 'S'),       # cecilia ~ sesilia
+    (re.compile(r'QU(?=[EIY])'), 'K'),      # queila ~ keila
+    (re.compile(r'G(?=[EIY])'), 'J'),       # gessica ~ jessica
+    (re.compile(r'GU(?=[EIY])'), 'G'),      # guilherme (depois de G -> J)
+    (re.compile(r'CK|[CQ]'), 'K'),          # carla ~ karla
+    (re.compile(r'Y'), 'I'),                # thaynara ~ tainara
+    (re.compile(r'W'), 'V'),                # wagner ~ vagner
+    (re.compile(r'Z'), 'S'),                # souza ~ sousa
+    (re.compile(r'H'), ''),                 # h mudo
+    (re.compile(r'M(?=[^AEIOU ]|$| )'), 'N'),   # william ~ willian
+    (re.compile(r'([A-Z])\1+'), r'\1'),      # consoantes/vogais duplicadas
+]
+
+# Partículas ignoradas na blocagem (não identificam o nome)
+_PHONETIC_STOPWORDS = {"DA", "DE", "DI", "DO", "DU", "DAS", "DOS", "E"}
+
+# E inicial antes de S + consoante (estefani ~ stefani), ignorado na blocagem
+_BLOCKING_INITIAL_E = re.compile(r'^E(?=S[^AEIOU])')
+
+def phonetic_key(text: str) -> str:
+    """
+    Chave fonética do português (Brasil) de um nome
+    Grafias com o mesmo som geram a mesma chave: SS/Ç/Z -> S, Y -> I, H mudo,
+    PH -> F, C/Q/K -> K, G antes de E/I -> J, letras duplicadas, etc.
+
+    Ex.: 'THAYS SOUZA' e 'TAIS SOUSA' -> 'TAIS SOUSA'
+    """
+    if not text or not isinstance(text, str):
+        return ""
+
+    # Ç tem som de S: trocado antes de remover os acentos (que o tornaria C)
+    key = normalize_text(text.upper().replace('Ç', 'S'))
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return ' '.join(key.split())
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def blocking_keys(text: str, prefix: int = None) -> frozenset:
+    """
+    Chaves de blocagem de um nome: prefixo da chave fonética de cada palavra
+    (sem partículas como DA/DE/DOS). Dois nomes só são comparados se têm ao menos
+    uma chave em comum.
+
+    Args:
+        text: Nome
+        prefix: Tamanho do prefixo (default: PHONETIC_BLOCKING_PREFIX)
+    """
+    prefix = prefix or PHONETIC_BLOCKING_PREFIX
+    # G e J se confundem na digitação mesmo quando o som é diferente (gilherme ~ guilherme)
+    tokens = [_BLOCKING_INITIAL_E.sub('', token).replace('G', 'J') for token in phonetic_key(text).split()]
+    keys = frozenset(token[:prefix] for token in tokens if token not in _PHONETIC_STOPWORDS)
+    # Nome só com partículas: usa as próprias partículas
+    return keys or frozenset(token[:prefix] for token in tokens)
+
+def _similarities(new_name: str, names: List[str], threshold: float) -> List[float]:
+    """Similaridade de new_name com cada nome (listas grandes de uma vez com batch_similarity)"""
+    if len(names) >= BATCH_SIMILARITY_MIN_SIZE:
+        return batch_similarity(new_name, names, threshold).tolist()
+    return [calculate_similarity(new_name, name, threshold) for name in names]
+
+def detect_similar_names(new_name: str, existing_names: list, threshold: float = 0.7, blocking: bool = False,
+                         cache=None) -> list:
     """
     Detecta nomes similares baseado em threshold de similaridade
     REGRA: Detecta apenas entre threshold e 99% (exclui 100% pois é duplicata exata)
+    Listas grandes são comparadas de uma vez com batch_similarity
+
+    Args:
+        blocking: Compara apenas os nomes com alguma chave de blocagem em comum
+            (blocking_keys); mais rápido, mas pode perder pares sem nenhuma palavra
+            foneticamente parecida
+        cache: Cache opcional de similaridades já calculadas (ex.: SimilarityCache do banco),
+            com chave (new_name, nome existente, threshold); só os pares ausentes são calculados
     """
+    if blocking:
+        keys = blocking_keys(new_name)
+        existing_names = [existing for existing in existing_names if keys & blocking_keys(existing["nome"])]
+
+    names = [existing["nome"] for existing in existing_names]
+    if cache is None:
+        similarities = _similarities(new_name, names, threshold)
+    else:
+        similarities = [cache.get((new_name, name, threshold)) for name in names]
+        missing = [index for index, similarity in enumerate(similarities) if similarity is None]
+        if missing:
+            computed = _similarities(new_name, [names[index] for index in missing], threshold)
+            for index, similarity in zip(missing, computed):
+                similarities[index] = similarity
+                cache[(new_name, names[index], threshold)] = similarity
+
     similar = []
-    for existing in existing_names:
-        similarity = calculate_similarity(new_name, existing["nome"])
+    for existing, similarity in zip(existing_names, similarities):
         # Detecta apenas entre threshold (70%) e 99% (exclui 100% = duplicata exata)
         if threshold <= similarity < 1.0:
             similar.append({
@@ -162,3 +500,330 @@ def detect_similar_names(new_name: str, existing_names: list, threshold: float =
 
     return similar
 
+
+def _detect_similar_names_chunk(tasks: List[Tuple[str, list]], threshold: float, blocking: bool) -> Tuple[List[list], dict]:
+    """
+    detect_similar_names de cada (nome, nomes existentes) do bloco (executado no pool de processos)
+    Retorna também as similaridades calculadas, para o cache do processo principal
+    """
+    computed = {}
+    return [detect_similar_names(name, existing, threshold, blocking, cache=computed) for name, existing in tasks], computed
+
+def detect_similar_names_many(tasks: List[Tuple[str, list]], threshold: float = 0.7, blocking: bool = False,
+                              cache=None, parallel_threshold: int = None) -> List[list]:
+    """
+    detect_similar_names para cada (nome, nomes existentes), na ordem das tarefas
+    A partir de parallel_threshold tarefas ainda não respondidas pelo cache, essas
+    tarefas são divididas em blocos no pool de processos; as similaridades calculadas
+    nos blocos são guardadas no cache
+
+    Args:
+        cache: Cache opcional de similaridades (ver detect_similar_names)
+        parallel_threshold: Tarefas a partir das quais o pool de processos é usado
+            (None/0: sempre no processo atual)
+    """
+    results = [None] * len(tasks)
+    pending = list(range(len(tasks)))
+    if cache is not None:
+        # Tarefas com todos os pares em cache não vão para o pool
+        pending = [
+            index for index in pending
+            if any(cache.get((tasks[index][0], existing["nome"], threshold)) is None for existing in tasks[index][1])
+        ]
+
+    if parallel_threshold and len(pending) >= parallel_threshold:
+        # Importado apenas aqui: o pool depende da configuração da aplicação
+        from app.core.process_pool import map_bounded, pool_enabled, pool_size
+        if pool_enabled():
+            # Alguns blocos por processo, para equilibrar a carga entre eles
+            chunk_size = math.ceil(len(pending) / (pool_size() * 4))
+            chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+            chunk_results = map_bounded(
+                _detect_similar_names_chunk, ([tasks[index] for index in chunk] for chunk in chunks), threshold, blocking
+            )
+            for chunk, (similar, computed) in zip(chunks, chunk_results):
+                for index, similar_names in zip(chunk, similar):
+                    results[index] = similar_names
+                if cache is not None:
+                    for key, similarity in computed.items():
+                        cache[key] = similarity
+
+    return [
+        result if result is not None else detect_similar_names(name, existing, threshold, blocking, cache=cache)
+        for (name, existing), result in zip(tasks, results)
+    ]
+
+
+class SimilarityIndex:
+    """
+    Índice para busca de nomes similares, construído incrementalmente
+
+    Equivale a chamar detect_similar_names contra todos os nomes já adicionados,
+    mas só calcula a similaridade dos candidatos que ainda podem atingir o threshold:
+    - nomes iguais (ignorando maiúsculas) são agrupados e comparados uma única vez
+    - só são considerados tamanhos compatíveis com o threshold
+    - filtro de q-gramas: com distância d, os nomes compartilham pelo menos
+      max(|Q1|, |Q2|) - q*d q-gramas distintos (cada edição destrói no máximo q)
+    - filtro de caracteres: a distância é no mínimo a quantidade de caracteres
+      que sobram em um dos nomes em relação ao outro (com muitos candidatos, calculado
+      de uma vez sobre histogramas de code point & 31, que só podem reduzir a sobra)
+    - muitos candidatos são verificados de uma vez com batch_levenshtein (NumPy)
+
+    Com blocking=True, o filtro de q-gramas é trocado pela blocagem fonética: só são
+    candidatos os nomes com alguma chave de blocking_keys em comum (mais rápido, mas
+    deixa de ser exato)
+    """
+
+    def __init__(self, threshold: float = 0.7, q: int = 2, blocking: bool = False):
+        self.threshold = threshold
+        self.q = q
+        self.blocking = blocking
+        self._blocks = {}      # chave de blocagem -> ids dos grupos
+        self._nodes = {}       # nome (minúsculo) -> id do grupo
+        self._keys = []        # id do grupo -> nome (minúsculo)
+        self._distinct = []    # id do grupo -> quantidade de q-gramas distintos
+        self._chars = []       # id do grupo -> contagem de caracteres
+        self._items = []       # id do grupo -> [(ordem de inserção, item)]
+        self._codes = np.full((64, 32), -1, dtype=np.int32)  # id do grupo -> code points (encode_names)
+        self._lengths = np.zeros(64, dtype=np.int64)         # id do grupo -> tamanho
+        self._histograms = np.zeros((64, 32), dtype=np.int16)  # id do grupo -> caracteres por code point & 31
+        self._by_length = {}   # tamanho -> ids dos grupos
+        self._postings = {}    # (q-grama, tamanho) -> ids dos grupos
+        self._max_distances = {}
+        self._max_distance_table = np.zeros(0, dtype=np.int64)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _grams(self, key: str) -> set:
+        q = self.q
+        return {key[i:i + q] for i in range(len(key) - q + 1)}
+
+    def _max_distance(self, max_len: int) -> int:
+        max_dist = self._max_distances.get(max_len)
+        if max_dist is None:
+            max_dist = self._max_distances[max_len] = _max_distance(max_len, self.threshold)
+        return max_dist
+
+    def _max_distance_array(self, max_lens: np.ndarray) -> np.ndarray:
+        """_max_distance de cada tamanho do array"""
+        top = int(max_lens.max())
+        if len(self._max_distance_table) <= top:
+            self._max_distance_table = np.array(
+                [self._max_distance(length) if length else 0 for length in range(top + 1)], dtype=np.int64
+            )
+        return self._max_distance_table[max_lens]
+
+    def _store_codes(self, node: int, key: str) -> None:
+        """Guarda o nome codificado, ampliando a matriz quando necessário"""
+        rows, width = self._codes.shape
+        if node >= rows or len(key) > width:
+            new_rows = rows * 2 if node >= rows else rows
+            codes = np.full((new_rows, max(width, len(key))), -1, dtype=np.int32)
+            codes[:rows, :width] = self._codes
+            lengths = np.zeros(new_rows, dtype=np.int64)
+            lengths[:rows] = self._lengths
+            histograms = np.zeros((new_rows, 32), dtype=np.int16)
+            histograms[:rows] = self._histograms
+            self._codes, self._lengths, self._histograms = codes, lengths, histograms
+
+        code_points = np.frombuffer(key.encode("utf-32-le"), dtype=np.uint32)
+        self._codes[node, :len(key)] = code_points
+        self._lengths[node] = len(key)
+        self._histograms[node] = np.bincount(code_points & 31, minlength=32)
+
+    def add(self, item: dict) -> None:
+        """Adiciona um item ({"nome": ..., demais campos}) ao índice"""
+        key = item["nome"].lower()
+        node = self._nodes.get(key)
+
+        if node is None:
+            node = self._nodes[key] = len(self._keys)
+            grams = self._grams(key)
+            self._keys.append(key)
+            self._distinct.append(len(grams))
+            self._chars.append(Counter(key))
+            self._items.append([])
+            self._store_codes(node, key)
+            self._by_length.setdefault(len(key), []).append(node)
+            if self.blocking:
+                for block in blocking_keys(key):
+                    self._blocks.setdefault(block, []).append(node)
+            else:
+                for gram in grams:
+                    self._postings.setdefault((gram, len(key)), []).append(node)
+
+        self._items[node].append((self._count, item))
+        self._count += 1
+
+    def search(self, new_name: str) -> list:
+        """
+        Busca os nomes similares (entre threshold e 99%) já adicionados ao índice
+        Retorna o mesmo resultado de detect_similar_names (com o mesmo blocking),
+        na ordem de inserção
+        """
+        if not new_name:
+            return []
+
+        key = new_name.lower()
+        size = len(key)
+        grams = self._grams(key)
+        chars = Counter(key)
+        q = self.q
+        matches = []
+
+        candidates = []
+        if self.blocking:
+            # Grupos com alguma chave de blocagem em comum (o tamanho é checado
+            # junto com o filtro de caracteres)
+            blocked = set()
+            for block in blocking_keys(key):
+                blocked.update(self._blocks.get(block, ()))
+            candidates.extend(blocked)
+        else:
+            for length, nodes in self._by_length.items():
+                max_dist = self._max_distance(max(size, length))
+                if abs(size - length) > max_dist:
+                    continue
+
+                # Limite inferior de q-gramas em comum para qualquer grupo deste tamanho
+                bound = len(grams) - q * max_dist
+                if bound > 0:
+                    counts = Counter()
+                    for gram in grams:
+                        postings = self._postings.get((gram, length))
+                        if postings:
+                            counts.update(postings)
+                    candidates.extend(
+                        node for node, common in counts.items()
+                        if common >= bound and common >= self._distinct[node] - q * max_dist
+                    )
+                else:
+                    candidates.extend(nodes)
+
+        # 100% = duplicata exata
+        node = self._nodes.get(key)
+        if node is not None and node in candidates:
+            candidates.remove(node)
+
+        if len(candidates) >= BATCH_SIMILARITY_MIN_SIZE:
+            # Muitos candidatos: filtro de caracteres e distâncias de uma vez (NumPy)
+            nodes = np.array(candidates)
+            lengths = self._lengths[nodes]
+            longest = np.maximum(lengths, size)
+            histogram = np.bincount(np.frombuffer(key.encode("utf-32-le"), dtype=np.uint32) & 31, minlength=32)
+            surplus = np.maximum(histogram - self._histograms[nodes], 0).sum(axis=1)
+            possible = np.maximum(surplus, surplus - size + lengths) <= self._max_distance_array(longest)
+
+            nodes, lengths, longest = nodes[possible], lengths[possible], longest[possible]
+            candidates = nodes.tolist()
+            similarities = []
+            if candidates:
+                distances = batch_levenshtein(key, self._codes[nodes, :int(lengths.max())], lengths)
+                similarities = (1 - (distances / longest)).tolist()
+        else:
+            similarities = []
+            for node in candidates:
+                # Caracteres que sobram no nome buscado (e, pela diferença de tamanho, no existente)
+                length = len(self._keys[node])
+                surplus = sum((chars - self._chars[node]).values())
+                if max(surplus, surplus - size + length) > self._max_distance(max(size, length)):
+                    similarities.append(0.0)
+                else:
+                    similarities.append(calculate_similarity(key, self._keys[node], self.threshold))
+
+        for node, similarity in zip(candidates, similarities):
+            if self.threshold <= similarity < 1.0:
+                for order, item in self._items[node]:
+                    matches.append((order, item, similarity))
+
+        matches.sort(key=lambda match: match[0])
+        return [
+            {
+                "nome_existente": item["nome"],
+                "id_existente": item.get("id"),
+                "similaridade": round(similarity, 3)
+            }
+            for _, item, similarity in matches
+        ]
+
+
+def _similar_names_chunk(chunk: Tuple[List[Tuple[Any, str]], int], threshold: float, blocking: bool) -> List[Tuple[int, list]]:
+    """
+    Busca os nomes similares das entradas a partir de start (executado no pool de processos)
+    Recria os índices com as entradas anteriores do mesmo escopo e segue como
+    SimilarityIndex.search/add em sequência
+
+    Args:
+        chunk: (entradas [(escopo, nome)] até o fim do bloco, posição inicial do bloco)
+    """
+    entries, start = chunk
+    scopes = {scope for scope, _ in entries[start:]}
+    indices = {}
+    results = []
+
+    for position, (scope, name) in enumerate(entries):
+        if scope not in scopes:
+            continue  # Escopo sem nenhum nome neste bloco
+
+        index = indices.get(scope)
+        if index is None:
+            index = indices[scope] = SimilarityIndex(threshold=threshold, blocking=blocking)
+
+        if position >= start:
+            similar = index.search(name)
+            if similar:
+                results.append((position, similar))
+        index.add({"nome": name, "id": position})
+
+    return results
+
+def _similar_names_bounds(total: int, parts: int) -> List[int]:
+    """
+    Limites dos blocos de custo parecido: a entrada i é comparada com até i
+    anteriores, então o custo acumulado cresce com o quadrado da posição
+    """
+    return sorted({round(total * math.sqrt(part / parts)) for part in range(parts + 1)})
+
+def _similar_names_chunks(entries: List[Tuple[Any, str]], parts: int) -> Iterator[Tuple[List[Tuple[Any, str]], int]]:
+    """Divide as entradas em blocos de custo parecido (ver _similar_names_bounds)"""
+    bounds = _similar_names_bounds(len(entries), parts)
+    for start, stop in zip(bounds, bounds[1:]):
+        yield entries[:stop], start
+
+def find_similar_names(entries: List[Tuple[Any, str]], threshold: float = 0.7, blocking: bool = False,
+                       progress: Callable[[int, int], None] = None, parallel_threshold: int = None) -> Dict[int, list]:
+    """
+    Para cada entrada (escopo, nome), busca os nomes similares entre as entradas
+    anteriores do mesmo escopo (mesmo resultado de um SimilarityIndex por escopo)
+    A partir de parallel_threshold entradas, a busca é dividida em blocos no pool
+    de processos (fora do processo do servidor)
+
+    Args:
+        parallel_threshold: Entradas a partir das quais a busca usa o pool de processos
+            (None/0: sempre no processo atual)
+        progress: Função opcional chamada com (entradas, total) a cada bloco concluído;
+            as entradas são proporcionais às comparações feitas (o custo cresce com a posição)
+
+    Returns:
+        {posição: resultado de detect_similar_names}, com id_existente = posição da entrada similar
+    """
+    total = len(entries)
+    if not parallel_threshold or total < parallel_threshold:
+        return dict(_similar_names_chunk((entries, 0), threshold, blocking))
+
+    # Importado apenas aqui: o pool depende da configuração da aplicação
+    from app.core.process_pool import map_bounded, pool_enabled, pool_size
+    if not pool_enabled():
+        return dict(_similar_names_chunk((entries, 0), threshold, blocking))
+
+    # Alguns blocos por processo, para equilibrar a carga entre eles
+    parts = pool_size() * 4
+    stops = _similar_names_bounds(total, parts)[1:]
+    results = {}
+    for stop, chunk_results in zip(stops, map_bounded(_similar_names_chunk, _similar_names_chunks(entries, parts), threshold, blocking)):
+        results.update(chunk_results)
+        if progress is not None:
+            progress(round(total * (stop / total) ** 2), total)
+    return results
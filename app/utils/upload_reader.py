@@ -0,0 +1,185 @@
+"""
+Leitura incremental de arquivos enviados (upload)
+Lê o arquivo em blocos (descompactando .gz/.zip sob demanda), aplica o limite
+de tamanho durante a leitura e entrega um stream de texto decodificado sob demanda
+"""
+import codecs
+import gzip
+import io
+import zipfile
+import zlib
+from typing import BinaryIO, TextIO, Tuple
+from app.core.config import IMPORT_CONFIG
+
+# Assinaturas de arquivos compactados aceitos
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# Erros possíveis ao ler um arquivo compactado truncado ou corrompido
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error, zipfile.BadZipFile)
+
+# BOMs reconhecidos no início do arquivo
+UPLOAD_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Tabela byte -> caractere do Windows-1252 (bytes indefinidos caem para Latin-1)
+_WINDOWS_1252_TABLE = []
+for _byte in range(256):
+    try:
+        _WINDOWS_1252_TABLE.append(bytes([_byte]).decode('windows-1252'))
+    except UnicodeDecodeError:
+        _WINDOWS_1252_TABLE.append(chr(_byte))
+
+
+def _windows_1252_fallback(error: UnicodeDecodeError):
+    """
+    Tratador de erro de decodificação: bytes inválidos encontrados depois da amostra
+    (ex.: arquivo majoritariamente UTF-8 com trechos salvos no Windows) são lidos como Windows-1252
+    """
+    bad_bytes = error.object[error.start:error.end]
+    return ''.join(_WINDOWS_1252_TABLE[byte] for byte in bad_bytes), error.end
+
+
+codecs.register_error('upload_windows_1252_fallback', _windows_1252_fallback)
+
+
+class UploadError(Exception):
+    """Erro de leitura do arquivo enviado (a mensagem é exibida ao usuário)"""
+
+
+class UploadTooLargeError(UploadError):
+    """Arquivo excede o tamanho máximo permitido (após descompactar)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"Arquivo muito grande. Tamanho máximo: {max_size // (1024 * 1024)}MB.")
+
+
+class InvalidUploadError(UploadError):
+    """Arquivo compactado inválido, corrompido ou com conteúdo inesperado"""
+
+
+class LimitedReader(io.RawIOBase):
+    """
+    Stream binário que conta os bytes lidos e interrompe a leitura
+    assim que o limite de tamanho é ultrapassado
+    """
+
+    def __init__(self, raw: BinaryIO, max_size: int):
+        self._raw = raw
+        self.max_size = max_size
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            data = self._raw.read(len(buffer))
+        except DECOMPRESSION_ERRORS as e:
+            raise InvalidUploadError(f"Arquivo compactado corrompido: {str(e)}") from e
+        size = len(data)
+        self.bytes_read += size
+        if self.bytes_read > self.max_size:
+            raise UploadTooLargeError(self.max_size)
+        buffer[:size] = data
+        return size
+
+
+def open_upload_binary(raw: BinaryIO) -> BinaryIO:
+    """
+    Retorna o conteúdo do upload como stream binário, descompactando sob demanda
+    arquivos .gz e .zip (identificados pela assinatura, não pela extensão)
+
+    O .zip deve conter exatamente um arquivo .csv. Nada é descompactado por inteiro:
+    os blocos são inflados à medida que o parser lê o stream.
+    """
+    raw.seek(0)
+    magic = raw.read(4)
+    raw.seek(0)
+
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+
+    if magic.startswith(ZIP_MAGIC):
+        try:
+            archive = zipfile.ZipFile(raw)
+        except zipfile.BadZipFile as e:
+            raise InvalidUploadError(f"Arquivo .zip inválido: {str(e)}") from e
+
+        entries = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+        ]
+        if len(entries) != 1:
+            raise InvalidUploadError("O arquivo .zip deve conter exatamente um arquivo CSV.")
+        if not entries[0].filename.lower().endswith('.csv'):
+            raise InvalidUploadError(f"O arquivo dentro do .zip deve ser CSV: '{entries[0].filename}'")
+
+        print(f"📦 Descompactando '{entries[0].filename}' do .zip")
+        return archive.open(entries[0])
+
+    return raw
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Detecta o encoding a partir de uma amostra do início do arquivo
+
+    Ordem: BOM (UTF-8/UTF-16) -> UTF-8 válido -> Windows-1252 -> Latin-1
+    """
+    for bom, encoding in UPLOAD_BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    # final=False: a amostra pode terminar no meio de um caractere multibyte
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        sample.decode('windows-1252')
+        return 'windows-1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def open_upload_text(raw: BinaryIO, max_size: int = None, chunk_size: int = None) -> Tuple[TextIO, str]:
+    """
+    Abre o arquivo enviado como stream de texto decodificado incrementalmente
+    Arquivos .gz/.zip são descompactados durante a leitura; o limite de tamanho
+    vale para o conteúdo descompactado. O encoding é detectado por amostra e o
+    arquivo é decodificado uma única vez.
+
+    Args:
+        raw: Arquivo binário do upload (ex.: UploadFile.file)
+        max_size: Tamanho máximo em bytes (default: IMPORT_CONFIG['max_file_size'])
+        chunk_size: Tamanho de cada leitura (default: IMPORT_CONFIG['upload_chunk_size'])
+
+    Raises:
+        InvalidUploadError: se o arquivo compactado for inválido
+
+    Returns:
+        Tupla (stream de texto, encoding detectado). A leitura do stream
+        lança UploadTooLargeError se o conteúdo ultrapassar max_size.
+    """
+    max_size = max_size or IMPORT_CONFIG["max_file_size"]
+    chunk_size = chunk_size or IMPORT_CONFIG["upload_chunk_size"]
+
+    source = open_upload_binary(raw)
+    try:
+        encoding = detect_encoding(source.read(IMPORT_CONFIG["encoding_sample_size"]))
+        source.seek(0)
+    except DECOMPRESSION_ERRORS as e:
+        raise InvalidUploadError(f"Arquivo compactado corrompido: {str(e)}") from e
+
+    print(f"🔍 Encoding detectado: {encoding}")
+
+    buffered = io.BufferedReader(LimitedReader(source, max_size), buffer_size=chunk_size)
+    stream = io.TextIOWrapper(buffered, encoding=encoding, errors='upload_windows_1252_fallback', newline='')
+    return stream, encoding
@@ -0,0 +1,92 @@
+"""
+Benchmark do parse_csv_basic: parser atual (csv nativo) x parser legado (caractere a caractere)
+
+Uso:
+    python benchmarks/bench_csv_parser.py [linhas]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.csv_processor import parse_csv_basic
+
+
+def parse_csv_basic_legado(file_content: str) -> dict:
+    """Implementação anterior do parse_csv_basic (referência para comparação)"""
+    lines = [line.strip() for line in file_content.split('\n') if line.strip()]
+    if len(lines) < 2:
+        return {"success": False, "headers": [], "data_rows": []}
+
+    first_line = lines[0]
+    delimiter = ','
+    if ';' in first_line and first_line.count(';') > first_line.count(','):
+        delimiter = ';'
+
+    headers = [h.strip().upper() for h in lines[0].split(delimiter)]
+    data_rows = []
+
+    for line in lines[1:]:
+        values = []
+        current = ""
+        in_quotes = False
+
+        for char in line:
+            if char == '"':
+                in_quotes = not in_quotes
+            elif char == delimiter and not in_quotes:
+                values.append(current.strip())
+                current = ""
+            else:
+                current += char
+
+        values.append(current.strip())
+
+        while len(values) < len(headers):
+            values.append("")
+
+        data_rows.append(values[:len(headers)])
+
+    return {"success": True, "headers": headers, "data_rows": data_rows}
+
+
+def gerar_csv(total_linhas: int) -> str:
+    """Gera um CSV de alunos sintético"""
+    random.seed(42)
+    nomes = ["JOAO", "MARIA", "ANA", "PEDRO", "LUCAS", "JULIA", "GABRIEL", "BEATRIZ"]
+    sobrenomes = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "COSTA"]
+    escolas = [f"ESCOLA MUNICIPAL {i}" for i in range(50)]
+
+    linhas = ["RA,NOME,EMAIL,ESCOLA,SERIE,TURMA"]
+    for i in range(total_linhas):
+        nome = f"{random.choice(nomes)} {random.choice(sobrenomes)} {random.choice(sobrenomes)}"
+        linhas.append(
+            f'{2024000000 + i},"{nome}",aluno{i}@escola.com.br,'
+            f'{random.choice(escolas)},{random.randint(1, 9)}ANO,{random.choice("ABCDE")}'
+        )
+    return "\n".join(linhas)
+
+
+def medir(funcao, conteudo: str, repeticoes: int = 3) -> float:
+    """Retorna o melhor tempo (segundos) entre as repetições"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(conteudo)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    conteudo = gerar_csv(total)
+
+    tempo_legado = medir(parse_csv_basic_legado, conteudo)
+    tempo_atual = medir(parse_csv_basic, conteudo)
+
+    print(f"Linhas: {total} ({len(conteudo) / 1024 / 1024:.1f} MB)")
+    print(f"Legado (caractere a caractere): {tempo_legado:.3f}s  {total / tempo_legado:,.0f} linhas/s")
+    print(f"Atual (csv nativo):             {tempo_atual:.3f}s  {total / tempo_atual:,.0f} linhas/s")
+    print(f"Ganho: {tempo_legado / tempo_atual:.1f}x")
@@ -0,0 +1,123 @@
+"""
+Memória dos resultados do passo 3 de alunos guardados na sessão:
+dicts com cópias de row_data em cada lista (implementação anterior) x registros
+compactos (RowRecords) com as demais listas referenciando a linha por row_index
+
+Uso:
+    python benchmarks/bench_row_records.py [linhas]
+
+Mede a memória que continua alocada após a validação (tracemalloc), com os valores
+das células já em memória (como nas colunas da sessão), em dois cenários:
+arquivo típico (poucas linhas com conflito, duplicata ou nome similar) e pior caso
+(toda linha em todas as listas).
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.row_records import RowRecords
+
+CAMPOS = ("ra", "nome", "email", "escola", "serie", "turma")
+
+
+def gerar_validacoes(total_linhas: int) -> list:
+    """(row_data, com erro) de cada linha, como ALUNOS_ROW_SCHEMA.validate_rows"""
+    escolas = [f"ESCOLA MUNICIPAL {i}" for i in range(50)]
+    return [
+        ({
+            "ra": str(2024000000 + i),
+            "nome": f"ALUNO {i} DA SILVA",
+            "email": f"aluno{i}@escola.com.br",
+            "escola": escolas[i % 50],
+            "serie": f"{i % 9 + 1}ANO",
+            "turma": "ABCDE"[i % 5]
+        }, i % 50 == 0)
+        for i in range(total_linhas)
+    ]
+
+
+def categorias(row_index: int, pior_caso: bool) -> tuple:
+    """(conflito, duplicata, caracteres especiais, nome similar) da linha no cenário"""
+    if pior_caso:
+        return True, True, True, True
+    return row_index % 20 == 0, row_index % 50 == 1, row_index % 100 == 2, row_index % 10 == 3
+
+
+def resultados_legado(validacoes: list, pior_caso: bool) -> dict:
+    """Listas do passo 3 anterior: cada entrada com "data" (row_data ou cópia)"""
+    results = {"valid_rows": [], "invalid_rows": [], "conflicts": [], "duplicates": [],
+               "special_chars_errors": [], "similar_names": []}
+    for row_index, (row_data, com_erro) in enumerate(validacoes):
+        conflito, duplicata, especiais, similar = categorias(row_index, pior_caso)
+        if especiais:
+            results["special_chars_errors"].append(
+                {"row_index": row_index, "field": "nome", "value": row_data["nome"], "data": row_data.copy()})
+        if duplicata:
+            results["duplicates"].append({"row_index": row_index, "duplicate_of": 0, "data": row_data.copy()})
+        if similar:
+            results["similar_names"].append({"row_index": row_index, "nome_atual": row_data["nome"], "nome_similar": "X",
+                                             "similaridade": 0.8, "linha_similar": 0, "data": row_data.copy()})
+        if com_erro:
+            results["invalid_rows"].append({"row_index": row_index, "data": row_data, "errors": ["Erro"]})
+            continue
+        conflicts = [{"type": "aluno_duplicado", "field": "ra", "value": row_data["ra"], "message": "RA existente",
+                      "data": row_data.copy()}] if conflito else []
+        results["valid_rows"].append({"row_index": row_index, "data": row_data, "conflicts": conflicts})
+        results["conflicts"].extend([{"row_index": row_index, "data": c.get("data", row_data.copy()), **c} for c in conflicts])
+    return results
+
+
+def resultados_registros(validacoes: list, pior_caso: bool) -> dict:
+    """Listas do passo 3 atual: RowRecords e referências por row_index"""
+    results = {"rows": RowRecords(CAMPOS), "valid_rows": [], "invalid_rows": [], "conflicts": [], "duplicates": [],
+               "special_chars_errors": [], "similar_names": []}
+    for row_index, (row_data, com_erro) in enumerate(validacoes):
+        registro = results["rows"].add(row_data)
+        conflito, duplicata, especiais, similar = categorias(row_index, pior_caso)
+        if especiais:
+            results["special_chars_errors"].append({"row_index": row_index, "field": "nome", "value": row_data["nome"]})
+        if duplicata:
+            results["duplicates"].append({"row_index": row_index, "duplicate_of": 0})
+        if similar:
+            results["similar_names"].append({"row_index": row_index, "nome_atual": row_data["nome"], "nome_similar": "X",
+                                             "similaridade": 0.8, "linha_similar": 0})
+        if com_erro:
+            registro.errors = ["Erro"]
+            results["invalid_rows"].append(registro)
+            continue
+        registro.conflicts = [{"row_index": row_index, "type": "aluno_duplicado", "field": "ra", "value": row_data["ra"],
+                               "message": "RA existente"}] if conflito else None
+        results["valid_rows"].append(registro)
+        results["conflicts"].extend(registro.conflicts or ())
+    return results
+
+
+def memoria_retida(funcao, total_linhas: int, pior_caso: bool) -> int:
+    """Bytes que continuam alocados pelos resultados depois que row_data é descartado"""
+    # Valores das células ficam fora da medição (já estão nas colunas da sessão)
+    dicts = gerar_validacoes(total_linhas)
+
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    # Os row_data da validação são criados dentro da medição (descartados no fim do passo 3)
+    validacoes = [(dict(row_data), com_erro) for row_data, com_erro in dicts]
+    results = funcao(validacoes, pior_caso)
+    del validacoes
+    retida = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+
+    assert results
+    return retida
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"Linhas: {total} (memória retida por 10 mil linhas)")
+    for pior_caso in (False, True):
+        legado = memoria_retida(resultados_legado, total, pior_caso)
+        registros = memoria_retida(resultados_registros, total, pior_caso)
+        escala = 10_000 / total / 1024 / 1024
+        print(f"{'Pior caso' if pior_caso else 'Típico':10}  legado: {legado * escala:6.2f}MB  "
+              f"registros: {registros * escala:6.2f}MB  redução: {(1 - registros / legado) * 100:.0f}%")
@@ -0,0 +1,150 @@
+"""
+Benchmark da validação de linhas do passo 3 de alunos:
+cadeia de ifs por célula (implementação anterior) x esquema compilado (RowSchema)
+x esquema com validadores em lote por coluna (RowSchema.validate_rows)
+
+Uso:
+    python benchmarks/bench_row_schema.py [linhas]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.row_schema import Column, RowSchema, Validator
+from app.utils.text_utils import has_special_characters, validate_email, find_invalid_emails, find_special_characters
+
+# Mesmo esquema de AlunosService (o serviço não é importado para não abrir conexão com o banco)
+SEM_CARACTERES_ESPECIAIS = Validator(
+    lambda value: not has_special_characters(value),
+    "caracteres_especiais",
+    "Campo '{label}' contém caracteres especiais não permitidos: '{value}'",
+    batch=find_special_characters
+)
+ALUNOS_ROW_SCHEMA = RowSchema([
+    Column("nome", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+    Column("ra", required=True),
+    Column("email", normalizer=str.lower, validators=(
+        Validator(lambda value: validate_email(value)["valid"], "email_invalido", "Email inválido: '{value}'",
+                  batch=find_invalid_emails),
+    )),
+    Column("escola", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+    Column("serie", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+    Column("turma", required=True, validators=(SEM_CARACTERES_ESPECIAIS,)),
+])
+
+FIELD_INDICES = {"nome": 1, "ra": 0, "email": 2, "escola": 3, "serie": 4, "turma": 5}
+
+
+def validar_legado(data_rows: list) -> int:
+    """Validação anterior do passo 3 (referência para comparação)"""
+    validacoes = []
+    for row in data_rows:
+        row_data = {}
+        is_valid = True
+        row_errors = []
+
+        for field, col_index in FIELD_INDICES.items():
+            if col_index < len(row):
+                value = row[col_index].strip()
+
+                if field == 'email':
+                    value = value.lower().strip()
+
+                row_data[field] = value
+
+                if field in ['nome', 'escola', 'serie', 'turma', 'ra'] and not value:
+                    is_valid = False
+                    row_errors.append(f"Campo '{field}' é obrigatório")
+
+                if field == 'email' and value:
+                    email_validation = validate_email(value)
+                    if not email_validation["valid"]:
+                        is_valid = False
+                        row_errors.append(email_validation["error"])
+
+                if field in ['nome', 'escola', 'serie', 'turma'] and value:
+                    if has_special_characters(value):
+                        is_valid = False
+                        row_errors.append(f"Campo '{field}' contém caracteres especiais não permitidos: '{value}'")
+            else:
+                row_data[field] = ""
+                if field in ['nome', 'escola', 'serie', 'turma', 'ra']:
+                    is_valid = False
+                    row_errors.append(f"Campo '{field}' não encontrado")
+
+        validacoes.append((row_data, row_errors))
+    return sum(not errors for _, errors in validacoes)
+
+
+def validar_esquema(data_rows: list) -> int:
+    """Validação com o esquema compilado"""
+    validate_row = ALUNOS_ROW_SCHEMA.compile(FIELD_INDICES)
+    # Mantém os resultados, como o passo 3 (mesma pressão de memória do lote)
+    validacoes = [validate_row(row) for row in data_rows]
+    return sum(not errors for _, errors, _ in validacoes)
+
+
+def validar_lote(data_rows: list) -> int:
+    """Validação com o esquema e validadores em lote por coluna"""
+    return sum(not errors for _, errors, _ in ALUNOS_ROW_SCHEMA.validate_rows(data_rows, FIELD_INDICES))
+
+
+def medir_colunas(data_rows: list) -> float:
+    """Tempo apenas dos validadores em lote sobre as colunas já extraídas"""
+    nomes = [row[1] for row in data_rows]
+    escolas = [row[3] for row in data_rows]
+    emails = [row[2].lower() for row in data_rows]
+    inicio = time.perf_counter()
+    find_special_characters(nomes)
+    find_special_characters(escolas)
+    find_invalid_emails(emails)
+    return time.perf_counter() - inicio
+
+
+def gerar_linhas(total_linhas: int) -> list:
+    """Gera linhas de alunos sintéticas (já no formato de parse_csv_basic)"""
+    random.seed(42)
+    nomes = ["JOAO", "MARIA", "ANA", "PEDRO", "LUCAS", "JULIA", "GABRIEL", "BEATRIZ"]
+    sobrenomes = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "COSTA"]
+    escolas = [f"ESCOLA MUNICIPAL {i}" for i in range(50)]
+
+    linhas = []
+    for i in range(total_linhas):
+        nome = f"{random.choice(nomes)} {random.choice(sobrenomes)} {random.choice(sobrenomes)}"
+        email = f"ALUNO{i}@ESCOLA.COM.BR" if i % 10 else ""
+        linhas.append([
+            str(2024000000 + i), nome, email,
+            random.choice(escolas), f"{random.randint(1, 9)}ANO", random.choice("ABCDE")
+        ])
+    return linhas
+
+
+def medir(funcao, data_rows: list, repeticoes: int = 3) -> float:
+    """Retorna o melhor tempo (segundos) entre as repetições"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(data_rows)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data_rows = gerar_linhas(total)
+
+    assert validar_legado(data_rows) == validar_esquema(data_rows) == validar_lote(data_rows)
+
+    tempo_legado = medir(validar_legado, data_rows)
+    tempo_atual = medir(validar_esquema, data_rows)
+    tempo_lote = medir(validar_lote, data_rows)
+
+    print(f"Linhas: {total}")
+    print(f"Legado (ifs por célula):    {tempo_legado:.3f}s  {total / tempo_legado:,.0f} linhas/s")
+    print(f"Esquema compilado:          {tempo_atual:.3f}s  {total / tempo_atual:,.0f} linhas/s")
+    print(f"Esquema + lote por coluna:  {tempo_lote:.3f}s  {total / tempo_lote:,.0f} linhas/s")
+    print(f"Ganho: {tempo_legado / tempo_lote:.1f}x")
+    print(f"Validadores em lote ({3 * total} células): {medir_colunas(data_rows) * 1000:.1f}ms")
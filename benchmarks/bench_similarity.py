@@ -0,0 +1,57 @@
+"""
+Benchmark da similaridade de nomes um-contra-muitos:
+caminho escalar (calculate_similarity em laço) x batch_similarity (NumPy)
+
+Uso:
+    python benchmarks/bench_similarity.py [nomes]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.text_utils import batch_similarity, calculate_similarity
+
+
+def gerar_nomes(total: int) -> list:
+    """Gera nomes de alunos sintéticos"""
+    random.seed(42)
+    nomes = ["JOAO", "MARIA", "ANA", "PEDRO", "LUCAS", "JULIA", "GABRIEL", "BEATRIZ", "RAFAEL", "LARISSA"]
+    sobrenomes = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA"]
+    return [
+        " ".join([random.choice(nomes)] + [random.choice(sobrenomes) for _ in range(random.randint(1, 3))])
+        for _ in range(total)
+    ]
+
+
+def escalar(consultas: list, nomes: list) -> list:
+    return [[calculate_similarity(consulta, nome, 0.7) for nome in nomes] for consulta in consultas]
+
+
+def vetorizado(consultas: list, nomes: list) -> list:
+    return [batch_similarity(consulta, nomes, 0.7).tolist() for consulta in consultas]
+
+
+def medir(funcao, *args) -> float:
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    nomes = gerar_nomes(total)
+    consultas = nomes[:20]
+
+    assert escalar(consultas[:2], nomes) == vetorizado(consultas[:2], nomes)
+
+    tempo_escalar = medir(escalar, consultas, nomes)
+    tempo_vetorizado = medir(vetorizado, consultas, nomes)
+    pares = len(consultas) * total
+
+    print(f"Comparações: {len(consultas)} nomes x {total} nomes")
+    print(f"Escalar (calculate_similarity): {tempo_escalar:.3f}s  {pares / tempo_escalar:,.0f} pares/s")
+    print(f"Vetorizado (batch_similarity):  {tempo_vetorizado:.3f}s  {pares / tempo_vetorizado:,.0f} pares/s")
+    print(f"Ganho: {tempo_escalar / tempo_vetorizado:.1f}x")
@@ -0,0 +1,570 @@
+"""
+Testes unitários para AlunosService (banco substituído por um banco em memória)
+"""
+import gzip
+import io
+import json
+import sys
+import time
+import types
+from contextlib import contextmanager
+
+import pytest
+
+from app.utils.text_utils import collation_key
+
+try:
+    import app.core.database  # noqa: F401
+except Exception:
+    # Sem acesso ao banco: o módulo real abre o pool de conexões ao ser importado.
+    # Nos testes, get_db_connection é sempre substituída pelo banco em memória (fixture banco)
+    _database = types.ModuleType("app.core.database")
+    _database.get_db_connection = None
+    sys.modules["app.core.database"] = _database
+
+from app.core.background_jobs import Job
+from app.core.cache import invalidate_reference_cache
+from app.services import alunos_service, referencias_service
+from app.services.alunos_service import AlunosService, import_sessions
+from app.utils.upload_reader import UploadTooLargeError, open_upload_text
+
+CABECALHO = "RA,NOME,ESCOLA,SERIE,TURMA"
+MAPEAMENTO = {
+    "ra_coluna": "RA",
+    "nome_coluna": "NOME",
+    "instituicao_coluna": "ESCOLA",
+    "serie_coluna": "SERIE",
+    "turma_coluna": "TURMA",
+}
+
+
+class BancoFake:
+    """Banco em memória com as tabelas usadas pelos passos 3 e 5"""
+
+    def __init__(self):
+        self.instituicoes = [{"i_id": 1, "i_nome": "ESCOLA A"}, {"i_id": 2, "i_nome": "ESCOLA B"}]
+        self.series = [{"s_id": 10, "s_nome": "1ANO"}]
+        self.turmas = [
+            {"t_id": 100, "t_nome": "A", "t_serie": 10, "t_instituicao": 1},
+            {"t_id": 101, "t_nome": "B", "t_serie": 10, "t_instituicao": 1},
+            {"t_id": 200, "t_nome": "A", "t_serie": 10, "t_instituicao": 2},
+        ]
+        self.alunos = []
+        # Collation das colunas comparadas por nome (information_schema.COLUMNS)
+        self.collations = {
+            ("instituicoes", "i_nome"): "utf8mb4_general_ci",
+            ("series", "s_nome"): "utf8mb4_general_ci",
+            ("turmas", "t_nome"): "utf8mb4_general_ci",
+            ("alunos", "a_matricula"): "utf8mb4_general_ci",
+        }
+        self.consultas = []
+        self.proximo_id = 1000
+
+    def cursor(self, dictionary=False):
+        return CursorFake(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class CursorFake:
+    def __init__(self, banco: BancoFake):
+        self.banco = banco
+        self.resultado = []
+        self.lastrowid = None
+
+    def execute(self, query, params=()):
+        banco = self.banco
+        banco.consultas.append((query, tuple(params or ())))
+        self.resultado = []
+        if query == "SELECT 1":
+            self.resultado = [{"1": 1}]
+        elif "information_schema.COLUMNS" in query:
+            self.resultado = [
+                {"tabela": tabela, "coluna": coluna, "collation": collation}
+                for (tabela, coluna), collation in banco.collations.items()
+            ]
+        # Comparação no banco com collation binária (buscas por nome fora de utf8mb4_general_ci)
+        elif "WHERE i_nome = %s" in query:
+            self.resultado = [{"i_id": e["i_id"]} for e in banco.instituicoes if e["i_nome"] == params[0]]
+        elif "WHERE s_nome = %s" in query:
+            self.resultado = [{"s_id": s["s_id"]} for s in banco.series if s["s_nome"] == params[0]]
+        elif "WHERE t_nome = %s" in query:
+            self.resultado = [
+                {"t_id": t["t_id"]} for t in banco.turmas
+                if (t["t_nome"], t["t_serie"], t["t_instituicao"]) == params
+            ]
+        elif "a.a_matricula = %s" in query:
+            self.resultado = [aluno for aluno in banco.alunos if aluno["a_matricula"] == params[0]]
+        elif query.startswith("SELECT COUNT(*) as total FROM instituicoes"):
+            self.resultado = [{"total": len(banco.instituicoes)}]
+        elif "FROM instituicoes" in query:
+            self.resultado = list(banco.instituicoes)
+        elif "FROM series" in query:
+            self.resultado = list(banco.series)
+        elif "FROM turmas" in query:
+            self.resultado = list(banco.turmas)
+        elif "a_matricula IN" in query:
+            # Comparação do banco (utf8mb4_general_ci)
+            ras = {collation_key(ra) for ra in params}
+            self.resultado = [aluno for aluno in banco.alunos if collation_key(aluno["a_matricula"]) in ras]
+        elif query.startswith("INSERT"):
+            banco.proximo_id += 1
+            self.lastrowid = banco.proximo_id
+            if query.startswith("INSERT INTO alunos"):
+                banco.alunos.append({"a_id": self.lastrowid, "a_usuario": params[0], "a_matricula": params[1], "u_nome": ""})
+
+    def fetchone(self):
+        return self.resultado[0] if self.resultado else None
+
+    def fetchall(self):
+        return self.resultado
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    banco = BancoFake()
+
+    @contextmanager
+    def get_db_connection():
+        yield banco
+
+    monkeypatch.setattr(alunos_service, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(referencias_service, "get_db_connection", get_db_connection)
+    invalidate_reference_cache("teste")
+    yield banco
+    invalidate_reference_cache("teste")
+
+
+def criar_sessao(nome_arquivo: str, linhas: list) -> str:
+    """Passos 1 e 2 com o CSV (RA, NOME, ESCOLA, SERIE, TURMA) das linhas"""
+    csv = "\n".join([CABECALHO] + [",".join(linha) for linha in linhas]) + "\n"
+    session_id = AlunosService.step1_upload_validacao(nome_arquivo, csv, len(csv), "teste")["session_id"]
+    assert AlunosService.step2_validar_mapeamento(session_id, MAPEAMENTO, "teste")["success"]
+    return session_id
+
+
+class TestEscopoNomesSimilares:
+    """Testes para o escopo da detecção de nomes similares no passo 3"""
+
+    LINHAS = [
+        ("1", "MARIA SILVA", "ESCOLA A", "1ANO", "A"),
+        ("2", "MARIA SYLVA", "ESCOLA B", "1ANO", "A"),
+        ("3", "MARIA SILVAS", "ESCOLA A", "1ANO", "B"),
+    ]
+
+    def _pares(self, banco, escopo: str) -> set:
+        session_id = criar_sessao(f"escopo_{escopo}.csv", self.LINHAS)
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id, similar_names_scope=escopo)
+        assert resultado["success"] and resultado["data"]["similar_names_scope"] == escopo
+        similares = AlunosService.obter_linhas_step3(session_id, "similar")["items"]
+        return {(similar["linha_similar"], similar["row_index"]) for similar in similares}
+
+    def test_nomes_so_sao_comparados_no_mesmo_escopo(self, banco):
+        """Testa que escolas (escopo "escola") e turmas (escopo "turma") diferentes não são comparadas"""
+        assert self._pares(banco, "file") == {(0, 1), (0, 2), (1, 2)}
+        assert self._pares(banco, "escola") == {(0, 2)}
+        assert self._pares(banco, "turma") == set()
+
+    def test_escopo_invalido(self, banco):
+        """Testa que um escopo desconhecido é recusado antes da validação"""
+        session_id = criar_sessao("escopo_invalido.csv", self.LINHAS)
+
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id, similar_names_scope="serie")
+
+        assert resultado["success"] is False
+        assert "Escopo de nomes similares inválido" in resultado["message"]
+        assert import_sessions[session_id]["validation_results"] is None
+
+
+class TestNomesSimilaresGuardados:
+    """Testes para os limites de nomes similares guardados no passo 3"""
+
+    def test_limites_por_linha_e_total(self, banco, monkeypatch):
+        """Testa o limite por linha, o limite total, a ordem e a contagem exata com a lista truncada"""
+        nomes = ["JOAO PEREIRA", "JOAO PEREIRAS", "JOAO PEREIR", "JOAO PEREIRINHA"]
+        session_id = criar_sessao("similares_limites.csv", [
+            (str(ra), nome, "ESCOLA A", "1ANO", "A") for ra, nome in enumerate(nomes, start=1)
+        ])
+
+        def similares_guardados(por_linha: int, total: int) -> tuple:
+            monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "similar_names_per_row", por_linha)
+            monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "similar_names_max_stored", total)
+            resultado = AlunosService.step3_validar_detectar_conflitos(session_id, similar_names_scope="file")
+            similares = AlunosService.obter_linhas_step3(session_id, "similar")["items"]
+            pares = [(s["row_index"], s["linha_similar"], s["similaridade"]) for s in similares]
+            return resultado["data"]["similar_names_count"], pares
+
+        # Linha 1 ~ 0; linha 2 ~ 0 e 1; linha 3 ~ 0, 1 e 2: todos os pares são contados
+        contagem, pares = similares_guardados(por_linha=5, total=10)
+        assert (contagem, len(pares)) == (6, 6)
+        assert [similaridade for _, _, similaridade in pares] == sorted((s for _, _, s in pares), reverse=True)
+
+        # Apenas o mais similar de cada linha
+        assert similares_guardados(por_linha=1, total=10) == (6, [(1, 0, 0.923), (2, 0, 0.917), (3, 0, 0.8)])
+
+        # Apenas os dois mais similares no total, com a contagem ainda exata
+        assert similares_guardados(por_linha=1, total=2) == (6, [(1, 0, 0.923), (2, 0, 0.917)])
+
+
+class TestBuscaPorRa:
+    """Testes para a busca de alunos existentes por RA (passos 3 e 5)"""
+
+    def test_consultas_em_blocos(self, banco, monkeypatch):
+        """Testa os blocos de ra_lookup_chunk_size RAs, sem RAs vazios ou repetidos"""
+        monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "ra_lookup_chunk_size", 2)
+        banco.alunos = [
+            {"a_id": 1, "a_usuario": 11, "a_matricula": "2", "u_nome": "ANA"},
+            {"a_id": 2, "a_usuario": 12, "a_matricula": "a5", "u_nome": "BIA"},
+        ]
+
+        alunos = alunos_service._buscar_alunos_por_ra(banco.cursor(), ["1", "2", "", "2", "3", "4", "A5", None])
+
+        assert [params for query, params in banco.consultas] == [("1", "2"), ("3", "4"), ("A5",)]
+        assert {ra: aluno["u_nome"] for ra, aluno in alunos.items()} == {"2": "ANA", collation_key("A5"): "BIA"}
+        assert alunos_service._buscar_alunos_por_ra(banco.cursor(), ["", None]) == {}
+        assert len(banco.consultas) == 3
+
+    def test_passo5_detecta_ra_inserido_na_mesma_importacao(self, banco):
+        """Testa que um RA importado em uma linha é tratado como existente nas linhas seguintes"""
+        banco.alunos = [{"a_id": 1, "a_usuario": 11, "a_matricula": "9", "u_nome": "CADASTRADO"}]
+        session_id = criar_sessao("passo5_ras.csv", [
+            ("1", "ANA LIMA", "ESCOLA A", "1ANO", "A"),
+            ("1", "ANA LIMA SOUZA", "ESCOLA A", "1ANO", "B"),
+            ("9", "CARLOS", "ESCOLA B", "1ANO", "A"),
+            ("2", "DIEGO", "ESCOLA A", "1ANO", "A"),
+        ])
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["success"]
+
+        resultado = AlunosService.step5_importar_final(session_id)
+
+        assert resultado["success"], resultado["message"]
+        detalhes = {detalhe["row_index"]: detalhe["status"] for detalhe in resultado["data"]["detalhes"]}
+        assert detalhes == {0: "Importado com sucesso", 1: "RA já existe", 2: "RA já existe", 3: "Importado com sucesso"}
+        assert (resultado["data"]["alunos_criados"], resultado["data"]["alunos_com_ra_duplicado"]) == (2, 2)
+        assert [aluno["a_matricula"] for aluno in banco.alunos] == ["9", "1", "2"]
+
+
+class TestReferenciasNoPasso3:
+    """Testes para o modo DEMO e as referências desatualizadas no cache do worker"""
+
+    def test_modo_demo_decidido_no_banco(self, banco):
+        """Testa que um cache vazio (escolas criadas por outro worker) não coloca o passo 3 em modo DEMO"""
+        escolas = banco.instituicoes
+        banco.instituicoes = []
+        assert referencias_service.obter_referencias("teste")["totais"]["instituicoes"] == 0
+        banco.instituicoes = escolas
+        session_id = criar_sessao("referencias_vazias.csv", [
+            ("1", "ANA", "ESCOLA A", "1ANO", "A"),
+            ("2", "BIA", "ESCOLA X", "1ANO", "A"),
+        ])
+
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id)
+
+        assert (resultado["data"]["valid_rows"], resultado["data"]["invalid_rows"]) == (1, 1)
+        erros = AlunosService.obter_linhas_step3(session_id, "invalid")["items"][0]["errors"]
+        assert erros == ["Escola 'ESCOLA X' não existe no sistema"]
+
+    def test_referencia_ausente_recarregada_uma_vez(self, banco):
+        """Testa que escola/turma ausentes no cache são confirmadas no banco (uma recarga por validação)"""
+        referencias_service.obter_referencias("teste")
+        banco.instituicoes.append({"i_id": 3, "i_nome": "ESCOLA C"})
+        banco.turmas.append({"t_id": 300, "t_nome": "A", "t_serie": 10, "t_instituicao": 3})
+        session_id = criar_sessao("referencias_novas.csv", [
+            ("1", "ANA", "ESCOLA C", "1ANO", "A"),
+            ("2", "BIA", "ESCOLA X", "1ANO", "A"),
+            ("3", "CAIO", "ESCOLA A", "1ANO", "C"),
+        ])
+        banco.consultas.clear()
+
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id)
+
+        assert (resultado["data"]["valid_rows"], resultado["data"]["invalid_rows"]) == (1, 2)
+        assert sum(query.startswith("SELECT t_id") for query, _ in banco.consultas) == 1
+
+
+class TestReferenciasNoPasso5:
+    """Testes para os IDs de escola/série/turma usados na gravação"""
+
+    def test_passo5_le_referencias_atuais(self, banco):
+        """Testa que o passo 5 não usa o cache de referências (pode estar desatualizado em outro worker)"""
+        session_id = criar_sessao("passo5_referencias.csv", [("1", "ANA", "ESCOLA A", "1ANO", "A")])
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["success"]
+
+        # Turma recriada por outro worker depois do passo 3 (o cache deste worker ainda tem o id antigo)
+        banco.turmas[0] = {"t_id": 300, "t_nome": "A", "t_serie": 10, "t_instituicao": 1}
+        resultado = AlunosService.step5_importar_final(session_id)
+
+        assert resultado["data"]["alunos_criados"] == 1
+        inserts = [params for query, params in banco.consultas if query.startswith("INSERT INTO alunos")]
+        assert inserts[0][2] == 300
+
+
+class TestCollationDasColunas:
+    """Testes para a comparação por nome conforme a collation das colunas"""
+
+    def test_colunas_incompativeis(self, banco):
+        """Testa que collations diferentes de general_ci e colunas ausentes são apontadas"""
+        assert referencias_service.colunas_incompativeis(banco.cursor()) == []
+        banco.collations[("instituicoes", "i_nome")] = "utf8mb4_0900_ai_ci"
+        del banco.collations[("alunos", "a_matricula")]
+
+        assert referencias_service.colunas_incompativeis(banco.cursor()) == [
+            "instituicoes.i_nome (utf8mb4_0900_ai_ci)", "alunos.a_matricula (None)"
+        ]
+
+    def test_busca_no_banco_fora_de_general_ci(self, banco):
+        """Testa que o passo 3 só compara nomes em memória com as colunas em utf8mb4_general_ci"""
+        banco.instituicoes[0]["i_nome"] = "Escola A"
+        linhas = [("1", "ANA", "ESCOLA A", "1ANO", "A")]
+        session_id = criar_sessao("collation_general_ci.csv", linhas)
+        banco.consultas.clear()
+
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id)
+
+        assert resultado["data"]["valid_rows"] == 1
+        assert not any("WHERE i_nome" in query for query, _ in banco.consultas)
+
+        banco.collations[("instituicoes", "i_nome")] = "utf8mb4_bin"
+        invalidate_reference_cache("teste")
+        session_id = criar_sessao("collation_bin.csv", linhas)
+        banco.consultas.clear()
+
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id)
+
+        assert resultado["data"]["invalid_rows"] == 1
+        erros = AlunosService.obter_linhas_step3(session_id, "invalid")["items"][0]["errors"]
+        assert erros == ["Escola 'ESCOLA A' não existe no sistema"]
+        assert ("SELECT i_id FROM instituicoes WHERE i_nome = %s ORDER BY i_id LIMIT 1", ("ESCOLA A",)) in banco.consultas
+
+    def test_passo5_busca_ra_no_banco_fora_de_general_ci(self, banco):
+        """Testa que, com a comparação no banco, o passo 5 consulta cada RA na transação"""
+        banco.collations[("alunos", "a_matricula")] = "utf8mb4_bin"
+        banco.alunos = [{"a_id": 1, "a_usuario": 11, "a_matricula": "9", "u_nome": "CADASTRADO"}]
+        session_id = criar_sessao("collation_passo5.csv", [
+            ("1", "ANA LIMA", "ESCOLA A", "1ANO", "A"),
+            ("1", "ANA LIMA SOUZA", "ESCOLA A", "1ANO", "B"),
+            ("9", "CARLOS", "ESCOLA B", "1ANO", "A"),
+        ])
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["success"]
+        banco.consultas.clear()
+
+        resultado = AlunosService.step5_importar_final(session_id)
+
+        detalhes = {detalhe["row_index"]: detalhe["status"] for detalhe in resultado["data"]["detalhes"]}
+        assert detalhes == {0: "Importado com sucesso", 1: "RA já existe", 2: "RA já existe"}
+        assert not any("a_matricula IN" in query for query, _ in banco.consultas)
+        assert sum("a.a_matricula = %s" in query for query, _ in banco.consultas) == 3
+
+
+class TestValidacaoEmAndamento:
+    """Testes para a recusa do passo 3 com outra validação da sessão em andamento"""
+
+    LINHAS = [("1", "ANA", "ESCOLA A", "1ANO", "A")]
+
+    def test_passo3_recusado_com_validacao_em_andamento(self, banco):
+        """Testa que o passo 3 síncrono e o job não iniciam durante outra validação síncrona"""
+        session_id = criar_sessao("validando.csv", self.LINHAS)
+        import_sessions[session_id]["validando"] = True
+
+        for resultado in (AlunosService.step3_validar_detectar_conflitos(session_id),
+                          AlunosService.iniciar_step3_segundo_plano(session_id)):
+            assert resultado == {"success": False, "message": "A validação ainda está em andamento.", "step": 3}
+        assert import_sessions[session_id]["validation_results"] is None
+        assert import_sessions[session_id].get("step3_job") is None
+
+        import_sessions[session_id]["validando"] = False
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["success"]
+        assert import_sessions[session_id]["validando"] is False
+
+    def test_passo3_recusado_com_job_em_andamento(self, banco):
+        """Testa que o passo 3 síncrono é recusado e o job em andamento é retornado sem iniciar outro"""
+        session_id = criar_sessao("validando_job.csv", self.LINHAS)
+        job = Job("alunos_step3")
+        import_sessions[session_id]["step3_job"] = job
+
+        resultado = AlunosService.step3_validar_detectar_conflitos(session_id)
+        assert resultado == {"success": False, "message": "A validação ainda está em andamento.", "step": 3}
+
+        resultado = AlunosService.iniciar_step3_segundo_plano(session_id)
+        assert resultado["success"] and resultado["job"]["job_id"] == job.id
+        assert import_sessions[session_id]["step3_job"] is job
+        assert import_sessions[session_id]["validation_results"] is None
+
+    def test_job_associado_ao_banco_da_sessao(self, banco):
+        """Testa que o job do passo 3 fica associado ao banco da sessão (consultado em /{db}/jobs)"""
+        session_id = criar_sessao("validando_banco.csv", self.LINHAS)
+
+        resultado = AlunosService.iniciar_step3_segundo_plano(session_id)
+        job = import_sessions[session_id]["step3_job"]
+
+        assert resultado["job"]["job_id"] == job.id
+        assert job.db_name == "teste"
+        while job.running:
+            time.sleep(0.01)
+        assert job.result["success"]
+
+
+class TestLinhasDoPasso3:
+    """Testes para a consulta das linhas do passo 3 por categoria (JSON paginado e NDJSON)"""
+
+    LINHAS = [
+        ("1", "ANA LIMA", "ESCOLA A", "1ANO", "A"),
+        ("2", "BRUNO COSTA", "ESCOLA A", "1ANO", "A"),
+        ("9", "CARLOS", "ESCOLA B", "1ANO", "A"),
+        ("3", "", "ESCOLA A", "1ANO", "A"),
+        ("4", "EVA@SOUZA", "ESCOLA A", "1ANO", "A"),
+        ("5", "ANA LIMAS", "ESCOLA A", "1ANO", "A"),
+        ("2", "BRUNO COSTA", "ESCOLA A", "1ANO", "A"),
+    ]
+
+    def _validar(self, banco, nome_arquivo: str) -> str:
+        banco.alunos = [{"a_id": 1, "a_usuario": 11, "a_matricula": "9", "u_nome": "CADASTRADO"}]
+        session_id = criar_sessao(nome_arquivo, self.LINHAS)
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["success"]
+        return session_id
+
+    def test_linhas_de_cada_categoria(self, banco):
+        """Testa as linhas de cada categoria, com os dados da linha em "data\""""
+        session_id = self._validar(banco, "linhas_categorias.csv")
+
+        linhas = {
+            categoria: AlunosService.obter_linhas_step3(session_id, categoria)
+            for categoria in ("valid", "conflict", "invalid", "duplicate", "special_chars", "similar")
+        }
+
+        assert {categoria: [item["row_index"] for item in resultado["items"]] for categoria, resultado in linhas.items()} == {
+            "valid": [0, 1, 5], "conflict": [2], "invalid": [3, 4], "duplicate": [6], "special_chars": [4], "similar": [5]
+        }
+        assert all(resultado["total"] == len(resultado["items"]) for resultado in linhas.values())
+        assert linhas["conflict"]["items"][0]["data"]["nome"] == "CARLOS"
+        assert linhas["conflict"]["items"][0]["conflicts"][0]["type"] == "aluno_duplicado"
+        assert linhas["duplicate"]["items"][0]["duplicate_of"] == 1
+        assert linhas["similar"]["items"][0]["linha_similar"] == 0
+
+    def test_paginacao_e_limite(self, banco, monkeypatch):
+        """Testa offset/limit, o total da categoria e o limit limitado a step3_rows_max_page_size"""
+        session_id = self._validar(banco, "linhas_paginas.csv")
+
+        pagina = AlunosService.obter_linhas_step3(session_id, "valid", offset=1, limit=1)
+        assert (pagina["total"], pagina["offset"], pagina["limit"]) == (3, 1, 1)
+        assert [item["row_index"] for item in pagina["items"]] == [1]
+        assert AlunosService.obter_linhas_step3(session_id, "valid", offset=5)["items"] == []
+
+        monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "step3_rows_max_page_size", 2)
+        pagina = AlunosService.obter_linhas_step3(session_id, "valid", limit=50)
+        assert (pagina["limit"], [item["row_index"] for item in pagina["items"]]) == (2, [0, 1])
+
+    def test_ndjson(self, banco):
+        """Testa o NDJSON: um objeto por linha, igual aos itens da consulta paginada"""
+        session_id = self._validar(banco, "linhas_ndjson.csv")
+
+        linhas = list(AlunosService.iterar_linhas_step3(session_id, "valid"))
+
+        assert all(linha.endswith("\n") for linha in linhas)
+        assert [json.loads(linha) for linha in linhas] == AlunosService.obter_linhas_step3(session_id, "valid")["items"]
+        assert [json.loads(linha)["row_index"] for linha in AlunosService.iterar_linhas_step3(session_id, "valid", 1, 1)] == [1]
+
+    def test_consulta_antes_ou_durante_a_validacao(self, banco):
+        """Testa as respostas de erro antes do passo 3, durante o job do passo 3 e com categoria inválida"""
+        session_id = criar_sessao("linhas_antes.csv", self.LINHAS)
+
+        resultado = AlunosService.obter_linhas_step3(session_id, "valid")
+        assert (resultado["success"], resultado["message"]) == (False, "É necessário completar a validação primeiro.")
+
+        import_sessions[session_id]["step3_job"] = Job("alunos_step3")
+        resultado = AlunosService.obter_linhas_step3(session_id, "valid")
+        assert (resultado["success"], resultado["message"]) == (False, "A validação ainda está em andamento.")
+
+        import_sessions[session_id]["step3_job"] = None
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["success"]
+        assert "Categoria inválida" in AlunosService.obter_linhas_step3(session_id, "outra")["message"]
+        assert AlunosService.obter_linhas_step3("inexistente", "valid")["message"] == "Sessão de importação não encontrada."
+
+
+class TestCacheDoPasso3:
+    """Testes para os resultados do passo 3 reaproveitados entre execuções na sessão"""
+
+    LINHAS = [
+        ("1", "JOAO PEREIRA", "ESCOLA A", "1ANO", "A"),
+        ("2", "JOAO PEREIRAS", "ESCOLA A", "1ANO", "A"),
+        ("3", "JOAO PEREIR", "ESCOLA A", "1ANO", "A"),
+    ]
+
+    def test_nomes_similares_guardados_com_limite_por_linha(self, banco, monkeypatch):
+        """Testa que a sessão guarda só o hash da entrada e os mais similares de cada nome, reaproveitados"""
+        monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "similar_names_per_row", 1)
+        chamadas = []
+        find_similar_names = alunos_service.find_similar_names
+
+        def contar_chamadas(nomes, **kwargs):
+            chamadas.append(len(nomes))
+            return find_similar_names(nomes, **kwargs)
+
+        monkeypatch.setattr(alunos_service, "find_similar_names", contar_chamadas)
+        session_id = criar_sessao("cache_similares.csv", self.LINHAS)
+
+        contagens = [AlunosService.step3_validar_detectar_conflitos(session_id)["data"]["similar_names_count"]
+                     for _ in range(2)]
+
+        entrada, similares = import_sessions[session_id]["step3_cache"]["nomes_similares"]
+        assert (contagens, chamadas) == ([3, 3], [3])
+        assert isinstance(entrada, int)
+        assert {posicao: (contagem, len(guardados)) for posicao, (contagem, guardados) in similares.items()} == {
+            1: (1, 1), 2: (2, 1)
+        }
+
+    def test_validacao_por_campo_nao_guardada_em_arquivo_grande(self, banco, monkeypatch):
+        """Testa que acima de step3_field_cache_max_rows linhas a validação por campo não fica na sessão"""
+        session_id = criar_sessao("cache_campos.csv", self.LINHAS)
+
+        resumo = AlunosService.step3_validar_detectar_conflitos(session_id)["data"]["summary"]
+        assert len(import_sessions[session_id]["step3_cache"]["campos"]) == len(MAPEAMENTO)
+
+        monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "step3_field_cache_max_rows", 2)
+        assert AlunosService.step3_validar_detectar_conflitos(session_id)["data"]["summary"] == resumo
+        assert import_sessions[session_id]["step3_cache"]["campos"] == {}
+
+    def test_alunos_por_ra_descartados_pelo_passo5_e_pelo_ttl(self, banco, monkeypatch):
+        """Testa que os alunos por RA do passo 3 são consultados novamente após o passo 5 e após reference_ttl"""
+        session_id = criar_sessao("cache_ras.csv", self.LINHAS)
+
+        def consultas_por_ra() -> int:
+            return sum("a_matricula IN" in query for query, _ in banco.consultas)
+
+        AlunosService.step3_validar_detectar_conflitos(session_id)
+        AlunosService.step3_validar_detectar_conflitos(session_id)
+        assert consultas_por_ra() == 1
+
+        assert AlunosService.step5_importar_final(session_id)["success"]
+        assert import_sessions[session_id]["step3_cache"]["alunos_por_ra"] is None
+        AlunosService.step3_validar_detectar_conflitos(session_id)
+        assert consultas_por_ra() == 3  # passo 5 + nova consulta do passo 3
+
+        monkeypatch.setitem(alunos_service.CACHE_CONFIG, "reference_ttl", 0)
+        AlunosService.step3_validar_detectar_conflitos(session_id)
+        assert consultas_por_ra() == 4
+
+
+class TestLimiteDeTamanhoNoPasso1:
+    """Testes para o limite de tamanho do arquivo no passo 1"""
+
+    def test_limite_vale_para_o_conteudo_descompactado(self, banco, monkeypatch):
+        """Testa que o limite é verificado no conteúdo descompactado, não no tamanho do upload"""
+        conteudo = (CABECALHO + "\n" + "".join(f"{ra},ALUNO {ra},ESCOLA A,1ANO,A\n" for ra in range(200))).encode()
+        compactado = gzip.compress(conteudo)
+        monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "max_file_size", len(conteudo) - 1)
+        assert len(compactado) < len(conteudo) - 1
+
+        texto, _ = open_upload_text(io.BytesIO(compactado))
+        resultado = AlunosService.step1_upload_validacao("limite.csv.gz", texto, len(compactado), "teste")
+        assert (resultado["success"], resultado["message"]) == (False, str(UploadTooLargeError(len(conteudo) - 1)))
+
+        # Tamanho informado acima do limite com conteúdo dentro dele (ex.: upload compactado): aceito
+        monkeypatch.setitem(alunos_service.IMPORT_CONFIG, "max_file_size", len(conteudo))
+        texto, _ = open_upload_text(io.BytesIO(compactado))
+        resultado = AlunosService.step1_upload_validacao("limite_ok.csv.gz", texto, len(conteudo) + 1, "teste")
+        assert resultado["success"], resultado["message"]
@@ -0,0 +1,102 @@
+"""
+Testes unitários para os jobs em segundo plano
+"""
+import asyncio
+import json
+import sys
+import time
+import types
+
+from app.core.background_jobs import Job, JOB_CONCLUIDO, JOB_FALHOU, job_events, submit_job
+
+try:
+    import app.core.database  # noqa: F401
+except Exception:
+    # Sem acesso ao banco: o módulo real abre o pool de conexões ao ser importado
+    _database = types.ModuleType("app.core.database")
+    _database.get_db_connection = None
+    sys.modules["app.core.database"] = _database
+
+from app.routers import sistema
+
+
+def _esperar(job: Job, timeout: float = 5.0) -> None:
+    inicio = time.monotonic()
+    while job.running and time.monotonic() - inicio < timeout:
+        time.sleep(0.01)
+
+
+class TestBackgroundJobs:
+    """Testes para execução e progresso dos jobs"""
+
+    def test_resultado_e_progresso(self):
+        """Testa que o job guarda o resultado e calcula linhas/s na fase atual"""
+        def tarefa(total, progress):
+            progress("preparacao", 0, None)
+            for processadas in range(0, total + 1, 10):
+                progress("linhas", processadas, total)
+                time.sleep(0.001)
+            return {"success": True, "linhas": total}
+
+        job = submit_job(Job(), tarefa, 50)
+        _esperar(job)
+        estado = job.to_dict()
+
+        assert estado["status"] == JOB_CONCLUIDO
+        assert job.result == {"success": True, "linhas": 50}
+        assert (estado["phase"], estado["processed_rows"], estado["percent"]) == ("linhas", 50, 100.0)
+        assert estado["rows_per_sec"] > 0
+        assert estado["eta_seconds"] is None
+
+    def test_excecao_marca_job_como_falho(self):
+        """Testa que uma exceção na tarefa fica registrada no job"""
+        def tarefa(progress):
+            raise ValueError("falhou")
+
+        job = submit_job(Job(), tarefa)
+        _esperar(job)
+
+        assert job.to_dict()["status"] == JOB_FALHOU
+        assert job.error == "falhou"
+
+    def test_stream_de_eventos(self, monkeypatch):
+        """Testa que o stream SSE envia o progresso e termina com o evento 'done'"""
+        from app.core.config import BACKGROUND_JOBS_CONFIG
+        monkeypatch.setitem(BACKGROUND_JOBS_CONFIG, "events_interval", 0.01)
+
+        def tarefa(progress):
+            for processadas in range(3):
+                progress("linhas", processadas, 3, processadas)
+                time.sleep(0.05)
+            return {"success": True}
+
+        job = submit_job(Job("teste"), tarefa)
+
+        async def consumir():
+            return [evento async for evento in job_events(job)]
+
+        eventos = asyncio.run(consumir())
+        nome, dados = eventos[-1].strip().split("\n")
+        estado = json.loads(dados[len("data: "):])
+
+        assert all(evento.startswith("event: progress\n") for evento in eventos[:-1])
+        assert nome == "event: done"
+        assert (estado["status"], estado["errors"]) == (JOB_CONCLUIDO, 2)
+
+
+
+class TestRotasDeJobs:
+    """Testes para a consulta de jobs pelas rotas /{db}/jobs"""
+
+    def test_job_de_outro_banco_nao_e_encontrado(self):
+        """Testa que o estado e o stream de um job só são expostos no banco do job"""
+        job = submit_job(Job("teste", "banco_a"), lambda progress: {"success": True})
+        _esperar(job)
+
+        resposta = asyncio.run(sistema.get_job_status("banco_a", job.id))
+        assert (resposta["success"], resposta["result"]) == (True, {"success": True})
+
+        nao_encontrado = {"success": False, "message": "Job não encontrado."}
+        assert asyncio.run(sistema.get_job_status("banco_b", job.id)) == nao_encontrado
+        assert asyncio.run(sistema.get_job_events("banco_b", job.id)) == nao_encontrado
+        assert asyncio.run(sistema.get_job_events("banco_a", job.id)).media_type == "text/event-stream"
@@ -0,0 +1,53 @@
+"""
+Testes unitários para os caches por banco
+"""
+from app.core.cache import ReferenceCache, get_similarity_cache, similarity_caches
+
+
+class TestReferenceCache:
+    """Testes para o cache de dados de referência (escolas, séries e turmas)"""
+
+    def test_acertos_faltas_e_invalidacao(self):
+        """Testa que o carregamento só ocorre na falta e após a invalidação"""
+        cache = ReferenceCache(maxsize=10, ttl=60)
+        carregamentos = []
+
+        def loader():
+            carregamentos.append(1)
+            return {"versao": len(carregamentos)}
+
+        assert cache.get("db", loader) == {"versao": 1}
+        assert cache.get("db", loader) == {"versao": 1}
+        assert cache.invalidate("db") is True
+        assert cache.get("db", loader) == {"versao": 2}
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+    def test_invalidacao_durante_carregamento(self):
+        """Testa que dados carregados antes de uma invalidação não ficam em cache"""
+        cache = ReferenceCache(maxsize=10, ttl=60)
+
+        def loader():
+            cache.invalidate("db")  # Importação gravou enquanto os dados eram lidos
+            return {"versao": "antiga"}
+
+        assert cache.get("db", loader) == {"versao": "antiga"}
+        assert cache.get("db", lambda: {"versao": "nova"}) == {"versao": "nova"}
+
+
+class TestSimilarityCaches:
+    """Testes para os caches de similaridade de nomes de escolas por banco"""
+
+    def test_quantidade_de_bancos_limitada(self):
+        """Testa que apenas os bancos usados mais recentemente mantêm o cache"""
+        similarity_caches.clear()
+        limite = similarity_caches.maxsize
+        primeiro = get_similarity_cache("db_0")
+        for indice in range(1, limite + 1):
+            get_similarity_cache(f"db_{indice}")
+
+        assert len(similarity_caches) == limite
+        assert "db_0" not in similarity_caches
+        assert get_similarity_cache("db_0") is not primeiro
+        similarity_caches.clear()
@@ -0,0 +1,38 @@
+"""
+Testes unitários para o armazenamento colunar de linhas
+"""
+from app.utils.columnar_rows import ColumnarRows
+
+
+class TestColumnarRows:
+    """Testes para o contêiner colunar das sessões de importação"""
+
+    def _carregar(self, linhas):
+        rows = ColumnarRows()
+        for linha in linhas:
+            rows.append(linha)
+        return rows.freeze()
+
+    def test_acesso_por_linha_e_iteracao(self):
+        """Testa que o contêiner devolve as mesmas linhas recebidas"""
+        linhas = [[str(i), f"ALUNO {i}", "ESCOLA A" if i % 2 else "ESCOLA B"] for i in range(3000)]
+
+        rows = self._carregar(linhas)
+
+        assert len(rows) == 3000
+        assert list(rows) == linhas
+        assert rows[10] == linhas[10]
+        assert rows[-1] == linhas[-1]
+        assert rows[:5] == linhas[:5]
+        assert rows.column(2) == [linha[2] for linha in linhas]
+
+    def test_colunas_repetidas_usam_dicionario(self):
+        """Testa que colunas de baixa cardinalidade ficam codificadas por dicionário"""
+        linhas = [[str(i), "ESCOLA A", "1ANO"] for i in range(2000)]
+
+        rows = self._carregar(linhas)
+
+        assert rows._plain[0] is not None  # RA: alta cardinalidade
+        assert rows._plain[1] is None
+        assert rows._values[1] == ["ESCOLA A"]
+        assert rows._codes[1].typecode == 'B'
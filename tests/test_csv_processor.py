@@ -0,0 +1,64 @@
+"""
+Testes unitários para o processador de CSV
+"""
+from app.utils.csv_processor import parse_csv_basic
+
+
+class TestParseCsvBasic:
+    """Testes para o parse básico de CSV"""
+
+    def test_headers_maiusculos_e_colunas_ajustadas(self):
+        """Testa cabeçalho em maiúsculas e ajuste do número de colunas"""
+        result = parse_csv_basic("ra;nome;turma\n1;JOAO\n2;MARIA;A;EXTRA\n")
+
+        assert result["success"] is True
+        assert result["headers"] == ["RA", "NOME", "TURMA"]
+        assert result["data_rows"] == [["1", "JOAO", ""], ["2", "MARIA", "A"]]
+
+    def test_campo_entre_aspas_com_quebra_de_linha(self):
+        """Testa campo entre aspas contendo delimitador e quebra de linha"""
+        result = parse_csv_basic('RA,NOME,OBS\n1,"SILVA, JOAO","linha 1\nlinha 2"\n2,MARIA,\n')
+
+        assert result["total_rows"] == 2
+        assert result["data_rows"][0] == ["1", "SILVA, JOAO", "linha 1\nlinha 2"]
+
+    def test_linhas_em_branco_ignoradas(self):
+        """Testa que linhas em branco não geram registros"""
+        result = parse_csv_basic("\n\nRA,NOME\r\n\r\n 1 , joao \r\n   \r\n", cell_transform=str.upper)
+
+        assert result["data_rows"] == [["1", "JOAO"]]
+
+    def test_arquivo_sem_dados(self):
+        """Testa arquivo apenas com cabeçalho"""
+        result = parse_csv_basic("RA,NOME\n")
+
+        assert result["success"] is False
+        assert result["data_rows"] == []
+
+
+class TestParseParalelo:
+    """Testes para o parse em blocos no pool de processos"""
+
+    def test_parse_paralelo_igual_ao_sequencial(self, monkeypatch):
+        """Testa que o modo paralelo mantém linhas, ordem e numeração"""
+        from app.core.config import IMPORT_CONFIG
+        from app.utils.csv_processor import process_csv_data
+
+        linhas = ["ESCOLA,SERIE,TURMA"]
+        for i in range(300):
+            linhas.append(f'"ESCOLA {i % 7}, UNIDADE","{i % 9}ANO",T{i}')
+            if i % 50 == 0:
+                linhas.append(',"VAZIA\nCOM QUEBRA",X')
+        content = "\n".join(linhas) + "\n"
+
+        sequencial_basic = parse_csv_basic(content, cell_transform=str.upper)
+        sequencial = process_csv_data(content, ["ESCOLA", "SERIE", "TURMA"])
+
+        from app.core.config import PROCESS_POOL_CONFIG
+        monkeypatch.setitem(PROCESS_POOL_CONFIG, "max_workers", 2)
+        monkeypatch.setitem(IMPORT_CONFIG, "parallel_parse_threshold", 1)
+        monkeypatch.setitem(IMPORT_CONFIG, "parallel_parse_chunk_size", 512)
+
+        assert parse_csv_basic(content, cell_transform=str.upper) == sequencial_basic
+        assert process_csv_data(content, ["ESCOLA", "SERIE", "TURMA"]) == sequencial
+        assert sequencial["errors"][0]["linha"] == 3
@@ -0,0 +1,22 @@
+"""
+Testes unitários para a validação das linhas de estrutura
+"""
+from app.core.config import PROCESS_POOL_CONFIG
+from app.utils.estrutura_schema import ESTRUTURA_ROW_SCHEMA, validar_linhas_estrutura
+
+
+class TestValidarLinhasEstrutura:
+    """Testes para a validação em blocos no pool de processos"""
+
+    def test_blocos_no_pool_iguais_ao_sequencial(self, monkeypatch):
+        """Testa que a validação em blocos mantém resultados e ordem das linhas"""
+        monkeypatch.setitem(PROCESS_POOL_CONFIG, "max_workers", 2)
+        linhas = [
+            {"ESCOLA": f"ESCOLA {i}" + ("@" if i % 7 == 0 else ""), "SERIE": f" {i % 9}ANO", "TURMA": "AB"[i % 2]}
+            for i in range(50)
+        ]
+        esperado = ESTRUTURA_ROW_SCHEMA.validate_rows(linhas)
+
+        assert validar_linhas_estrutura(linhas, parallel_threshold=1, chunk_size=8) == esperado
+        assert validar_linhas_estrutura(linhas) == esperado
+        assert any(erros for _, erros, _ in esperado) and any(avisos for _, _, avisos in esperado)
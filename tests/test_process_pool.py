@@ -0,0 +1,66 @@
+"""
+Testes unitários para o dimensionamento do pool de processos
+"""
+import threading
+
+from app.core import process_pool
+from app.core.config import PROCESS_POOL_CONFIG
+
+
+class TestAvailableCpus:
+    """Testes para a leitura da cota de CPU do container"""
+
+    def test_cota_cgroup_v2(self, tmp_path, monkeypatch):
+        """Testa a cota do cgroup v2 arredondada para cima e o caso sem limite"""
+        cpu_max = tmp_path / "cpu.max"
+        monkeypatch.setattr(process_pool, "CGROUP_CPU_MAX", str(cpu_max))
+        monkeypatch.setattr(process_pool.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+
+        cpu_max.write_text("150000 100000\n")
+        assert process_pool.available_cpus() == 2
+
+        cpu_max.write_text("max 100000\n")
+        monkeypatch.setattr(process_pool, "CGROUP_V1_QUOTA", str(tmp_path / "ausente"))
+        assert process_pool.available_cpus() == 8
+
+
+class TestGetProcessPool:
+    """Testes para a criação do pool por worker"""
+
+    def test_pool_unico_entre_threads(self, monkeypatch):
+        """Testa que threads simultâneas recebem o mesmo pool (sem criar pools a mais)"""
+        criados = []
+
+        class PoolFake:
+            def __init__(self, **kwargs):
+                criados.append(self)
+
+        monkeypatch.setattr(process_pool, "ProcessPoolExecutor", PoolFake)
+        monkeypatch.setattr(process_pool, "_pool", None)
+        inicio = threading.Barrier(8)
+        pools = []
+
+        def pedir_pool():
+            inicio.wait()
+            pools.append(process_pool.get_process_pool())
+
+        threads = [threading.Thread(target=pedir_pool) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(criados) == 1
+        assert all(pool is criados[0] for pool in pools)
+
+    def test_pool_so_com_mais_de_um_processo(self, monkeypatch):
+        """Testa que o pool é usado por padrão com mais de um CPU e nunca com um único processo"""
+        monkeypatch.setitem(PROCESS_POOL_CONFIG, "max_workers", None)
+        monkeypatch.setattr(process_pool, "available_cpus", lambda: 1)
+        assert process_pool.pool_enabled() is False
+
+        monkeypatch.setattr(process_pool, "available_cpus", lambda: 4)
+        assert process_pool.pool_enabled() is True
+
+        monkeypatch.setitem(PROCESS_POOL_CONFIG, "max_workers", 1)
+        assert process_pool.pool_enabled() is False
@@ -0,0 +1,34 @@
+"""
+Testes unitários para os registros compactos das linhas validadas
+"""
+from app.utils.row_records import RowRecords
+
+
+class TestRowRecords:
+    """Testes para o armazenamento e a serialização das linhas do passo 3"""
+
+    def test_serializacao_materializa_os_dados(self):
+        """Testa que registros e entradas por row_index são serializados com os dados da linha"""
+        rows = RowRecords(["nome", "ra"])
+        valida = rows.add({"nome": "JOAO", "ra": "1"})
+        invalida = rows.add({"nome": "", "ra": "2", "extra": "ignorado"})
+        valida.conflicts = [{"row_index": 0, "type": "aluno_duplicado"}]
+        valida.skip_import = True
+        invalida.errors = ["Campo 'nome' é obrigatório"]
+
+        assert (len(rows), rows[1] is invalida) == (2, True)
+        assert rows.serialize(valida) == {
+            "row_index": 0,
+            "data": {"nome": "JOAO", "ra": "1"},
+            "conflicts": [{"row_index": 0, "type": "aluno_duplicado", "data": {"nome": "JOAO", "ra": "1"}}],
+            "skip_import": True
+        }
+        assert rows.serialize(invalida) == {
+            "row_index": 1,
+            "data": {"nome": "", "ra": "2"},
+            "errors": ["Campo 'nome' é obrigatório"]
+        }
+        assert rows.serialize({"row_index": 1, "duplicate_of": 0}) == {
+            "row_index": 1, "duplicate_of": 0, "data": {"nome": "", "ra": "2"}
+        }
+        assert rows.serialize(rows.add({"nome": "ANA", "ra": "3"}))["conflicts"] == []
@@ -0,0 +1,102 @@
+"""
+Testes unitários para o esquema declarativo de validação de linhas
+"""
+from app.utils.row_schema import Column, RowSchema, Validator
+from app.utils.text_utils import has_special_characters, validate_email, find_invalid_emails, find_special_characters
+
+SEM_ESPECIAIS = Validator(
+    lambda value: not has_special_characters(value),
+    "caracteres_especiais",
+    "Campo '{label}' contém caracteres especiais não permitidos: '{value}'",
+    batch=find_special_characters
+)
+EMAIL = Validator(lambda value: validate_email(value)["valid"], "email_invalido", "Email inválido: '{value}'", batch=find_invalid_emails)
+
+
+class TestRowSchema:
+    """Testes para o validador compilado"""
+
+    def test_linha_em_lista_com_mapeamento(self):
+        """Testa extração por índice, normalizador, obrigatórios e validadores"""
+        schema = RowSchema([
+            Column("nome", required=True, validators=(SEM_ESPECIAIS,)),
+            Column("ra", required=True),
+            Column("email", normalizer=str.lower, validators=(EMAIL,)),
+        ])
+        validate_row = schema.compile({"nome": 0, "email": 2, "senha": 3, "ra": 5})
+
+        data, errors, warnings = validate_row([" JOAO@ ", "X", " JOAO@MAIL ", " 123 "])
+
+        assert data == {"nome": "JOAO@", "email": "joao@mail", "senha": "123", "ra": ""}
+        assert errors == [
+            ("nome", "caracteres_especiais", "Campo 'nome' contém caracteres especiais não permitidos: 'JOAO@'"),
+            ("email", "email_invalido", "Email inválido: 'joao@mail'"),
+            ("ra", "campo_ausente", "Campo 'ra' não encontrado"),
+        ]
+        assert warnings == []
+        assert schema.compile({"nome": 0, "email": 2, "senha": 3, "ra": 5}) is validate_row
+
+    def test_linha_em_dict_para_no_primeiro_erro(self):
+        """Testa avisos de espaços extras e interrupção no primeiro erro"""
+        schema = RowSchema([
+            Column(name, label=label, validators=(SEM_ESPECIAIS,),
+                   untrimmed_warning="Nome {label} contém espaços no início ou fim: '{value}'")
+            for name, label in [("ESCOLA", "da escola"), ("SERIE", "da série"), ("TURMA", "da turma")]
+        ], stop_on_error=True)
+        validate_row = schema.compile()
+
+        data, errors, warnings = validate_row({"ESCOLA": "ESCOLA 1", "SERIE": "1ANO#", "TURMA": " A$"})
+
+        assert [code for _, code, _ in errors] == ["caracteres_especiais"]
+        assert errors[0][0] == "SERIE"
+        assert warnings == [("TURMA", "espacos_extras", "Nome da turma contém espaços no início ou fim: ' A$'")]
+        assert validate_row({"ESCOLA": "E", "SERIE": "1", "TURMA": "A"}) == ({"ESCOLA": "E", "SERIE": "1", "TURMA": "A"}, [], [])
+
+    def test_validate_rows_igual_a_validacao_por_linha(self):
+        """Testa que a validação em lote por coluna gera o mesmo resultado linha a linha"""
+        for stop_on_error in (False, True):
+            schema = RowSchema([
+                Column("nome", required=True, validators=(SEM_ESPECIAIS,)),
+                Column("email", normalizer=str.lower, validators=(EMAIL,)),
+                Column("turma", required=True, validators=(SEM_ESPECIAIS,)),
+            ], stop_on_error=stop_on_error)
+            indices = {"turma": 2, "nome": 0, "email": 1}
+            rows = [
+                ["JOAO", "joao@mail.com", "A"],
+                ["JO#AO", "JOAO@MAIL", ""],
+                ["", "invalido", "B$"],
+                ["MARIA", "", "C"],
+                ["ANA"],
+            ]
+
+            validate_row = schema.compile(indices)
+            esperado = [validate_row(row) for row in rows]
+            obtido = schema.validate_rows(rows, indices)
+            if stop_on_error:
+                # No modo "primeiro erro" os dados extraídos podem ir além do campo com erro
+                esperado = [(errors, warnings) for _, errors, warnings in esperado]
+                obtido = [(errors, warnings) for _, errors, warnings in obtido]
+            assert obtido == esperado
+
+    def test_validate_rows_com_cache_por_campo(self):
+        """Testa que, com cache, só os campos com novo índice são validados e o resultado é o mesmo"""
+        validados = []
+        contador = Validator(lambda value: validados.append(value) or True, "contador", "")
+        schema = RowSchema([
+            Column("nome", required=True, validators=(SEM_ESPECIAIS, contador)),
+            Column("email", normalizer=str.lower, validators=(EMAIL,)),
+            Column("turma", required=True, validators=(SEM_ESPECIAIS,)),
+        ])
+        rows = [
+            [" JOAO ", "joao@mail.com", "A", "X"],
+            ["JO#AO", "JOAO@MAIL", "", "Y$"],
+            ["", "invalido", "B$", "C"],
+        ]
+        cache = {}
+
+        for indices in ({"nome": 0, "email": 1, "turma": 2}, {"nome": 0, "email": 1, "turma": 3}):
+            assert schema.validate_rows(rows, indices, cache=cache) == schema.validate_rows(rows, indices)
+
+        # 2 nomes preenchidos, validados na primeira chamada com cache e nas duas sem cache
+        assert len(validados) == 2 * 3
+        assert sorted(cache) == [("email", 1), ("nome", 0), ("turma", 2), ("turma", 3)]
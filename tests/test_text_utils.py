@@ -0,0 +1,190 @@
+"""
+Testes unitários para normalização e similaridade de textos
+"""
+import random
+from app.core.config import PROCESS_POOL_CONFIG
+from app.utils.text_utils import (
+    batch_similarity, blocking_keys, calculate_similarity, collation_key, detect_similar_names, detect_similar_names_many,
+    find_similar_names,
+    normalize_column, normalize_text, phonetic_key, SimilarityIndex, _normalize_text_slow
+)
+
+
+def similaridade_matriz_completa(str1: str, str2: str) -> float:
+    """Levenshtein com a matriz completa (referência)"""
+    str1, str2 = str1.lower(), str2.lower()
+    matrix = [[i + j if i * j == 0 else 0 for j in range(len(str2) + 1)] for i in range(len(str1) + 1)]
+    for i in range(1, len(str1) + 1):
+        for j in range(1, len(str2) + 1):
+            cost = 0 if str1[i - 1] == str2[j - 1] else 1
+            matrix[i][j] = min(matrix[i - 1][j] + 1, matrix[i][j - 1] + 1, matrix[i - 1][j - 1] + cost)
+    return 1 - (matrix[-1][-1] / max(len(str1), len(str2)))
+
+
+class TestNormalizeText:
+    """Testes para a normalização com tabela de tradução e cache"""
+
+    def test_igual_a_normalizacao_unicode_completa(self):
+        """Testa resultado idêntico ao NFD + regex para cada caractere até U+2FFF"""
+        for code in range(0x3000):
+            for text in (chr(code), f"a{chr(code)}b", f" {chr(code)}  x "):
+                assert normalize_text(text) == _normalize_text_slow(text)
+
+    def test_normalize_column(self):
+        """Testa normalização de uma coluna com valores repetidos e vazios"""
+        assert normalize_column(["  José  da Silva ", "", None, "josé DA silva", "Ação #1"]) == [
+            "JOSE DA SILVA", "", "", "JOSE DA SILVA", "ACAO 1"
+        ]
+
+
+    def test_chave_de_collation(self):
+        """Testa a chave equivalente ao '=' do MySQL (utf8mb4_general_ci)"""
+        assert collation_key("Escola São João  ") == collation_key("ESCOLA SAO JOAO")
+        assert collation_key(" ESCOLA") != collation_key("ESCOLA")
+        assert collation_key("ESCOLA  A") != collation_key("ESCOLA A")
+        assert collation_key("") == collation_key(None) == ""
+
+class TestCalculateSimilarity:
+    """Testes para a similaridade com threshold"""
+
+    def test_igual_a_matriz_completa_quando_atinge_threshold(self):
+        """Testa que pares acima do threshold têm exatamente a mesma similaridade"""
+        random.seed(7)
+        for _ in range(5000):
+            str1 = "".join(random.choice("ABC D") for _ in range(random.randint(1, 14)))
+            str2 = "".join(random.choice("ABC D") for _ in range(random.randint(1, 14)))
+            threshold = random.choice([0.5, 0.7, 0.9])
+            esperado = similaridade_matriz_completa(str1, str2)
+
+            if esperado >= threshold:
+                assert calculate_similarity(str1, str2, threshold) == esperado
+            else:
+                assert calculate_similarity(str1, str2, threshold) < threshold
+            assert calculate_similarity(str1, str2) == (1.0 if str1.lower() == str2.lower() else esperado)
+
+    def test_detect_similar_names(self):
+        """Testa detecção entre threshold e 99%"""
+        existentes = [{"nome": "MARIA SILVA", "id": 1}, {"nome": "JOAO SOUZA", "id": 2}, {"nome": "MARIA SYLVA", "id": 3}]
+
+        similares = detect_similar_names("MARIA SILVA", existentes, threshold=0.7)
+
+        assert similares == [{"nome_existente": "MARIA SYLVA", "id_existente": 3, "similaridade": 0.909}]
+
+
+class TestBatchSimilarity:
+    """Testes para a similaridade vetorizada"""
+
+    def test_igual_ao_caminho_escalar(self):
+        """Testa que o cálculo em lote retorna os mesmos valores do escalar"""
+        random.seed(3)
+        for _ in range(200):
+            nome = "".join(random.choice("AbÁ D") for _ in range(random.randint(0, 12)))
+            nomes = ["".join(random.choice("aBá d") for _ in range(random.randint(0, 12))) for _ in range(30)]
+            for threshold in [None, 0.7]:
+                esperado = [calculate_similarity(nome, outro, threshold) for outro in nomes]
+                assert batch_similarity(nome, nomes, threshold).tolist() == esperado
+
+    def test_cache_de_similaridade_por_banco(self):
+        """Testa que pares em cache não são recalculados e que a invalidação descarta o cache"""
+        from app.core.cache import get_similarity_cache, invalidate_similarity_cache
+
+        escolas = [{"nome": f"ESCOLA MUNICIPAL {i}", "id": i} for i in range(12)]
+        cache = get_similarity_cache("db_teste")
+        esperado = detect_similar_names("ESCOLA MUNICIPAL 1A", escolas)
+
+        assert detect_similar_names("ESCOLA MUNICIPAL 1A", escolas, cache=cache) == esperado
+        assert len(cache) == len(escolas)
+
+        # Valor em cache é usado sem recalcular
+        cache[("ESCOLA MUNICIPAL 1A", "ESCOLA MUNICIPAL 5", 0.7)] = 0.9
+        assert {"nome_existente": "ESCOLA MUNICIPAL 5", "id_existente": 5, "similaridade": 0.9} in \
+            detect_similar_names("ESCOLA MUNICIPAL 1A", escolas, cache=cache)
+
+        invalidate_similarity_cache("db_teste")
+        assert len(get_similarity_cache("db_teste")) == 0
+
+
+class TestSimilarityIndex:
+    """Testes para o índice de nomes similares"""
+
+    def test_igual_a_busca_completa(self):
+        """Testa que o índice retorna o mesmo resultado da comparação com todos os nomes"""
+        random.seed(11)
+        partes = ["ANA", "ANNA", "MARIA", "JOAO", "JOSE", "SILVA", "SILVEIRA", "SOUZA", "SOUSA", "DA", "LIMA"]
+        nomes = [" ".join(random.choice(partes) for _ in range(random.randint(1, 4))) for _ in range(400)]
+        nomes += ["A", "AB", "ab", "Maria Silva"]
+
+        for blocking in (False, True):
+            indice = SimilarityIndex(threshold=0.7, blocking=blocking)
+            processados = []
+            for row_index, nome in enumerate(nomes):
+                assert indice.search(nome) == detect_similar_names(nome, processados, threshold=0.7, blocking=blocking)
+
+                indice.add({"nome": nome, "row_index": row_index})
+                processados.append({"nome": nome, "row_index": row_index})
+
+            assert len(indice) == len(nomes)
+
+    def test_busca_por_escopo_no_pool_de_processos(self, monkeypatch):
+        """Testa que a busca em blocos no pool é igual a um índice por escopo em sequência"""
+        monkeypatch.setitem(PROCESS_POOL_CONFIG, "max_workers", 2)
+        random.seed(5)
+        partes = ["ANA", "ANNA", "MARIA", "JOAO", "JOSE", "SILVA", "SOUZA", "SOUSA", "LIMA"]
+        entradas = [
+            (random.choice("AB"), " ".join(random.choice(partes) for _ in range(random.randint(1, 3))))
+            for _ in range(300)
+        ]
+
+        esperado = {}
+        indices = {}
+        for posicao, (escopo, nome) in enumerate(entradas):
+            indice = indices.setdefault(escopo, SimilarityIndex(threshold=0.7))
+            similares = indice.search(nome)
+            if similares:
+                esperado[posicao] = similares
+            indice.add({"nome": nome, "id": posicao})
+
+        assert find_similar_names(entradas) == esperado
+
+        assert find_similar_names(entradas, parallel_threshold=1) == esperado
+
+    def test_varias_buscas_no_pool_de_processos(self, monkeypatch):
+        """Testa que as buscas em blocos no pool são iguais às sequenciais e preenchem o cache"""
+        monkeypatch.setitem(PROCESS_POOL_CONFIG, "max_workers", 2)
+        random.seed(7)
+        partes = ["ESCOLA", "ESTADUAL", "MUNICIPAL", "CENTRO", "SANTOS", "SANTA", "RITA", "RIO"]
+        nomes = [" ".join(random.choice(partes) for _ in range(random.randint(2, 4))) for _ in range(60)]
+        tarefas = [(nome, [{"nome": outro, "id": i} for i, outro in enumerate(nomes[:posicao])])
+                   for posicao, nome in enumerate(nomes)]
+        esperado = [detect_similar_names(nome, existentes) for nome, existentes in tarefas]
+
+        cache = {}
+        assert detect_similar_names_many(tarefas, cache=cache, parallel_threshold=1) == esperado
+        assert all((nome, existente["nome"], 0.7) in cache for nome, existentes in tarefas for existente in existentes)
+        assert detect_similar_names_many(tarefas, cache=cache, parallel_threshold=None) == esperado
+
+class TestPhoneticKey:
+    """Testes para a chave fonética e a blocagem de nomes"""
+
+    def test_grafias_equivalentes(self):
+        """Testa que variações de grafia comuns geram a mesma chave"""
+        equivalentes = [
+            ("Thays Souza", "TAIS SOUSA"),
+            ("Jéssica", "GESSICA"),
+            ("Conceição", "KONSEISSAO"),
+            ("William", "WILLIAN"),
+            ("Raphael", "RAFAEL"),
+            ("Queila", "KEILA"),
+        ]
+        for nome, variacao in equivalentes:
+            assert phonetic_key(nome) == phonetic_key(variacao)
+
+        assert phonetic_key("GUILHERME") != phonetic_key("JILERME")
+        assert phonetic_key("") == ""
+
+    def test_chaves_de_blocagem(self):
+        """Testa as chaves por palavra, sem partículas"""
+        assert blocking_keys("Ana Lúcia da Silva") == {"ANA", "LUS", "SIL"}
+        assert blocking_keys("Guilherme") == blocking_keys("Gilherme")
+        assert blocking_keys("Estefani") == blocking_keys("Stephany")
+        assert blocking_keys("DA DE") == {"DA", "DE"}
@@ -0,0 +1,127 @@
+"""
+Testes unitários para leitura incremental de uploads
+"""
+import gzip
+import io
+import zipfile
+import pytest
+from app.utils.upload_reader import open_upload_text, InvalidUploadError, UploadTooLargeError
+from app.utils.csv_processor import parse_csv_basic, process_csv_data
+
+
+class TestUploadReader:
+    """Testes para o leitor incremental de uploads"""
+
+    def test_open_upload_text_utf8(self):
+        """Testa abertura de arquivo UTF-8 como stream"""
+        raw = io.BytesIO("RA,NOME\n1,JOÃO\n".encode("utf-8"))
+
+        stream, encoding = open_upload_text(raw)
+
+        assert encoding == "utf-8"
+        assert stream.read() == "RA,NOME\n1,JOÃO\n"
+
+    def test_open_upload_text_windows_1252(self):
+        """Testa detecção de arquivos gerados no Windows"""
+        raw = io.BytesIO("RA,NOME\n1,JOÃO\n".encode("windows-1252"))
+
+        stream, encoding = open_upload_text(raw)
+
+        assert encoding == "windows-1252"
+        assert stream.read() == "RA,NOME\n1,JOÃO\n"
+
+    def test_open_upload_text_bom(self):
+        """Testa detecção por BOM (o BOM não aparece no texto)"""
+        raw = io.BytesIO("RA,NOME\n1,JOÃO\n".encode("utf-8-sig"))
+
+        stream, encoding = open_upload_text(raw)
+
+        assert encoding == "utf-8-sig"
+        assert stream.read() == "RA,NOME\n1,JOÃO\n"
+
+    def test_bytes_invalidos_apos_amostra(self):
+        """Testa bytes Windows-1252 depois da amostra em arquivo detectado como UTF-8"""
+        content = ("RA,NOME\n" * 20000).encode("utf-8") + "1,JOÃO\n".encode("windows-1252")
+        raw = io.BytesIO(content)
+
+        stream, encoding = open_upload_text(raw)
+
+        assert encoding == "utf-8"
+        assert stream.read().endswith("1,JOÃO\n")
+
+    def test_open_upload_text_muito_grande(self):
+        """Testa rejeição de arquivo acima do limite durante a leitura"""
+        raw = io.BytesIO(b"A,B\n" * 1000)
+
+        stream, _ = open_upload_text(raw, max_size=1024, chunk_size=256)
+
+        with pytest.raises(UploadTooLargeError):
+            stream.read()
+
+    def test_parse_csv_basic_stream(self):
+        """Testa parse do stream com o mesmo resultado do conteúdo completo"""
+        content = "RA;NOME\n1;joao\n\n2;\"maria; silva\"\n"
+        stream, _ = open_upload_text(io.BytesIO(content.encode("utf-8")))
+
+        assert parse_csv_basic(stream, cell_transform=str.upper) == parse_csv_basic(content, cell_transform=str.upper)
+
+    def test_process_csv_data_stream(self):
+        """Testa processamento do CSV de estrutura a partir de stream"""
+        content = "﻿ESCOLA,SERIE,TURMA\nESCOLA1,1ANO,A\n,,\n"
+        stream, _ = open_upload_text(io.BytesIO(content.encode("utf-8")))
+
+        result = process_csv_data(stream, ["ESCOLA", "SERIE", "TURMA"])
+
+        assert result == process_csv_data(content, ["ESCOLA", "SERIE", "TURMA"])
+        assert len(result["valid_rows"]) == 1
+        assert result["errors"][0]["linha"] == 3
+
+    def test_open_upload_text_gzip(self):
+        """Testa descompactação de arquivo .csv.gz durante a leitura"""
+        raw = io.BytesIO(gzip.compress("RA,NOME\n1,JOÃO\n".encode("windows-1252")))
+
+        stream, encoding = open_upload_text(raw)
+
+        assert encoding == "windows-1252"
+        assert stream.read() == "RA,NOME\n1,JOÃO\n"
+
+    def test_open_upload_text_zip(self):
+        """Testa .zip com um único CSV (diretórios e __MACOSX são ignorados)"""
+        raw = io.BytesIO()
+        with zipfile.ZipFile(raw, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("dados/", "")
+            archive.writestr("__MACOSX/dados/._alunos.csv", b"\x00\x05")
+            archive.writestr("dados/alunos.csv", "RA,NOME\n1,JOÃO\n")
+
+        stream, _ = open_upload_text(raw)
+
+        assert stream.read() == "RA,NOME\n1,JOÃO\n"
+
+    def test_open_upload_text_zip_com_varios_arquivos(self):
+        """Testa rejeição de .zip com mais de um arquivo"""
+        raw = io.BytesIO()
+        with zipfile.ZipFile(raw, "w") as archive:
+            archive.writestr("a.csv", "RA\n1\n")
+            archive.writestr("b.csv", "RA\n2\n")
+
+        with pytest.raises(InvalidUploadError):
+            open_upload_text(raw)
+
+    def test_limite_aplicado_ao_conteudo_descompactado(self):
+        """Testa que o limite vale para o tamanho descompactado"""
+        raw = io.BytesIO(gzip.compress(b"A,B\n" * 100000))
+
+        stream, _ = open_upload_text(raw, max_size=64 * 1024)
+
+        with pytest.raises(UploadTooLargeError):
+            stream.read()
+
+    def test_gzip_corrompido(self):
+        """Testa que arquivo .gz truncado não gera importação parcial"""
+        content = "ESCOLA,SERIE,TURMA\n" + "".join(f"ESCOLA{i},{i % 9}ANO,T{i}\n" for i in range(20000))
+        compressed = gzip.compress(content.encode("utf-8"))
+        raw = io.BytesIO(compressed[:len(compressed) // 2])
+
+        with pytest.raises(InvalidUploadError):
+            stream, _ = open_upload_text(raw)
+            process_csv_data(stream, ["ESCOLA", "SERIE", "TURMA"])